@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Mergeable running aggregates over the accountants dataset.
+
+AggregateState keeps everything analyze_data.py reports:
+- per-column missing counts
+- value counts per categorical column, in first-appearance order
+- count, mean, variance, min and max per numeric column
+- a quantile sketch per numeric column, exact while the number of distinct
+  values is small and a DDSketch (relative-error log buckets) beyond that
+
+Each new batch of profiles is folded in with one vectorised pass per
+column. Two states built from different shards merge into the state of
+their union: means and variances combine with Chan's parallel formula,
+counts and sketch buckets add. The state is saved as JSON, so reports
+cost time in proportion to the new data rather than the whole history.
+
+    python aggregates.py update state.json batch-2024-05.csv batch-2024-06.csv
+    python aggregates.py merge merged.json shard-1.json shard-2.json
+    python aggregates.py report merged.json --json report.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from dataset import CHUNK_ROWS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Bump when the saved layout changes, to force a rebuild of saved states
+STATE_VERSION = 2
+
+NUMERIC_FIELDS = ('salary', 'age')
+CATEGORICAL_FIELDS = ('gender', 'marital_status', 'city', 'category', 'position')
+REPORT_QUANTILES = (0.25, 0.5, 0.75, 0.9)
+# Bytes hashed at the start of a source and just before its processed offset to recognise an append
+FINGERPRINT_WINDOW = 64 * 1024
+
+
+class DDSketch:
+    """Quantile sketch with bounded relative error (Masson et al., VLDB 2019)"""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add_many(self, values, counts=None):
+        """Add an array of values, optionally with a multiplicity per value"""
+        import numpy as np
+
+        values = np.asarray(values, dtype='float64')
+        counts = np.ones(len(values), dtype='int64') if counts is None else np.asarray(counts, dtype='int64')
+        self.count += int(counts.sum())
+        self.zeros += int(counts[values == 0].sum())
+        for sign, bins in ((1, self.positive), (-1, self.negative)):
+            mask = values * sign > 0
+            if not mask.any():
+                continue
+            keys = np.ceil(np.log(values[mask] * sign) / self.log_gamma).astype('int64')
+            unique, positions = np.unique(keys, return_inverse=True)
+            for key, count in zip(unique.tolist(), np.bincount(positions, weights=counts[mask]).tolist()):
+                bins[key] = bins.get(key, 0) + int(count)
+
+    def merge(self, other: 'DDSketch'):
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        for bins, other_bins in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_bins.items():
+                bins[key] = bins.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+    def to_dict(self) -> Dict:
+        return {'relative_accuracy': self.relative_accuracy, 'zeros': self.zeros, 'count': self.count,
+                'positive': sorted(self.positive.items()), 'negative': sorted(self.negative.items())}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'DDSketch':
+        sketch = cls(state['relative_accuracy'])
+        sketch.positive = {int(key): count for key, count in state['positive']}
+        sketch.negative = {int(key): count for key, count in state['negative']}
+        sketch.zeros = state['zeros']
+        sketch.count = state['count']
+        return sketch
+
+
+class QuantileSketch:
+    """Exact value counts while there are at most `max_exact` distinct values, then a DDSketch"""
+
+    def __init__(self, max_exact: int = 4096, relative_accuracy: float = 0.01):
+        self.max_exact = max_exact
+        self.relative_accuracy = relative_accuracy
+        self.exact: Optional[Dict[float, int]] = {}
+        self.sketch: Optional[DDSketch] = None
+
+    def add_many(self, values, counts=None):
+        """Add an array of values, optionally with a multiplicity per value"""
+        import numpy as np
+
+        if self.exact is None:
+            self.sketch.add_many(values, counts)
+            return
+        values = np.asarray(values, dtype='float64')
+        if counts is None:
+            unique, counts = np.unique(values, return_counts=True)
+        else:
+            unique, positions = np.unique(values, return_inverse=True)
+            counts = np.bincount(positions, weights=np.asarray(counts, dtype='int64')).astype('int64')
+        for value, count in zip(unique.tolist(), counts.tolist()):
+            self.exact[value] = self.exact.get(value, 0) + count
+        self._check_size()
+
+    def _check_size(self):
+        if self.exact is not None and len(self.exact) > self.max_exact:
+            self.sketch = DDSketch(self.relative_accuracy)
+            self.sketch.add_many(list(self.exact), list(self.exact.values()))
+            self.exact = None
+
+    def merge(self, other: 'QuantileSketch'):
+        if self.exact is not None and other.exact is not None:
+            for value, count in other.exact.items():
+                self.exact[value] = self.exact.get(value, 0) + count
+            self._check_size()
+            return
+        if self.exact is not None:
+            self.exact, exact = None, self.exact
+            self.sketch = DDSketch(self.relative_accuracy)
+            self.sketch.add_many(list(exact), list(exact.values()))
+        if other.exact is not None:
+            self.sketch.add_many(list(other.exact), list(other.exact.values()))
+        else:
+            self.sketch.merge(other.sketch)
+
+    def quantile(self, q: float) -> float:
+        """Quantile with linear interpolation between ranks, as pandas computes it, while exact"""
+        if self.exact is None:
+            return self.sketch.quantile(q)
+        total = sum(self.exact.values())
+        if not total:
+            return math.nan
+        position = q * (total - 1)
+        lower, upper = math.floor(position), math.ceil(position)
+        values: Dict[int, float] = {}
+        seen = 0
+        for value in sorted(self.exact):
+            count = self.exact[value]
+            for rank in (lower, upper):
+                if rank not in values and seen <= rank < seen + count:
+                    values[rank] = value
+            seen += count
+            if upper in values:
+                break
+        return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+    def to_dict(self) -> Dict:
+        state = {'max_exact': self.max_exact, 'relative_accuracy': self.relative_accuracy}
+        if self.exact is not None:
+            state['exact'] = sorted(self.exact.items())
+        else:
+            state['sketch'] = self.sketch.to_dict()
+        return state
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'QuantileSketch':
+        sketch = cls(state['max_exact'], state['relative_accuracy'])
+        if 'exact' in state:
+            sketch.exact = {value: count for value, count in state['exact']}
+        else:
+            sketch.exact = None
+            sketch.sketch = DDSketch.from_dict(state['sketch'])
+        return sketch
+
+
+class NumericStats:
+    """Count, mean, sum of squared deviations (for the variance), min, max and quantiles of one column"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.quantiles = QuantileSketch()
+
+    def _combine(self, count: int, mean: float, m2: float, low: float, high: float):
+        # Chan et al.'s pairwise update: exact for any split of the data
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def add_many(self, values):
+        import numpy as np
+
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        mean = float(values.mean())
+        self._combine(len(values), mean, float(((values - mean) ** 2).sum()),
+                      float(values.min()), float(values.max()))
+        self.quantiles.add_many(values)
+
+    def merge(self, other: 'NumericStats'):
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+            self.quantiles.merge(other.quantiles)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (ddof=1, as pandas uses)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    def summary(self) -> Dict:
+        summary = {'count': self.count, 'mean': self.mean, 'std': math.sqrt(self.variance) if self.count > 1 else None,
+                   'min': self.min, 'max': self.max}
+        if self.count:
+            summary.update({f"p{round(q * 100)}": self.quantiles.quantile(q) for q in REPORT_QUANTILES})
+        return summary
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'min': self.min, 'max': self.max,
+                'quantiles': self.quantiles.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'NumericStats':
+        stats = cls()
+        stats.count, stats.mean, stats.m2 = state['count'], state['mean'], state['m2']
+        stats.min, stats.max = state['min'], state['max']
+        stats.quantiles = QuantileSketch.from_dict(state['quantiles'])
+        return stats
+
+
+class AggregateState:
+    """Running aggregates over every batch folded in so far"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.rows = 0
+        self.columns: List[str] = []
+        self.dtypes: Dict[str, str] = {}
+        self.missing: Dict[str, int] = {}
+        self.counts: Dict[str, Dict[str, int]] = {field: {} for field in CATEGORICAL_FIELDS}
+        self.numeric: Dict[str, NumericStats] = {field: NumericStats() for field in NUMERIC_FIELDS}
+        # Source path -> how much of it has been folded in (see update_from_file)
+        self.sources: Dict[str, Dict] = {}
+
+    def update(self, batch: pd.DataFrame):
+        """Fold a typed batch (as returned by dataset.read_source) into the state"""
+        if not self.columns:
+            self.columns = list(batch.columns)
+            self.dtypes = {column: str(dtype) for column, dtype in batch.dtypes.items()}
+        for column in NUMERIC_FIELDS:
+            # A column that gains missing values in a later batch is float, as it would be read in one go
+            if column in batch.columns and str(batch[column].dtype) == 'float64':
+                self.dtypes[column] = 'float64'
+        self.rows += len(batch)
+        for column, count in batch.isna().sum().items():
+            self.missing[column] = self.missing.get(column, 0) + int(count)
+        for field in CATEGORICAL_FIELDS:
+            if field in batch.columns:
+                # sort=False keeps first-appearance order, so ties print in the order pandas would
+                counts = self.counts[field]
+                for value, count in batch[field].value_counts(sort=False).items():
+                    if count:
+                        counts[value] = counts.get(value, 0) + int(count)
+        for field in NUMERIC_FIELDS:
+            if field in batch.columns:
+                self.numeric[field].add_many(batch[field].to_numpy(dtype='float64', na_value=math.nan))
+
+    def merge(self, other: 'AggregateState'):
+        """Combine with a state built from a disjoint set of rows (e.g. another shard)"""
+        if not self.columns:
+            self.columns, self.dtypes = list(other.columns), dict(other.dtypes)
+        self.rows += other.rows
+        for column, count in other.missing.items():
+            self.missing[column] = self.missing.get(column, 0) + count
+        for field, other_counts in other.counts.items():
+            counts = self.counts.setdefault(field, {})
+            for value, count in other_counts.items():
+                counts[value] = counts.get(value, 0) + count
+        for field, stats in other.numeric.items():
+            self.numeric.setdefault(field, NumericStats()).merge(stats)
+        self.sources.update(other.sources)
+
+    def top(self, field: str, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Most common values, ties in first-appearance order"""
+        # sorted() is stable, so equal counts keep the dict's insertion order
+        return sorted(self.counts[field].items(), key=lambda item: -item[1])[:n]
+
+    def report(self, top_n: int = 10) -> Dict:
+        """JSON-serialisable report"""
+        return {
+            'records': self.rows,
+            'columns': self.columns,
+            'numeric': {field: stats.summary() for field, stats in self.numeric.items()},
+            'distributions': {field: dict(self.top(field, None if field in ('gender', 'marital_status') else top_n))
+                              for field in CATEGORICAL_FIELDS},
+            'missing': self.missing,
+        }
+
+    def to_dict(self) -> Dict:
+        return {'version': STATE_VERSION, 'rows': self.rows, 'columns': self.columns, 'dtypes': self.dtypes,
+                'missing': self.missing, 'counts': {field: list(counts.items()) for field, counts in self.counts.items()},
+                'numeric': {field: stats.to_dict() for field, stats in self.numeric.items()},
+                'sources': self.sources}
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'AggregateState':
+        if state.get('version') != STATE_VERSION:
+            raise ValueError("aggregate state was written by an incompatible version")
+        aggregates = cls()
+        aggregates.rows, aggregates.columns, aggregates.dtypes = state['rows'], state['columns'], state['dtypes']
+        aggregates.missing = state['missing']
+        aggregates.counts = {field: dict(pairs) for field, pairs in state['counts'].items()}
+        aggregates.numeric = {field: NumericStats.from_dict(stats) for field, stats in state['numeric'].items()}
+        aggregates.sources = state['sources']
+        return aggregates
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path) -> 'AggregateState':
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def _fingerprint(path, end: int) -> str:
+    """SHA-256 of the file's first `end` bytes as far as FINGERPRINT_WINDOW reaches: its length, head and tail
+
+    Reads at most two windows, so checking a large file costs the same as
+    a small one.
+    """
+    digest = hashlib.sha256(str(end).encode('ascii'))
+    with open(path, 'rb') as f:
+        digest.update(f.read(min(end, FINGERPRINT_WINDOW)))
+        tail = max(end - FINGERPRINT_WINDOW, FINGERPRINT_WINDOW)
+        if tail < end:
+            f.seek(tail)
+            digest.update(f.read(end - tail))
+    return digest.hexdigest()
+
+
+def source_key(path) -> str:
+    """Identity of a source file in AggregateState.sources"""
+    return str(Path(path).resolve())
+
+
+def update_from_file(state: AggregateState, path, chunk_rows: int = CHUNK_ROWS) -> int:
+    """Fold in the rows of a CSV that the state has not seen yet; returns the number of new rows
+
+    A file that has only been appended to since the last update is read
+    from where the state stopped. Whether the processed part is unchanged
+    is judged from its header and the bytes just before the stored offset
+    (see _fingerprint), so the check does not grow with the history; an
+    in-place edit elsewhere in the middle needs a fresh state. Any detected
+    change starts the state over, rereading the whole file, so the state
+    must not hold other sources' rows in that case. Rows are read
+    and folded `chunk_rows` at a time, so memory does not grow with the
+    file.
+    """
+    from dataset import iter_source
+
+    key = source_key(path)
+    size = os.path.getsize(path)
+    source = state.sources.get(key)
+    offset = source['offset'] if source and source['offset'] <= size else 0
+    start = 0
+    # Parquet files cannot be read from an offset, so any change to one means a rebuild
+    appendable = Path(path).suffix != '.parquet' or offset == size
+    if source and source['offset'] <= size and appendable and _fingerprint(path, offset) == source['fingerprint']:
+        start = offset
+    elif source:
+        state.reset()
+    if start == size:
+        return 0
+
+    rows = 0
+    for batch in iter_source(path, chunk_rows=chunk_rows, start=start):
+        state.update(batch)
+        rows += len(batch)
+    state.sources[key] = {'offset': size, 'fingerprint': _fingerprint(path, size)}
+    return rows
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build, merge and report mergeable dataset aggregates")
+    commands = parser.add_subparsers(dest='command', required=True)
+    update = commands.add_parser('update', help="fold CSV batches into a state file")
+    update.add_argument('state')
+    update.add_argument('batches', nargs='+')
+    update.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f"rows read and folded in at a time (default: {CHUNK_ROWS})")
+    merge = commands.add_parser('merge', help="merge shard states into one")
+    merge.add_argument('output')
+    merge.add_argument('states', nargs='+')
+    report = commands.add_parser('report', help="print a state as a JSON report")
+    report.add_argument('state')
+    report.add_argument('--json', default=None, metavar='PATH', help="write the report to a file instead")
+    args = parser.parse_args(argv)
+
+    if args.command == 'update':
+        state = AggregateState.load(args.state) if os.path.exists(args.state) else AggregateState()
+        for batch in args.batches:
+            print(f"{batch}: {update_from_file(state, batch, args.chunk_rows)} new rows")
+        state.save(args.state)
+    elif args.command == 'merge':
+        state = AggregateState()
+        for path in args.states:
+            state.merge(AggregateState.load(path))
+        state.save(args.output)
+        print(f"Merged {len(args.states)} states: {state.rows} rows")
+    else:
+        text = json.dumps(AggregateState.load(args.state).report(), ensure_ascii=False, indent=2)
+        if args.json:
+            Path(args.json).write_text(text + '\n', encoding='utf-8')
+        else:
+            print(text)
+
+
+if __name__ == '__main__':
+    main()
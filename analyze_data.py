@@ -1,62 +1,136 @@
-import pandas as pd
-import numpy as np
-import re
-
-# Load the dataset
-df = pd.read_csv('accountants.csv')
-
-print("="*60)
-print("DATASET OVERVIEW")
-print("="*60)
-print(f"Total Records: {len(df)}")
-print(f"\nColumns: {list(df.columns)}")
-print(f"\nData Types:\n{df.dtypes}")
-
-print("\n" + "="*60)
-print("BASIC STATISTICS")
-print("="*60)
-
-# Clean min_salary column - extract numeric value from string like "(AZN): 350"
-def extract_salary(salary_str):
-    if pd.isna(salary_str):
-        return np.nan
-    # Extract numbers from strings like "(AZN): 350" or "350"
-    match = re.search(r'(\d+)', str(salary_str))
-    if match:
-        return int(match.group(1))
-    return 0
-
-df['salary_clean'] = df['min_salary'].apply(extract_salary)
-
-print("\nSalary Statistics:")
-print(f"Min Salary Range: {df['salary_clean'].min()} - {df['salary_clean'].max()} AZN")
-print(f"Average Min Salary: {df['salary_clean'].mean():.2f} AZN")
-print(f"Median Min Salary: {df['salary_clean'].median():.2f} AZN")
-
-print("\nAge Statistics:")
-print(f"Age Range: {df['age'].min()} - {df['age'].max()} years")
-print(f"Average Age: {df['age'].mean():.2f} years")
-
-print("\n" + "="*60)
-print("DISTRIBUTION ANALYSIS")
-print("="*60)
-
-print("\nGender Distribution:")
-print(df['gender'].value_counts())
-
-print("\nMarital Status Distribution:")
-print(df['marital_status'].value_counts())
-
-print("\nTop 10 Cities:")
-print(df['city'].value_counts().head(10))
-
-print("\nTop 10 Categories:")
-print(df['category'].value_counts().head(10))
-
-print("\nTop 10 Positions:")
-print(df['position'].value_counts().head(10))
-
-print("\n" + "="*60)
-print("NULL/MISSING VALUES")
-print("="*60)
-print(df.isnull().sum())
+"""
+Summary statistics for the scraped accountants dataset.
+
+The statistics come from a saved AggregateState (aggregates.py) under
+.cache/, so a run only reads the rows appended to the CSV since the last
+one; a rewritten file is aggregated again from the start. Rows are read
+in chunks of --chunk-rows, so memory stays flat however large the export.
+
+    python analyze_data.py
+    python analyze_data.py --csv accountants.csv --json report.json
+    python analyze_data.py --brief    # one line, without loading pandas
+"""
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+from typing import List, Optional
+
+from aggregates import AggregateState, source_key, update_from_file
+from dataset import CACHE_DIR, CHUNK_ROWS
+
+
+def default_state_path(csv_path) -> Path:
+    """Saved state for one source file, named after its stem and keyed by its absolute path"""
+    key = hashlib.sha256(source_key(csv_path).encode('utf-8')).hexdigest()[:16]
+    return CACHE_DIR / f"{Path(csv_path).stem}-{key}-aggregates.json"
+
+
+def load_state(csv_path, state_path, rebuild: bool = False, chunk_rows: int = CHUNK_ROWS) -> AggregateState:
+    """Bring the saved aggregates for `csv_path` up to date with its new rows"""
+    state = AggregateState()
+    if state_path.exists() and not rebuild:
+        try:
+            state = AggregateState.load(state_path)
+        except (ValueError, KeyError, json.JSONDecodeError):
+            state = AggregateState()
+    if set(state.sources) - {source_key(csv_path)}:
+        # Aggregates of another file (e.g. a copied checkout or --state reused); never add ours on top
+        state = AggregateState()
+    if update_from_file(state, csv_path, chunk_rows):
+        state.save(state_path)
+    return state
+
+
+def _number(value, dtype: str):
+    # Integer columns print without a decimal point, as pandas would
+    return int(value) if dtype.startswith('int') else value
+
+
+def print_report(state: AggregateState):
+    import pandas as pd
+
+    def counts(field: str, n: Optional[int] = None) -> pd.Series:
+        return pd.Series(dict(state.top(field, n)), name='count', dtype='int64').rename_axis(field)
+
+    print("="*60)
+    print("DATASET OVERVIEW")
+    print("="*60)
+    print(f"Total Records: {state.rows}")
+    print(f"\nColumns: {state.columns}")
+    print(f"\nData Types:\n{pd.Series(state.dtypes, dtype=object)}")
+
+    print("\n" + "="*60)
+    print("BASIC STATISTICS")
+    print("="*60)
+
+    # min_salary strings like "(AZN): 350" are parsed into the numeric salary column by the loader
+    salary, age = state.numeric['salary'], state.numeric['age']
+    salary_type, age_type = state.dtypes.get('salary', ''), state.dtypes.get('age', '')
+    print("\nSalary Statistics:")
+    print(f"Min Salary Range: {_number(salary.min, salary_type)} - {_number(salary.max, salary_type)} AZN")
+    print(f"Average Min Salary: {salary.mean:.2f} AZN")
+    print(f"Median Min Salary: {salary.quantiles.quantile(0.5):.2f} AZN")
+
+    print("\nAge Statistics:")
+    print(f"Age Range: {_number(age.min, age_type)} - {_number(age.max, age_type)} years")
+    print(f"Average Age: {age.mean:.2f} years")
+
+    print("\n" + "="*60)
+    print("DISTRIBUTION ANALYSIS")
+    print("="*60)
+
+    print("\nGender Distribution:")
+    print(counts('gender'))
+
+    print("\nMarital Status Distribution:")
+    print(counts('marital_status'))
+
+    print("\nTop 10 Cities:")
+    print(counts('city', 10))
+
+    print("\nTop 10 Categories:")
+    print(counts('category', 10))
+
+    print("\nTop 10 Positions:")
+    print(counts('position', 10))
+
+    print("\n" + "="*60)
+    print("NULL/MISSING VALUES")
+    print("="*60)
+    print(pd.Series(state.missing, dtype='int64'))
+
+
+def brief_line(state: AggregateState) -> str:
+    """One-line summary for health checks; needs only the saved state, not pandas"""
+    salary, age = state.numeric['salary'], state.numeric['age']
+    return (f"{state.rows} records, salary mean {salary.mean:.2f} median {salary.quantiles.quantile(0.5):.2f} AZN, "
+            f"age mean {age.mean:.2f}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Print summary statistics for the accountants dataset")
+    parser.add_argument('--csv', default='accountants.csv', help="source dataset (default: accountants.csv)")
+    parser.add_argument('--state', default=None,
+                        help="saved aggregate state (default: .cache/<csv name>-<path hash>-aggregates.json)")
+    parser.add_argument('--json', default=None, metavar='PATH', help="also write the report as JSON")
+    parser.add_argument('--brief', action='store_true', help="print a one-line summary instead of the full report")
+    parser.add_argument('--rebuild', action='store_true', help="ignore the saved state and aggregate every row")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f"rows read and aggregated at a time (default: {CHUNK_ROWS})")
+    args = parser.parse_args(argv)
+
+    state_path = Path(args.state) if args.state else default_state_path(args.csv)
+    state = load_state(args.csv, state_path, args.rebuild, args.chunk_rows)
+    if args.brief:
+        print(brief_line(state))
+    else:
+        print_report(state)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(state.report(), f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark for cleaning.py against the row-by-row reference functions.
+
+tests/test_cleaning.py checks that the vectorized cleaners give exactly
+the reference output; this script times both on a column of N rows
+resampled from the real data.
+
+    python benchmarks/bench_cleaning.py --rows 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / 'tests'))
+
+from cleaning import extract_position_type, extract_salary, standardize_city  # noqa: E402
+from test_cleaning import (legacy_extract_position_type, legacy_extract_salary,  # noqa: E402
+                           legacy_standardize_city)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def benchmark(df: pd.DataFrame, rows: int):
+    sample = df.sample(n=rows, replace=True, random_state=0).reset_index(drop=True)
+    print(f"Timing on {rows:,} rows (best of 3):")
+    for name, column, vectorized, legacy in [
+        ('extract_salary', 'min_salary', extract_salary, legacy_extract_salary),
+        ('extract_position_type', 'position', extract_position_type, legacy_extract_position_type),
+        ('standardize_city', 'city', standardize_city, legacy_standardize_city),
+    ]:
+        series = sample[column]
+        before = min(timed(series.apply, legacy) for _ in range(3))
+        after = min(timed(vectorized, series) for _ in range(3))
+        print(f"  {name:<22} apply {before:7.3f}s  vectorized {after:7.3f}s  speed-up {before / after:6.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cleaning.py against the row-wise reference")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="rows to benchmark (default: 1,000,000)")
+    parser.add_argument('--csv', default=str(REPO_ROOT / 'accountants.csv'), help="source dataset")
+    args = parser.parse_args(argv)
+
+    benchmark(pd.read_csv(args.csv), args.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Fixture corpus of cv_index.php and cv.php pages for offline benchmarks.
+
+A corpus is a directory laid out like the site:
+
+    cv_index/<page>.html    listing pages, 20 profile links each
+    cv/<id>.html            profile pages
+
+It can be recorded from a real crawl's response cache (--from-cache) or,
+when none is available, synthesized from accountants.csv using the page
+layout the parser expects. Synthesized pages contain the same values as
+the dataset, so parse throughput is measured on realistic text.
+
+    python benchmarks/corpus.py --out benchmarks/corpus
+    python benchmarks/corpus.py --from-cache .http_cache --out benchmarks/corpus
+"""
+
+import argparse
+import csv
+import html
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+DEFAULT_CORPUS = REPO_ROOT / 'benchmarks' / 'corpus'
+IDS_PER_PAGE = 20
+
+PROFILE_TEMPLATE = """<html><head><meta charset="utf-8"><title>{name} - muhasib.az</title></head>
+<body><table width="100%">
+<tr><td><h2>{name} —</h2></td><td align="right">Şəhər: {city}
+Tel.: {phone}
+E-mail: {email}
+</td></tr>
+<tr><td><p><b>Yaşı:</b> {age} <b>Cinsi:</b> {gender} <b>Ailə vəziyyəti:</b> {marital_status}</p>
+<p><b>Kateqoriya:</b> {category} <b>Vəzifə:</b> {position} <b>Minimum əmək haqqı</b> (AZN): {salary}</p></td></tr>
+<tr><td><h2>Təhsil:</h2>
+{education}</td></tr>
+<tr><td><h2>İş Təcrübəsi</h2>
+{experience}</td></tr>
+<tr><td><h2>Bilik və bacarıqlar</h2>
+{skills}</td></tr>
+</table></body></html>
+"""
+
+LISTING_TEMPLATE = """<html><head><meta charset="utf-8"><title>CV - muhasib.az</title></head>
+<body><table>
+{rows}
+</table>
+<a href="cv_index.php?page={next_page}">Növbəti</a>
+</body></html>
+"""
+
+FILLER = {
+    'education': "Azərbaycan Dövlət İqtisad Universiteti, Mühasibat uçotu və audit, bakalavr",
+    'experience': "2018-2023 \"Azər Ticarət\" MMC, mühasib. Ilkin sənədlərin tərtibi, bank əməliyyatları, "
+                  "ƏDV və mənfəət vergisi bəyannamələri",
+    'skills': "1C:Müəssisə 8.3, MS Excel, e-taxes.gov.az, ingilis dili (orta)",
+}
+
+
+def _clean(value: str, stop: str) -> str:
+    # The scraped CSV has the next label's text bled into some columns
+    return value.split(stop, 1)[0].strip()
+
+
+def profile_page(row: Dict[str, str]) -> str:
+    """Render a profile row back into cv.php markup"""
+    salary = re.search(r'(\d+)', row.get('min_salary') or '')
+    values = {
+        'name': row.get('name') or '',
+        'city': row.get('city') or '',
+        'phone': row.get('phone') or '',
+        'email': row.get('email') or '',
+        'age': row.get('age') or '',
+        'gender': row.get('gender') or '',
+        'marital_status': row.get('marital_status') or '',
+        'category': _clean(row.get('category') or '', 'Vəzifə:'),
+        'position': _clean(row.get('position') or '', 'Minimum'),
+        'salary': salary.group(1) if salary else '',
+    }
+    for field, filler in FILLER.items():
+        # Section columns in the CSV only hold the header text, so use representative filler
+        value = (row.get(field) or '').strip()
+        values[field] = filler if value.rstrip(':') in ('', 'Təhsil', 'İş Təcrübəsi', 'Bilik və bacarıqlar') else value
+    return PROFILE_TEMPLATE.format(**{key: html.escape(value) for key, value in values.items()})
+
+
+def listing_page(ids: List[str], page: int) -> str:
+    rows = '\n'.join(f'<tr><td><a href="cv.php?id={acc_id}">CV #{acc_id}</a></td>'
+                     f'<td><a href="cv.php?id={acc_id}">Ətraflı</a></td></tr>' for acc_id in ids)
+    return LISTING_TEMPLATE.format(rows=rows, next_page=page + 1)
+
+
+def synthesize(csv_path: Path) -> Iterator[Tuple[str, str]]:
+    """Yield (relative path, html) for every page of a corpus built from the dataset"""
+    with open(csv_path, encoding='utf-8', newline='') as f:
+        rows = [row for row in csv.DictReader(f) if row.get('id')]
+    ids = list(dict.fromkeys(row['id'] for row in rows))
+    for row in rows:
+        yield f"cv/{row['id']}.html", profile_page(row)
+    for start in range(0, len(ids), IDS_PER_PAGE):
+        page = start // IDS_PER_PAGE + 1
+        yield f"cv_index/{page}.html", listing_page(ids[start:start + IDS_PER_PAGE], page)
+
+
+def from_cache(cache_dir: Path) -> Iterator[Tuple[str, bytes]]:
+    """Yield (relative path, body) for every listing and profile page in a response cache"""
+    from response_cache import ResponseCache
+
+    cache = ResponseCache(str(cache_dir), ttl=None)
+    try:
+        for url, content in cache.iter_responses('%cv%.php%'):
+            profile = re.search(r'cv\.php\?id=(\d+)', url)
+            if profile:
+                yield f"cv/{profile.group(1)}.html", content
+            elif 'cv_index.php' in url:
+                page = re.search(r'page=(\d+)', url)
+                yield f"cv_index/{page.group(1) if page else 1}.html", content
+    finally:
+        cache.close()
+
+
+def build_corpus(out_dir: Path = DEFAULT_CORPUS, csv_path: Path = REPO_ROOT / 'accountants.csv',
+                 cache_dir: Path = None) -> int:
+    """Write a corpus to `out_dir`, returning the number of pages written"""
+    pages = from_cache(cache_dir) if cache_dir else synthesize(csv_path)
+    count = 0
+    for relative, body in pages:
+        path = out_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        path.write_bytes(body)
+        count += 1
+    return count
+
+
+def ensure_corpus(out_dir: Path = DEFAULT_CORPUS) -> Path:
+    """Synthesize the default corpus on first use"""
+    if not (out_dir / 'cv').is_dir():
+        build_corpus(out_dir)
+    return out_dir
+
+
+def load_profiles(corpus_dir: Path) -> List[Tuple[str, bytes]]:
+    """Return (id, body) for every profile page in the corpus, ordered by ID"""
+    paths = sorted((corpus_dir / 'cv').glob('*.html'), key=lambda path: int(path.stem))
+    return [(path.stem, path.read_bytes()) for path in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the offline benchmark corpus")
+    parser.add_argument('--out', type=Path, default=DEFAULT_CORPUS, help="corpus directory")
+    parser.add_argument('--csv', type=Path, default=REPO_ROOT / 'accountants.csv',
+                        help="dataset to synthesize pages from")
+    parser.add_argument('--from-cache', type=Path, default=None, metavar='CACHE_DIR',
+                        help="record pages from a scraper response cache instead of synthesizing")
+    args = parser.parse_args(argv)
+
+    count = build_corpus(args.out, args.csv, args.from_cache)
+    print(f"Wrote {count} pages to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""
+Offline benchmark suite for the scraper, cleaning, chart rendering,
+out-of-core aggregation and CLI startup.
+
+Everything runs against a fixture corpus (corpus.py) served by a local
+stub server (stub_server.py), so no request reaches muhasib.az. Each
+benchmark reports one headline metric plus details, and the results are
+written to JSON keyed by the current commit so runs can be compared:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --only parse,cleaning --compare benchmarks/results/abc1234.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / 'benchmarks'))
+
+from corpus import DEFAULT_CORPUS, ensure_corpus, load_profiles  # noqa: E402
+from dataset import CHUNK_ROWS  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+
+RESULTS_DIR = REPO_ROOT / 'benchmarks' / 'results'
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], Dict]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark function under `name`"""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def result(value: float, unit: str, higher_is_better: bool = True, **details) -> Dict:
+    return {'value': round(value, 3), 'unit': unit, 'higher_is_better': higher_is_better, **details}
+
+
+def best_of(repeats: int, func, *args) -> float:
+    """Fastest wall time of `repeats` calls"""
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def stub(args: argparse.Namespace, **overrides) -> StubServer:
+    options = {'latency': args.latency, 'jitter': args.jitter, 'error_rate': args.error_rate, 'seed': args.seed}
+    options.update(overrides)
+    return StubServer(args.corpus, **options)
+
+
+def make_scraper(base_url: str, **options):
+    from muhasib_scraper import MuhasibScraper
+
+    # The stub has no politeness budget, so pacing would only measure the limiter
+    options.setdefault('requests_per_second', 10_000)
+    return MuhasibScraper(base_url=base_url, **options)
+
+
+@benchmark('get_page_content')
+def bench_get_page_content(args: argparse.Namespace) -> Dict:
+    """Listing pages fetched and parsed per second, one at a time"""
+    pages = sorted(int(path.stem) for path in (args.corpus / 'cv_index').glob('*.html'))
+    with stub(args, error_rate=0.0) as server:
+        scraper = make_scraper(server.base_url)
+        started = time.perf_counter()
+        fetched = 0
+        for _ in range(args.repeats):
+            for page in pages:
+                if scraper.get_page_content(scraper.listing_page_url(page)) is not None:
+                    fetched += 1
+        elapsed = time.perf_counter() - started
+    return result(fetched / elapsed, 'pages/s', pages=fetched, seconds=round(elapsed, 3))
+
+
+@benchmark('parse')
+def bench_parse(args: argparse.Namespace) -> Dict:
+    """Profile pages parsed per second in-process, without any network"""
+    from muhasib_scraper import MuhasibScraper
+
+    scraper = MuhasibScraper(base_url='http://127.0.0.1')
+    profiles = load_profiles(args.corpus)
+
+    def parse_all():
+        for acc_id, content in profiles:
+            scraper.parse_accountant_details(acc_id, content)
+
+    elapsed = best_of(args.repeats, parse_all)
+    return result(len(profiles) / elapsed, 'pages/s', pages=len(profiles), seconds=round(elapsed, 3))
+
+
+@benchmark('scrape_accountant_details')
+def bench_scrape_accountant_details(args: argparse.Namespace) -> Dict:
+    """Profiles fetched from the stub and parsed per second, one at a time"""
+    ids = [acc_id for acc_id, _ in load_profiles(args.corpus)][:args.sample]
+    with stub(args) as server:
+        scraper = make_scraper(server.base_url)
+        started = time.perf_counter()
+        scraped = sum(1 for acc_id in ids if scraper.scrape_accountant_details(acc_id).get('name'))
+        elapsed = time.perf_counter() - started
+        errors = server.errors
+    return result(scraped / elapsed, 'records/s', records=scraped, requested=len(ids),
+                  injected_errors=errors, seconds=round(elapsed, 3))
+
+
+@benchmark('run_scraper')
+def bench_run_scraper(args: argparse.Namespace) -> Dict:
+    """End-to-end records per second through listing crawl, async pipeline and CSV sink"""
+    from record_sinks import CsvSink
+
+    with stub(args) as server, tempfile.TemporaryDirectory() as tmp:
+        scraper = make_scraper(server.base_url, concurrency=args.concurrency,
+                               parse_workers=args.parse_workers)
+        sink = CsvSink(os.path.join(tmp, 'accountants.csv'))
+        started = time.perf_counter()
+        scraper.run_scraper(max_accounts=None, sink=sink)
+        elapsed = time.perf_counter() - started
+        report = scraper.pipeline.report() if scraper.pipeline else {}
+        metrics = scraper.metrics.summary()
+        requests_served, errors = server.requests, server.errors
+    return result(sink.count / elapsed, 'records/s', records=sink.count, requests=requests_served,
+                  injected_errors=errors, seconds=round(elapsed, 3), pipeline=report, metrics=metrics)
+
+
+@benchmark('cleaning')
+def bench_cleaning(args: argparse.Namespace) -> Dict:
+    """Rows per second through the three vectorized cleaners"""
+    import pandas as pd
+    from cleaning import extract_position_type, extract_salary, standardize_city
+
+    df = pd.read_csv(args.csv)
+    sample = df.sample(n=args.rows, replace=True, random_state=args.seed).reset_index(drop=True)
+    timings = {
+        'extract_salary': best_of(args.repeats, extract_salary, sample['min_salary']),
+        'extract_position_type': best_of(args.repeats, extract_position_type, sample['position']),
+        'standardize_city': best_of(args.repeats, standardize_city, sample['city']),
+    }
+    total = sum(timings.values())
+    return result(args.rows / total, 'rows/s', rows=args.rows,
+                  seconds={name: round(seconds, 4) for name, seconds in timings.items()})
+
+
+@benchmark('charts')
+def bench_charts(args: argparse.Namespace) -> Dict:
+    """Seconds to prepare the data, build the aggregate cube and render every chart"""
+    import chart_cube
+    import generate_charts
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        cube = chart_cube.build_cube(generate_charts.prepare_data(str(args.csv)))
+        prepared = time.perf_counter() - started
+        names = list(generate_charts.CHARTS)
+        generate_charts.render_charts(names, cube, tmp, args.dpi, 'png', args.chart_workers)
+        elapsed = time.perf_counter() - started
+    return result(elapsed, 'seconds', higher_is_better=False, charts=len(names), dpi=args.dpi,
+                  workers=args.chart_workers, prepare_seconds=round(prepared, 3), cube_cells=len(cube))
+
+
+# Runs in a fresh interpreter so ru_maxrss is the peak of this workload alone
+OUT_OF_CORE_SCRIPT = """
+import json, resource, sys, time
+from aggregates import AggregateState, update_from_file
+from chart_cube import build_cube_chunked
+path, chunk_rows = sys.argv[1], int(sys.argv[2])
+started = time.perf_counter()
+state = AggregateState()
+update_from_file(state, path, chunk_rows)
+cube = build_cube_chunked(path, chunk_rows)
+print(json.dumps({'rows': state.rows, 'cells': len(cube), 'seconds': time.perf_counter() - started,
+                  'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+@benchmark('out_of_core')
+def bench_out_of_core(args: argparse.Namespace) -> Dict:
+    """Rows per second aggregated and cubed in chunks from a large export, with peak memory"""
+    import pandas as pd
+
+    df = pd.read_csv(args.csv)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'accountants.csv')
+        df.sample(n=args.large_rows, replace=True, random_state=args.seed).to_csv(path, index=False)
+        size_mb = os.path.getsize(path) / 1e6
+        runs = {}
+        for chunk_rows in (args.chunk_rows, args.large_rows):
+            output = subprocess.run([sys.executable, '-c', OUT_OF_CORE_SCRIPT, path, str(chunk_rows)],
+                                    cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+            runs[chunk_rows] = json.loads(output)
+    chunked, whole = runs[args.chunk_rows], runs[args.large_rows]
+    return result(chunked['rows'] / chunked['seconds'], 'rows/s', rows=chunked['rows'], file_mb=round(size_mb, 1),
+                  chunk_rows=args.chunk_rows, seconds=round(chunked['seconds'], 3),
+                  peak_rss_mb=round(chunked['peak_rss_mb'], 1),
+                  single_chunk_peak_rss_mb=round(whole['peak_rss_mb'], 1))
+
+
+@benchmark('startup')
+def bench_startup(args: argparse.Namespace) -> Dict:
+    """Milliseconds from launching muhasib.py to its first output, slowest light command"""
+    from muhasib import STARTUP_BUDGET_MS
+
+    csv = str(args.csv.resolve())
+    # What cron jobs and health checks run; `scrape` is left out, it loads its HTTP stack to parse arguments
+    commands = {
+        '--help': ['--help'],
+        'analyze --brief': ['analyze', '--csv', csv, '--brief'],
+        'charts --list': ['charts', '--list'],
+        'query': ['query', '--csv', csv, '--limit', '0'],
+        'search --help': ['search', '--help'],
+    }
+
+    def first_output(command: List[str], cwd: str) -> float:
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, str(REPO_ROOT / 'muhasib.py'), *command], cwd=cwd,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        process.stdout.read(1)
+        elapsed = time.perf_counter() - started
+        process.communicate()
+        if process.returncode:
+            raise RuntimeError(f"muhasib.py {' '.join(command)} exited with {process.returncode}")
+        return elapsed * 1000
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, command in commands.items():
+            # The first run builds the saved aggregates and query index, as the first cron run would
+            first_output(command, tmp)
+            runs = sorted(first_output(command, tmp) for _ in range(max(args.repeats, 5)))
+            timings[name] = runs[len(runs) // 2]
+    slowest = max(timings.values())
+    over = [command for command, ms in timings.items() if ms > STARTUP_BUDGET_MS]
+    if over:
+        print(f"  over the {STARTUP_BUDGET_MS} ms startup budget: {', '.join(over)}")
+    return result(slowest, 'ms', higher_is_better=False, budget_ms=STARTUP_BUDGET_MS, over_budget=over,
+                  median_ms={command: round(ms, 1) for command, ms in timings.items()})
+
+
+def git_revision() -> Dict:
+    def git(*command) -> str:
+        try:
+            return subprocess.run(['git', *command], cwd=REPO_ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ''
+    return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def compare(current: Dict, baseline: Dict):
+    """Print each headline metric next to the baseline run's"""
+    print(f"\nCompared with {baseline['meta'].get('commit', '')[:10] or 'baseline'}:")
+    for name, entry in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before or not before.get('value'):
+            continue
+        change = entry['value'] / before['value'] - 1
+        better = change >= 0 if entry['higher_is_better'] else change <= 0
+        print(f"  {name:<26} {before['value']:>12,.3f} -> {entry['value']:>12,.3f} {entry['unit']:<10} "
+              f"{change:+7.1%} {'better' if better else 'worse'}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the offline scraper, cleaning and chart benchmarks")
+    parser.add_argument('--only', default=None,
+                        help=f"comma-separated benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--corpus', type=Path, default=DEFAULT_CORPUS, help="fixture corpus directory")
+    parser.add_argument('--csv', type=Path, default=REPO_ROOT / 'accountants.csv', help="dataset for cleaning and charts")
+    parser.add_argument('--latency', type=float, default=0.02, help="stub server latency in seconds (default: 0.02)")
+    parser.add_argument('--jitter', type=float, default=0.01, help="stub server random extra latency (default: 0.01)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of stub requests that fail")
+    parser.add_argument('--seed', type=int, default=0, help="seed for stub jitter, errors and row sampling")
+    parser.add_argument('--repeats', type=int, default=3, help="repetitions for in-process benchmarks (default: 3)")
+    parser.add_argument('--sample', type=int, default=100,
+                        help="profiles fetched by the one-at-a-time scrape benchmark (default: 100)")
+    parser.add_argument('--concurrency', type=int, default=8, help="run_scraper fetch workers (default: 8)")
+    parser.add_argument('--parse-workers', type=int, default=None, help="run_scraper parse processes (default: CPU count)")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="rows for the cleaning benchmark")
+    parser.add_argument('--large-rows', type=int, default=500_000,
+                        help="rows in the generated export for the out_of_core benchmark (default: 500000)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f"rows per chunk for the out_of_core benchmark (default: {CHUNK_ROWS})")
+    parser.add_argument('--dpi', type=int, default=100, help="chart resolution (default: 100)")
+    parser.add_argument('--chart-workers', type=int, default=1, help="chart render processes (default: 1)")
+    parser.add_argument('--output', type=Path, default=None,
+                        help="results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', type=Path, default=None, metavar='RESULTS',
+                        help="earlier results file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"Unknown benchmark(s): {', '.join(unknown)}")
+
+    # Per-page INFO logging would dominate the timings
+    logging.disable(logging.INFO)
+    ensure_corpus(args.corpus)
+
+    revision = git_revision()
+    report = {
+        'meta': {
+            **revision,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        },
+        'results': {},
+    }
+    for name in names:
+        print(f"Running {name}...", flush=True)
+        entry = BENCHMARKS[name](args)
+        report['results'][name] = entry
+        print(f"  {entry['value']:,.3f} {entry['unit']}")
+
+    output = args.output or RESULTS_DIR / f"{revision['commit'][:10] or 'unversioned'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
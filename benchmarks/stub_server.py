@@ -0,0 +1,178 @@
+"""
+Local HTTP stub of muhasib.az serving a fixture corpus.
+
+cv_index.php?page=N and cv.php?id=N are answered from the corpus
+directory (see corpus.py); listing pages past the last one come back
+empty, as on the real site. Unknown profile IDs get a 404, or with
+--soft-404 a 200 page without a profile, as some sites do. HEAD
+requests are supported for ID probing, and with --etags pages carry an
+ETag and honour If-None-Match with a 304. Each response can be delayed by a fixed
+latency plus random jitter, and a configurable fraction of requests
+fail with 500 or 429, so scraper benchmarks include realistic waiting
+and retry behaviour.
+
+    python benchmarks/stub_server.py --port 8765 --latency 0.05 --error-rate 0.02
+    python muhasib_scraper.py --base-url http://127.0.0.1:8765
+"""
+
+import argparse
+import hashlib
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import DEFAULT_CORPUS, ensure_corpus, listing_page  # noqa: E402
+
+
+# Served with a 200 for unknown profile IDs under --soft-404: the page layout, but no profile labels
+SOFT_404_PAGE = '<html><head><title>Muhasib.az</title></head><body><h2>CV tapılmadı</h2></body></html>'.encode('utf-8')
+
+
+class StubServer:
+    """Serve a corpus on 127.0.0.1 from a background thread"""
+
+    def __init__(self, corpus_dir: Path = DEFAULT_CORPUS, port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0, soft_404: bool = False,
+                 etags: bool = False):
+        self.corpus_dir = Path(corpus_dir)
+        self.soft_404 = soft_404
+        self.etags = etags
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _draw(self):
+        """Return (delay, error status or None) for one request"""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            status = None
+            if self.random.random() < self.error_rate:
+                self.errors += 1
+                status = self.random.choice((500, 429))
+        return delay, status
+
+    def page(self, path: str, query: dict):
+        """Return the body for a request path, or None if there is no such page"""
+        if path.endswith('cv_index.php'):
+            page = query.get('page', ['1'])[0]
+            file = self.corpus_dir / 'cv_index' / f"{page}.html"
+            # Past the last page the site serves a listing with no profiles
+            return file.read_bytes() if file.exists() else listing_page([], int(page)).encode('utf-8')
+        if path.endswith('cv.php') and query.get('id', [''])[0].isdigit():
+            file = self.corpus_dir / 'cv' / f"{query['id'][0]}.html"
+            if file.exists():
+                return file.read_bytes()
+            return SOFT_404_PAGE if self.soft_404 else None
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; without this Nagle adds ~40ms per response
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b'', headers: dict = None, head: bool = False):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+
+            def do_HEAD(self):
+                self.do_GET(head=True)
+
+            def do_GET(self, head: bool = False):
+                delay, error = server._draw()
+                if delay:
+                    time.sleep(delay)
+                if error == 429:
+                    self._send(429, headers={'Retry-After': '1'}, head=head)
+                    return
+                if error:
+                    self._send(error, head=head)
+                    return
+                url = urlparse(self.path)
+                body = server.page(url.path, parse_qs(url.query))
+                if body is None:
+                    self._send(404, head=head)
+                elif server.etags:
+                    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        self._send(304, headers={'ETag': etag}, head=True)
+                    else:
+                        self._send(200, body, headers={'ETag': etag}, head=head)
+                else:
+                    self._send(200, body, head=head)
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the benchmark corpus as a local muhasib.az stub")
+    parser.add_argument('--corpus', type=Path, default=DEFAULT_CORPUS, help="corpus directory")
+    parser.add_argument('--port', type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random delay of up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="fraction of requests answered with 500 or 429 (default: 0)")
+    parser.add_argument('--seed', type=int, default=0, help="seed for latency jitter and error injection")
+    parser.add_argument('--soft-404', action='store_true',
+                        help="answer unknown profile IDs with 200 and an empty page instead of 404")
+    parser.add_argument('--etags', action='store_true', help="send ETags and answer matching If-None-Match with 304")
+    args = parser.parse_args(argv)
+
+    ensure_corpus(args.corpus)
+    server = StubServer(args.corpus, args.port, args.latency, args.jitter, args.error_rate, args.seed,
+                        args.soft_404, args.etags)
+    print(f"Serving {args.corpus} at {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Aggregate cube that every chart in generate_charts.py is drawn from.
+
+One pass over the cleaned dataset groups it by city, position type,
+gender, marital status, age and salary, keeping the number of candidates
+and their salary sum per cell. Age and salary are kept at their exact
+values, the finest possible bins, so each chart can still apply its own
+binning and compute exact means and medians from the cube. The cube grows
+with the number of distinct combinations, not with the number of
+candidates.
+
+Cells are kept in the order their first candidate appears in the data,
+so counts taken from the cube tie-break exactly like value_counts() on
+the rows. The cube is cached as Parquet under .cache/, keyed by a hash of
+the source file.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+from dataset import CACHE_DIR, CHUNK_ROWS, file_hash, iter_source
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bump when the cube layout or the cleaning behind it changes, to invalidate cached cubes
+CUBE_VERSION = 1
+
+DIMENSIONS = ['city_clean', 'position_type', 'gender', 'marital_status', 'age', 'salary']
+# Source columns the dimensions are cleaned from; salary is parsed from min_salary
+SOURCE_COLUMNS = ['city', 'position', 'gender', 'marital_status', 'age', 'min_salary']
+
+
+def build_cube(df_clean: pd.DataFrame) -> pd.DataFrame:
+    """Count candidates and sum their salaries per combination of DIMENSIONS"""
+    frame = df_clean[DIMENSIONS].copy()
+    for column in ('city_clean', 'position_type', 'gender', 'marital_status'):
+        frame[column] = frame[column].astype(object)
+    frame['count'] = 1
+    cube = (frame.groupby(DIMENSIONS, sort=False, dropna=False)
+            .agg(count=('count', 'sum'), salary_sum=('salary', 'sum'))
+            .reset_index())
+    cube['count'] = cube['count'].astype('int64')
+    return cube
+
+
+def merge_cubes(cubes: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Combine cubes of disjoint row sets, keeping first-appearance order across them"""
+    import pandas as pd
+
+    combined = pd.concat(list(cubes), ignore_index=True)
+    return (combined.groupby(DIMENSIONS, sort=False, dropna=False)
+            .agg(count=('count', 'sum'), salary_sum=('salary_sum', 'sum'))
+            .reset_index())
+
+
+def build_cube_chunked(csv_path, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """Build the cube from the source file `chunk_rows` rows at a time, reading only SOURCE_COLUMNS"""
+    from generate_charts import clean_data
+
+    cube = None
+    for chunk in iter_source(csv_path, SOURCE_COLUMNS, chunk_rows):
+        partial = build_cube(clean_data(chunk))
+        cube = partial if cube is None else merge_cubes([cube, partial])
+    if cube is None:
+        raise ValueError(f"{csv_path} has no rows")
+    return cube
+
+
+def load_cube(csv_path='accountants.csv', cache_dir=CACHE_DIR, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """Load the cached cube for the source file, building it chunk by chunk if missing or stale"""
+    import pandas as pd
+
+    path = Path(csv_path)
+    cache_dir = Path(cache_dir)
+    cache_file = cache_dir / f"{path.stem}-{file_hash(path)[:16]}-cube-v{CUBE_VERSION}.parquet"
+    if cache_file.exists():
+        try:
+            return pd.read_parquet(cache_file)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable chart cube {cache_file}: {e}")
+
+    cube = build_cube_chunked(path, chunk_rows)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in cache_dir.glob(f"{path.stem}-*-cube-v*.parquet"):
+            stale.unlink()
+        cube.to_parquet(cache_file, index=False)
+    except ImportError:
+        logger.warning("pyarrow is not installed; the chart cube will not be cached")
+    return cube
+
+
+# ----------------------------------------------------------------------------
+# Slices used by the charts
+# ----------------------------------------------------------------------------
+def total(cube: pd.DataFrame) -> int:
+    """Number of candidates in the cube (len() of the underlying rows)"""
+    return int(cube['count'].sum())
+
+
+def value_counts(cube: pd.DataFrame, column: str) -> pd.Series:
+    """Candidates per value, most common first, equal to value_counts() on the rows"""
+    # value_counts() breaks ties by first appearance; a stable sort of first-appearance order does the same
+    counts = cube.groupby(column, sort=False)['count'].sum()
+    return counts.sort_values(ascending=False, kind='stable')
+
+
+def binned_counts(cube: pd.DataFrame, column: str, bins: Sequence, labels: Sequence[str]) -> pd.Series:
+    """Candidates per bin of a numeric column, in bin order, empty bins included"""
+    import pandas as pd
+
+    binned = pd.cut(cube[column], bins=bins, labels=labels, include_lowest=True)
+    return cube.groupby(binned, observed=False)['count'].sum()
+
+
+def salary_stats(cube: pd.DataFrame, by) -> pd.DataFrame:
+    """Exact mean, median and count of salary per group"""
+    import pandas as pd
+    from aggregates import QuantileSketch
+
+    rows = {}
+    for key, group in cube.groupby(by, observed=True):
+        salaries = group.dropna(subset=['salary'])
+        # A group has at most as many distinct salaries as cube rows, so the sketch stays exact
+        quantiles = QuantileSketch(max_exact=len(salaries))
+        quantiles.add_many(salaries['salary'], salaries['count'])
+        count = group['count'].sum()
+        rows[key] = {'mean': group['salary_sum'].sum() / count, 'median': quantiles.quantile(0.5), 'count': count}
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def crosstab(cube: pd.DataFrame, index: str, columns: str) -> pd.DataFrame:
+    """Candidate counts for every pair of values, like pd.crosstab on the rows"""
+    table = cube.pivot_table(index=index, columns=columns, values='count', aggfunc='sum', fill_value=0)
+    return table.astype('int64')
@@ -0,0 +1,78 @@
+"""
+Vectorized cleaning rules shared by the analysis and chart scripts.
+
+Every cleaner factorizes its column, works on the distinct values only
+(salary parsing with one vectorized str.extract, city and position
+classification with the rule tables) and maps the results back through
+the factorized codes, so the cost depends on the number of unique values
+rather than the number of rows. The substring rules are plain tables and
+can be overridden per call.
+"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# (label, substrings) pairs; the first rule with a matching substring wins
+Rules = Sequence[Tuple[str, Sequence[str]]]
+
+POSITION_RULES: Rules = [
+    ('Chief Accountant', ('baş mühasib', 'bas muhasib')),
+    ('Assistant Accountant', ('köməkçi', 'köməkçisi', 'komekci')),
+    ('Accountant', ('mühasib', 'muhasib')),
+    ('1C Operator', ('1c',)),
+    ('Economist', ('iqtisadçi', 'iqtisadci')),
+    ('Finance', ('maliyyə',)),
+]
+POSITION_DEFAULT = 'Other'
+
+CITY_RULES: Rules = [
+    ('Baku', ('bak',)),  # Bakı, Baki, Baku
+    ('Ganja', ('gəncə', 'gence')),
+    ('Sumqayit', ('sumq',)),
+]
+CITY_MISSING = 'Unknown'
+
+
+def extract_salary(min_salary: pd.Series) -> pd.Series:
+    """Parse the first number out of strings like "(AZN): 350"; 0 if there is none, NaN if missing"""
+    # Salary strings repeat heavily, so the regex runs over the distinct values only
+    codes, uniques = pd.factorize(min_salary)
+    text = pd.Series(uniques).astype('string')
+    parsed = pd.to_numeric(text.str.extract(r'(\d+)', expand=False), errors='coerce').fillna(0)
+    values = np.append(parsed.to_numpy(dtype='float64'), np.nan)
+    # Missing values are coded -1, which picks the trailing NaN
+    salary = pd.Series(values[codes], index=min_salary.index, name=min_salary.name)
+    if not salary.isna().any():
+        salary = salary.astype('int64')
+    return salary
+
+
+def classify(value: str, rules: Rules, default: str) -> str:
+    """Return the label of the first rule with a substring contained in `value`"""
+    for label, needles in rules:
+        if any(needle in value for needle in needles):
+            return label
+    return default
+
+
+def _map_unique(values: pd.Series, label_for, missing: str) -> pd.Series:
+    """Compute a label once per distinct value and broadcast it back to every row"""
+    codes, uniques = pd.factorize(values)
+    labels = np.array([label_for(value) for value in uniques] + [missing], dtype=object)
+    # Missing values are coded -1, which picks the trailing `missing` label
+    return pd.Series(labels[codes], index=values.index, name=values.name)
+
+
+def extract_position_type(position: pd.Series, rules: Rules = POSITION_RULES,
+                          default: str = POSITION_DEFAULT) -> pd.Series:
+    """Classify free-text positions into position types"""
+    return _map_unique(position, lambda value: classify(str(value).lower(), rules, default), default)
+
+
+def standardize_city(city: pd.Series, rules: Rules = CITY_RULES,
+                     missing: str = CITY_MISSING) -> pd.Series:
+    """Map spelling variants of the major cities to one name; other cities are only trimmed"""
+    return _map_unique(city, lambda value: classify(str(value).lower().strip(), rules, str(value).strip()),
+                       missing)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Persistent crawl state for the Muhasib.az scraper.
+
+Every profile ID gets a row recording its status (pending, done, failed),
+when it was last fetched, a hash of the page content, the HTTP validators
+(ETag / Last-Modified) and the last successfully parsed record. Rows are
+committed as soon as a profile finishes, so an interrupted run can be
+resumed without losing completed work.
+"""
+
+import json
+import sqlite3
+import time
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CrawlStateStore:
+    """SQLite-backed record of per-profile crawl progress"""
+
+    def __init__(self, path: str = 'crawl_state.sqlite'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS profiles (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                fetched_at REAL,
+                content_hash TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                record TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, accountant_id: str) -> Optional[Dict]:
+        """Return the stored state row for an ID, or None if it has never been seen"""
+        row = self.conn.execute('SELECT * FROM profiles WHERE id = ?', (accountant_id,)).fetchone()
+        return dict(row) if row else None
+
+    def mark_pending(self, accountant_ids: Iterable[str]):
+        """Register IDs without touching ones that already have a status"""
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO profiles (id, status) VALUES (?, ?)',
+                ((acc_id, PENDING) for acc_id in accountant_ids)
+            )
+
+    def mark_done(self, accountant_id: str, record: Dict, content_hash: str,
+                  etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Checkpoint a successfully scraped profile"""
+        with self.conn:
+            self.conn.execute('''
+                INSERT INTO profiles (id, status, fetched_at, content_hash, etag, last_modified, record, error, attempts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, NULL, 1)
+                ON CONFLICT(id) DO UPDATE SET
+                    status = excluded.status,
+                    fetched_at = excluded.fetched_at,
+                    content_hash = excluded.content_hash,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    record = excluded.record,
+                    error = NULL,
+                    attempts = profiles.attempts + 1
+            ''', (accountant_id, DONE, time.time(), content_hash, etag, last_modified,
+                  json.dumps(record, ensure_ascii=False)))
+
+    def mark_unchanged(self, accountant_id: str):
+        """Record that a revalidated profile has not changed since the last fetch"""
+        # The stored record is current again, even if a later fetch of it had failed
+        with self.conn:
+            self.conn.execute(
+                'UPDATE profiles SET status = ?, fetched_at = ?, error = NULL, attempts = attempts + 1 '
+                'WHERE id = ? AND record IS NOT NULL',
+                (DONE, time.time(), accountant_id)
+            )
+
+    def mark_failed(self, accountant_id: str, error: str):
+        """Record a failed fetch so the next run retries it"""
+        with self.conn:
+            self.conn.execute('''
+                INSERT INTO profiles (id, status, fetched_at, error, attempts)
+                VALUES (?, ?, ?, ?, 1)
+                ON CONFLICT(id) DO UPDATE SET
+                    status = excluded.status,
+                    fetched_at = excluded.fetched_at,
+                    error = excluded.error,
+                    attempts = profiles.attempts + 1
+            ''', (accountant_id, FAILED, time.time(), error))
+
+    def ids_with_status(self, status: str) -> Set[str]:
+        """Return all IDs currently in the given status"""
+        rows = self.conn.execute('SELECT id FROM profiles WHERE status = ?', (status,))
+        return {row['id'] for row in rows}
+
+    def done_records(self) -> Iterator[Dict]:
+        """Yield the stored records of every completed profile, in first-seen order"""
+        rows = self.conn.execute('SELECT record FROM profiles WHERE status = ? ORDER BY rowid', (DONE,))
+        for row in rows:
+            yield json.loads(row['record'])
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of IDs per status"""
+        rows = self.conn.execute('SELECT status, COUNT(*) AS n FROM profiles GROUP BY status')
+        return {row['status']: row['n'] for row in rows}
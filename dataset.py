@@ -0,0 +1,148 @@
+"""
+Typed, cached loading of the scraped accountants dataset.
+
+The query engine and generate_charts.prepare_data() start from
+load_accountants(). The CSV is read once with explicit dtypes: low-cardinality text columns
+become categoricals, age and the parsed minimum salary become numeric. The
+result is stored as Parquet under .cache/, keyed by a hash of the source
+file, and reused until the CSV changes.
+
+iter_source() reads the same typed rows in fixed-size chunks, optionally
+restricted to a few columns, for exports too large to hold in memory: a
+CSV is parsed CHUNK_ROWS rows at a time and a Parquet file is read batch
+by batch through a memory map.
+
+pandas is imported on first use so callers that only need file_hash()
+(e.g. up-to-date checks) stay fast.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional, Sequence
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path('.cache')
+# Bump when the typing or cleaning applied by the loader changes, to invalidate old caches
+CACHE_VERSION = 1
+
+CATEGORICAL_COLUMNS = ['city', 'gender', 'marital_status', 'category', 'position']
+NUMERIC_COLUMNS = ['id', 'age']
+TEXT_COLUMNS = ['phone', 'name', 'email', 'min_salary', 'education', 'experience', 'skills', 'url']
+# Rows per chunk in iter_source(); a chunk of every column takes about 100 MB while parsed
+CHUNK_ROWS = 50_000
+
+
+def file_hash(path) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _apply_types(df: pd.DataFrame) -> pd.DataFrame:
+    import pandas as pd
+    from cleaning import extract_salary
+
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            # Categories in first-appearance order keep value_counts() tie order as with object columns
+            values = df[column].astype(object)
+            df[column] = pd.Categorical(values, categories=pd.unique(values.dropna()))
+    if 'min_salary' in df.columns:
+        df['salary'] = extract_salary(df['min_salary']).rename('salary')
+    return df
+
+
+def read_source(path, start: int = 0) -> pd.DataFrame:
+    """Read and type the raw dataset from CSV (or a Parquet file written by the scraper)
+
+    With `start`, only the CSV rows from that byte offset (a row boundary,
+    e.g. the previous end of an appended file) are read.
+    """
+    import pandas as pd
+
+    path = Path(path)
+    if path.suffix == '.parquet':
+        return _apply_types(pd.read_parquet(path))
+    dtypes = {column: 'string' for column in CATEGORICAL_COLUMNS + TEXT_COLUMNS}
+    if not start:
+        return _apply_types(pd.read_csv(path, dtype=dtypes))
+    with open(path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return _apply_types(pd.read_csv(f, header=None, names=header, dtype=dtypes, encoding='utf-8'))
+
+
+def iter_source(path, columns: Optional[Sequence[str]] = None, chunk_rows: int = CHUNK_ROWS,
+                start: int = 0) -> Iterator[pd.DataFrame]:
+    """Read the typed dataset in chunks of at most `chunk_rows` rows, like read_source()
+
+    `columns` limits the source columns that are parsed at all; the
+    derived salary column comes with min_salary. Categories are in
+    first-appearance order within each chunk.
+    """
+    import pandas as pd
+
+    path = Path(path)
+    columns = list(columns) if columns is not None else None
+    if path.suffix == '.parquet':
+        import pyarrow.parquet as pq
+
+        source = pq.ParquetFile(path, memory_map=True)
+        for batch in source.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield _apply_types(batch.to_pandas())
+        return
+
+    dtypes = {column: 'string' for column in CATEGORICAL_COLUMNS + TEXT_COLUMNS
+              if columns is None or column in columns}
+    with open(path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    with open(path, 'rb') as f:
+        if start:
+            f.seek(start)
+            options = {'header': None, 'names': header}
+        else:
+            options = {}
+        for chunk in pd.read_csv(f, usecols=columns, dtype=dtypes, encoding='utf-8', chunksize=chunk_rows, **options):
+            yield _apply_types(chunk)
+
+
+def load_accountants(path='accountants.csv', cache_dir=CACHE_DIR) -> pd.DataFrame:
+    """Load the typed dataset, reusing the Parquet cache while the source file is unchanged"""
+    import pandas as pd
+
+    path = Path(path)
+    cache_dir = Path(cache_dir)
+    source_hash = file_hash(path)
+    cache_file = cache_dir / f"{path.stem}-{source_hash[:16]}-v{CACHE_VERSION}.parquet"
+
+    if cache_file.exists():
+        try:
+            return pd.read_parquet(cache_file)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable dataset cache {cache_file}: {e}")
+
+    df = read_source(path)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Drop caches built from earlier versions of the same source file
+        for stale in cache_dir.glob(f"{path.stem}-*.parquet"):
+            stale.unlink()
+        df.to_parquet(cache_file, index=False)
+    except ImportError:
+        logger.warning("pyarrow is not installed; the typed dataset will not be cached")
+    return df
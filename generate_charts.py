@@ -1,328 +1,537 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
-import re
+from __future__ import annotations
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional
+
+import chart_cube
+from dataset import CHUNK_ROWS, file_hash
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas, numpy, matplotlib and seaborn are imported on first render (see
+# import_plotting), so the up-to-date check can finish without loading them
+pd = np = plt = sns = None
 
-# Set style for professional business charts
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (12, 7)
-plt.rcParams['font.size'] = 11
 colors = ['#2E86AB', '#A23B72', '#F18F01', '#C73E1D', '#6A994E']
+FORMATS = ('png', 'svg')
+MANIFEST_NAME = '.manifest.json'
+
+SALARY_BINS = [0, 300, 500, 700, 1000, 1500, 2000, 3600]
+SALARY_LABELS = ['<300', '300-500', '500-700', '700-1000', '1000-1500', '1500-2000', '2000+']
+AGE_BINS = [18, 25, 30, 35, 40, 45, 50, 55, 70]
+AGE_LABELS = ['18-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54', '55+']
+AGE_TREND_BINS = [18, 25, 30, 35, 40, 45, 50, 70]
+AGE_TREND_LABELS = ['18-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50+']
+# Position types with fewer candidates are left out of the per-position charts
+MIN_GROUP_SIZE = 10
+
+
+class Chart(NamedTuple):
+    name: str
+    title: str
+    draw: Callable[[pd.DataFrame], None]
+    columns: List[str]
+    params: Dict
+
+
+# Chart name (also the output file stem) -> Chart, in rendering order
+CHARTS: Dict[str, Chart] = {}
+
+
+def register_chart(name: str, title: str, columns: List[str], params: Optional[Dict] = None):
+    """Register a function that draws one chart onto the current pyplot figure
+
+    The function receives the aggregate cube (chart_cube.py), not rows.
+    `columns` lists the cube dimensions the chart reads and `params` its
+    tunable settings; both feed the chart's fingerprint.
+    """
+    def decorator(draw):
+        CHARTS[name] = Chart(name, title, draw, columns, params or {})
+        return draw
+    return decorator
+
+
+def import_plotting():
+    """Import the data and plotting libraries into this module on first use"""
+    global pd, np, plt, sns
+    if plt is not None:
+        return
+    import matplotlib
+    matplotlib.use('Agg')  # Render off-screen, also inside worker processes
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    import numpy as np
+
+
+def apply_style():
+    import_plotting()
+    # Set style for professional business charts
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.figsize'] = (12, 7)
+    plt.rcParams['font.size'] = 11
+
+
+def prepare_data(csv_path: str = 'accountants.csv') -> pd.DataFrame:
+    """Load the typed dataset and derive the cleaned columns every chart reads"""
+    from dataset import load_accountants
+
+    # The numeric salary column is parsed from min_salary by the loader
+    return clean_data(load_accountants(csv_path))
+
+
+def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop age outliers and add position_type and city_clean; works on any chunk of rows"""
+    from cleaning import extract_position_type, standardize_city
+
+    # Clean age data (remove outliers)
+    df_clean = df[(df['age'] >= 18) & (df['age'] <= 70)].copy()
+
+    # Classify positions and standardize city names (rules live in cleaning.py)
+    df_clean['position_type'] = extract_position_type(df_clean['position'])
+    df_clean['city_clean'] = standardize_city(df_clean['city'])
+    return df_clean
 
-# Load and clean data
-df = pd.read_csv('accountants.csv')
-
-# Clean salary column
-def extract_salary(salary_str):
-    if pd.isna(salary_str):
-        return np.nan
-    match = re.search(r'(\d+)', str(salary_str))
-    if match:
-        return int(match.group(1))
-    return 0
-
-df['salary'] = df['min_salary'].apply(extract_salary)
-
-# Clean age data (remove outliers)
-df_clean = df[(df['age'] >= 18) & (df['age'] <= 70)].copy()
-
-# Extract position type from position column
-def extract_position_type(position_str):
-    if pd.isna(position_str):
-        return 'Other'
-    position_lower = str(position_str).lower()
-    if 'baş mühasib' in position_lower or 'bas muhasib' in position_lower:
-        return 'Chief Accountant'
-    elif 'köməkçi' in position_lower or 'köməkçisi' in position_lower or 'komekci' in position_lower:
-        return 'Assistant Accountant'
-    elif 'mühasib' in position_lower or 'muhasib' in position_lower:
-        return 'Accountant'
-    elif '1c' in position_lower:
-        return '1C Operator'
-    elif 'iqtisadçi' in position_lower or 'iqtisadci' in position_lower:
-        return 'Economist'
-    elif 'maliyyə' in position_lower:
-        return 'Finance'
-    else:
-        return 'Other'
-
-df_clean['position_type'] = df_clean['position'].apply(extract_position_type)
-
-# Standardize city names
-def standardize_city(city_str):
-    if pd.isna(city_str):
-        return 'Unknown'
-    city_lower = str(city_str).lower().strip()
-    if 'bak' in city_lower:  # Bakı, Baki, Baku
-        return 'Baku'
-    elif 'gəncə' in city_lower or 'gence' in city_lower:
-        return 'Ganja'
-    elif 'sumq' in city_lower:
-        return 'Sumqayit'
-    else:
-        return city_str.strip()
-
-df_clean['city_clean'] = df_clean['city'].apply(standardize_city)
-
-# Create charts directory
-Path('charts').mkdir(exist_ok=True)
-
-print("Generating business insights charts...")
 
 # ============================================================================
 # CHART 1: Talent Pool Distribution by Gender
 # ============================================================================
-plt.figure(figsize=(10, 6))
-gender_counts = df_clean[df_clean['gender'].isin(['Kişi', 'Qadın'])]['gender'].value_counts()
-gender_labels = ['Male', 'Female']
-bars = plt.bar(gender_labels, [gender_counts.get('Kişi', 0), gender_counts.get('Qadın', 0)],
-               color=[colors[0], colors[1]], edgecolor='black', linewidth=1.2)
-
-# Add value labels on bars
-for bar in bars:
-    height = bar.get_height()
-    plt.text(bar.get_x() + bar.get_width()/2., height,
-             f'{int(height)}\n({int(height/sum(gender_counts)*100)}%)',
-             ha='center', va='bottom', fontsize=12, fontweight='bold')
-
-plt.title('Talent Pool Distribution by Gender', fontsize=16, fontweight='bold', pad=20)
-plt.ylabel('Number of Candidates', fontsize=12, fontweight='bold')
-plt.xlabel('Gender', fontsize=12, fontweight='bold')
-plt.tight_layout()
-plt.savefig('charts/01_gender_distribution.png', dpi=300, bbox_inches='tight')
-plt.close()
+@register_chart('01_gender_distribution', 'Gender Distribution',
+                columns=['gender'])
+def gender_distribution(cube):
+    plt.figure(figsize=(10, 6))
+    gender_counts = chart_cube.value_counts(cube[cube['gender'].isin(['Kişi', 'Qadın'])], 'gender')
+    gender_labels = ['Male', 'Female']
+    bars = plt.bar(gender_labels, [gender_counts.get('Kişi', 0), gender_counts.get('Qadın', 0)],
+                   color=[colors[0], colors[1]], edgecolor='black', linewidth=1.2)
+
+    # Add value labels on bars
+    for bar in bars:
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2., height,
+                 f'{int(height)}\n({int(height/sum(gender_counts)*100)}%)',
+                 ha='center', va='bottom', fontsize=12, fontweight='bold')
+
+    plt.title('Talent Pool Distribution by Gender', fontsize=16, fontweight='bold', pad=20)
+    plt.ylabel('Number of Candidates', fontsize=12, fontweight='bold')
+    plt.xlabel('Gender', fontsize=12, fontweight='bold')
+    plt.tight_layout()
 
 # ============================================================================
 # CHART 2: Geographic Concentration - Top 10 Cities
 # ============================================================================
-plt.figure(figsize=(12, 7))
-top_cities = df_clean['city_clean'].value_counts().head(10)
-bars = plt.barh(range(len(top_cities)), top_cities.values, color=colors[0], edgecolor='black', linewidth=1.2)
-plt.yticks(range(len(top_cities)), top_cities.index, fontsize=11)
-
-# Add value labels
-for i, (bar, value) in enumerate(zip(bars, top_cities.values)):
-    plt.text(value + 5, i, f'{value} ({value/len(df_clean)*100:.1f}%)',
-             va='center', fontsize=10, fontweight='bold')
-
-plt.title('Geographic Distribution of Accounting Talent', fontsize=16, fontweight='bold', pad=20)
-plt.xlabel('Number of Candidates', fontsize=12, fontweight='bold')
-plt.ylabel('City', fontsize=12, fontweight='bold')
-plt.tight_layout()
-plt.savefig('charts/02_geographic_distribution.png', dpi=300, bbox_inches='tight')
-plt.close()
+@register_chart('02_geographic_distribution', 'Geographic Distribution',
+                columns=['city_clean'])
+def geographic_distribution(cube):
+    plt.figure(figsize=(12, 7))
+    top_cities = chart_cube.value_counts(cube, 'city_clean').head(10)
+    bars = plt.barh(range(len(top_cities)), top_cities.values, color=colors[0], edgecolor='black', linewidth=1.2)
+    plt.yticks(range(len(top_cities)), top_cities.index, fontsize=11)
+
+    # Add value labels
+    for i, (bar, value) in enumerate(zip(bars, top_cities.values)):
+        plt.text(value + 5, i, f'{value} ({value/chart_cube.total(cube)*100:.1f}%)',
+                 va='center', fontsize=10, fontweight='bold')
+
+    plt.title('Geographic Distribution of Accounting Talent', fontsize=16, fontweight='bold', pad=20)
+    plt.xlabel('Number of Candidates', fontsize=12, fontweight='bold')
+    plt.ylabel('City', fontsize=12, fontweight='bold')
+    plt.tight_layout()
 
 # ============================================================================
 # CHART 3: Salary Distribution Analysis
 # ============================================================================
-plt.figure(figsize=(14, 7))
-salary_filtered = df_clean[df_clean['salary'] > 0]['salary']
-
-# Create salary bins
-bins = [0, 300, 500, 700, 1000, 1500, 2000, 3600]
-labels = ['<300', '300-500', '500-700', '700-1000', '1000-1500', '1500-2000', '2000+']
-salary_binned = pd.cut(salary_filtered, bins=bins, labels=labels, include_lowest=True)
-salary_counts = salary_binned.value_counts().sort_index()
-
-bars = plt.bar(range(len(salary_counts)), salary_counts.values,
-               color=colors[2], edgecolor='black', linewidth=1.2)
-plt.xticks(range(len(salary_counts)), salary_counts.index, rotation=0)
-
-# Add value labels
-for bar in bars:
-    height = bar.get_height()
-    plt.text(bar.get_x() + bar.get_width()/2., height,
-             f'{int(height)}\n({int(height/len(salary_filtered)*100)}%)',
-             ha='center', va='bottom', fontsize=10, fontweight='bold')
-
-plt.title('Salary Expectations Distribution (AZN Monthly)', fontsize=16, fontweight='bold', pad=20)
-plt.xlabel('Salary Range (AZN)', fontsize=12, fontweight='bold')
-plt.ylabel('Number of Candidates', fontsize=12, fontweight='bold')
-plt.axhline(y=salary_counts.mean(), color='red', linestyle='--', linewidth=2, label=f'Average: {salary_counts.mean():.0f} candidates')
-plt.legend()
-plt.tight_layout()
-plt.savefig('charts/03_salary_distribution.png', dpi=300, bbox_inches='tight')
-plt.close()
+@register_chart('03_salary_distribution', 'Salary Distribution',
+                columns=['salary'],
+                params={'bins': SALARY_BINS, 'labels': SALARY_LABELS})
+def salary_distribution(cube):
+    plt.figure(figsize=(14, 7))
+    salary_filtered = cube[cube['salary'] > 0]
+
+    # Create salary bins
+    salary_counts = chart_cube.binned_counts(salary_filtered, 'salary', SALARY_BINS, SALARY_LABELS)
+
+    bars = plt.bar(range(len(salary_counts)), salary_counts.values,
+                   color=colors[2], edgecolor='black', linewidth=1.2)
+    plt.xticks(range(len(salary_counts)), salary_counts.index, rotation=0)
+
+    # Add value labels
+    for bar in bars:
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2., height,
+                 f'{int(height)}\n({int(height/chart_cube.total(salary_filtered)*100)}%)',
+                 ha='center', va='bottom', fontsize=10, fontweight='bold')
+
+    plt.title('Salary Expectations Distribution (AZN Monthly)', fontsize=16, fontweight='bold', pad=20)
+    plt.xlabel('Salary Range (AZN)', fontsize=12, fontweight='bold')
+    plt.ylabel('Number of Candidates', fontsize=12, fontweight='bold')
+    plt.axhline(y=salary_counts.mean(), color='red', linestyle='--', linewidth=2, label=f'Average: {salary_counts.mean():.0f} candidates')
+    plt.legend()
+    plt.tight_layout()
 
 # ============================================================================
 # CHART 4: Age Distribution of Talent Pool
 # ============================================================================
-plt.figure(figsize=(14, 7))
-age_bins = [18, 25, 30, 35, 40, 45, 50, 55, 70]
-age_labels = ['18-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54', '55+']
-age_binned = pd.cut(df_clean['age'], bins=age_bins, labels=age_labels, include_lowest=True)
-age_counts = age_binned.value_counts().sort_index()
-
-bars = plt.bar(range(len(age_counts)), age_counts.values,
-               color=colors[3], edgecolor='black', linewidth=1.2)
-plt.xticks(range(len(age_counts)), age_counts.index, rotation=45)
-
-# Add value labels
-for bar in bars:
-    height = bar.get_height()
-    plt.text(bar.get_x() + bar.get_width()/2., height,
-             f'{int(height)}',
-             ha='center', va='bottom', fontsize=10, fontweight='bold')
-
-plt.title('Age Distribution of Accounting Professionals', fontsize=16, fontweight='bold', pad=20)
-plt.xlabel('Age Range', fontsize=12, fontweight='bold')
-plt.ylabel('Number of Candidates', fontsize=12, fontweight='bold')
-plt.tight_layout()
-plt.savefig('charts/04_age_distribution.png', dpi=300, bbox_inches='tight')
-plt.close()
+@register_chart('04_age_distribution', 'Age Distribution',
+                columns=['age'],
+                params={'bins': AGE_BINS, 'labels': AGE_LABELS})
+def age_distribution(cube):
+    plt.figure(figsize=(14, 7))
+    age_counts = chart_cube.binned_counts(cube, 'age', AGE_BINS, AGE_LABELS)
+
+    bars = plt.bar(range(len(age_counts)), age_counts.values,
+                   color=colors[3], edgecolor='black', linewidth=1.2)
+    plt.xticks(range(len(age_counts)), age_counts.index, rotation=45)
+
+    # Add value labels
+    for bar in bars:
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2., height,
+                 f'{int(height)}',
+                 ha='center', va='bottom', fontsize=10, fontweight='bold')
+
+    plt.title('Age Distribution of Accounting Professionals', fontsize=16, fontweight='bold', pad=20)
+    plt.xlabel('Age Range', fontsize=12, fontweight='bold')
+    plt.ylabel('Number of Candidates', fontsize=12, fontweight='bold')
+    plt.tight_layout()
 
 # ============================================================================
 # CHART 5: Salary Expectations by Position Type
 # ============================================================================
-plt.figure(figsize=(14, 7))
-position_salary = df_clean[df_clean['salary'] > 0].groupby('position_type')['salary'].agg(['mean', 'median', 'count'])
-position_salary = position_salary[position_salary['count'] >= 10].sort_values('mean', ascending=True)
-
-x = np.arange(len(position_salary))
-width = 0.35
-
-bars1 = plt.barh(x - width/2, position_salary['mean'], width, label='Average',
-                 color=colors[0], edgecolor='black', linewidth=1.2)
-bars2 = plt.barh(x + width/2, position_salary['median'], width, label='Median',
-                 color=colors[1], edgecolor='black', linewidth=1.2)
-
-plt.yticks(x, position_salary.index, fontsize=11)
-plt.xlabel('Salary (AZN)', fontsize=12, fontweight='bold')
-plt.ylabel('Position Type', fontsize=12, fontweight='bold')
-plt.title('Salary Expectations by Position Type', fontsize=16, fontweight='bold', pad=20)
-plt.legend(fontsize=11)
-
-# Add value labels
-for bars in [bars1, bars2]:
-    for bar in bars:
-        width_val = bar.get_width()
-        plt.text(width_val + 20, bar.get_y() + bar.get_height()/2.,
-                 f'{int(width_val)}',
-                 va='center', fontsize=9, fontweight='bold')
+@register_chart('05_salary_by_position', 'Salary by Position Type',
+                columns=['position_type', 'salary'],
+                params={'min_count': MIN_GROUP_SIZE})
+def salary_by_position(cube):
+    plt.figure(figsize=(14, 7))
+    position_salary = chart_cube.salary_stats(cube[cube['salary'] > 0], 'position_type')
+    position_salary = position_salary[position_salary['count'] >= MIN_GROUP_SIZE].sort_values('mean', ascending=True)
+
+    x = np.arange(len(position_salary))
+    width = 0.35
+
+    bars1 = plt.barh(x - width/2, position_salary['mean'], width, label='Average',
+                     color=colors[0], edgecolor='black', linewidth=1.2)
+    bars2 = plt.barh(x + width/2, position_salary['median'], width, label='Median',
+                     color=colors[1], edgecolor='black', linewidth=1.2)
+
+    plt.yticks(x, position_salary.index, fontsize=11)
+    plt.xlabel('Salary (AZN)', fontsize=12, fontweight='bold')
+    plt.ylabel('Position Type', fontsize=12, fontweight='bold')
+    plt.title('Salary Expectations by Position Type', fontsize=16, fontweight='bold', pad=20)
+    plt.legend(fontsize=11)
+
+    # Add value labels
+    for bars in [bars1, bars2]:
+        for bar in bars:
+            width_val = bar.get_width()
+            plt.text(width_val + 20, bar.get_y() + bar.get_height()/2.,
+                     f'{int(width_val)}',
+                     va='center', fontsize=9, fontweight='bold')
 
-plt.tight_layout()
-plt.savefig('charts/05_salary_by_position.png', dpi=300, bbox_inches='tight')
-plt.close()
+    plt.tight_layout()
 
 # ============================================================================
 # CHART 6: Availability by Marital Status
 # ============================================================================
-plt.figure(figsize=(10, 6))
-marital_counts = df_clean[df_clean['marital_status'].isin(['Subay', 'Ailəli'])]['marital_status'].value_counts()
-marital_labels = ['Single', 'Married']
-values = [marital_counts.get('Subay', 0), marital_counts.get('Ailəli', 0)]
-bars = plt.bar(marital_labels, values, color=[colors[4], colors[2]],
-               edgecolor='black', linewidth=1.2)
-
-# Add value labels
-for bar in bars:
-    height = bar.get_height()
-    plt.text(bar.get_x() + bar.get_width()/2., height,
-             f'{int(height)}\n({int(height/sum(values)*100)}%)',
-             ha='center', va='bottom', fontsize=12, fontweight='bold')
-
-plt.title('Candidate Availability by Marital Status', fontsize=16, fontweight='bold', pad=20)
-plt.ylabel('Number of Candidates', fontsize=12, fontweight='bold')
-plt.xlabel('Marital Status', fontsize=12, fontweight='bold')
-plt.tight_layout()
-plt.savefig('charts/06_marital_status.png', dpi=300, bbox_inches='tight')
-plt.close()
+@register_chart('06_marital_status', 'Marital Status Distribution',
+                columns=['marital_status'])
+def marital_status(cube):
+    plt.figure(figsize=(10, 6))
+    marital_counts = chart_cube.value_counts(cube[cube['marital_status'].isin(['Subay', 'Ailəli'])], 'marital_status')
+    marital_labels = ['Single', 'Married']
+    values = [marital_counts.get('Subay', 0), marital_counts.get('Ailəli', 0)]
+    bars = plt.bar(marital_labels, values, color=[colors[4], colors[2]],
+                   edgecolor='black', linewidth=1.2)
+
+    # Add value labels
+    for bar in bars:
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2., height,
+                 f'{int(height)}\n({int(height/sum(values)*100)}%)',
+                 ha='center', va='bottom', fontsize=12, fontweight='bold')
+
+    plt.title('Candidate Availability by Marital Status', fontsize=16, fontweight='bold', pad=20)
+    plt.ylabel('Number of Candidates', fontsize=12, fontweight='bold')
+    plt.xlabel('Marital Status', fontsize=12, fontweight='bold')
+    plt.tight_layout()
 
 # ============================================================================
 # CHART 7: Position Type Distribution in Market
 # ============================================================================
-plt.figure(figsize=(12, 7))
-position_dist = df_clean['position_type'].value_counts()
-bars = plt.barh(range(len(position_dist)), position_dist.values,
-                color=colors[0], edgecolor='black', linewidth=1.2)
-plt.yticks(range(len(position_dist)), position_dist.index, fontsize=11)
-
-# Add value labels
-for i, (bar, value) in enumerate(zip(bars, position_dist.values)):
-    plt.text(value + 3, i, f'{value} ({value/len(df_clean)*100:.1f}%)',
-             va='center', fontsize=10, fontweight='bold')
-
-plt.title('Talent Pool Composition by Role', fontsize=16, fontweight='bold', pad=20)
-plt.xlabel('Number of Candidates', fontsize=12, fontweight='bold')
-plt.ylabel('Position Type', fontsize=12, fontweight='bold')
-plt.tight_layout()
-plt.savefig('charts/07_position_type_distribution.png', dpi=300, bbox_inches='tight')
-plt.close()
+@register_chart('07_position_type_distribution', 'Position Type Distribution',
+                columns=['position_type'])
+def position_type_distribution(cube):
+    plt.figure(figsize=(12, 7))
+    position_dist = chart_cube.value_counts(cube, 'position_type')
+    bars = plt.barh(range(len(position_dist)), position_dist.values,
+                    color=colors[0], edgecolor='black', linewidth=1.2)
+    plt.yticks(range(len(position_dist)), position_dist.index, fontsize=11)
+
+    # Add value labels
+    for i, (bar, value) in enumerate(zip(bars, position_dist.values)):
+        plt.text(value + 3, i, f'{value} ({value/chart_cube.total(cube)*100:.1f}%)',
+                 va='center', fontsize=10, fontweight='bold')
+
+    plt.title('Talent Pool Composition by Role', fontsize=16, fontweight='bold', pad=20)
+    plt.xlabel('Number of Candidates', fontsize=12, fontweight='bold')
+    plt.ylabel('Position Type', fontsize=12, fontweight='bold')
+    plt.tight_layout()
 
 # ============================================================================
 # CHART 8: Salary vs Age Analysis
 # ============================================================================
-plt.figure(figsize=(14, 7))
-age_salary = df_clean[df_clean['salary'] > 0].groupby(pd.cut(df_clean[df_clean['salary'] > 0]['age'],
-                                                               bins=[18, 25, 30, 35, 40, 45, 50, 70],
-                                                               labels=['18-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50+']))['salary'].mean()
-
-plt.plot(range(len(age_salary)), age_salary.values, marker='o', linewidth=3,
-         markersize=10, color=colors[0], markerfacecolor=colors[1], markeredgewidth=2, markeredgecolor=colors[0])
-plt.xticks(range(len(age_salary)), age_salary.index, rotation=45)
-
-# Add value labels
-for i, value in enumerate(age_salary.values):
-    plt.text(i, value + 30, f'{int(value)} AZN',
-             ha='center', fontsize=10, fontweight='bold')
-
-plt.title('Average Salary Expectations by Age Group', fontsize=16, fontweight='bold', pad=20)
-plt.xlabel('Age Range', fontsize=12, fontweight='bold')
-plt.ylabel('Average Salary (AZN)', fontsize=12, fontweight='bold')
-plt.grid(True, alpha=0.3)
-plt.tight_layout()
-plt.savefig('charts/08_salary_vs_age.png', dpi=300, bbox_inches='tight')
-plt.close()
+@register_chart('08_salary_vs_age', 'Salary vs Age Trends',
+                columns=['age', 'salary'],
+                params={'bins': AGE_TREND_BINS, 'labels': AGE_TREND_LABELS})
+def salary_vs_age(cube):
+    plt.figure(figsize=(14, 7))
+    paid = cube[cube['salary'] > 0]
+    age_salary = chart_cube.salary_stats(paid, pd.cut(paid['age'], bins=AGE_TREND_BINS, labels=AGE_TREND_LABELS))['mean']
+
+    plt.plot(range(len(age_salary)), age_salary.values, marker='o', linewidth=3,
+             markersize=10, color=colors[0], markerfacecolor=colors[1], markeredgewidth=2, markeredgecolor=colors[0])
+    plt.xticks(range(len(age_salary)), age_salary.index, rotation=45)
+
+    # Add value labels
+    for i, value in enumerate(age_salary.values):
+        plt.text(i, value + 30, f'{int(value)} AZN',
+                 ha='center', fontsize=10, fontweight='bold')
+
+    plt.title('Average Salary Expectations by Age Group', fontsize=16, fontweight='bold', pad=20)
+    plt.xlabel('Age Range', fontsize=12, fontweight='bold')
+    plt.ylabel('Average Salary (AZN)', fontsize=12, fontweight='bold')
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
 
 # ============================================================================
 # CHART 9: Gender Distribution by Position Type
 # ============================================================================
-plt.figure(figsize=(14, 7))
-gender_position = pd.crosstab(df_clean[df_clean['gender'].isin(['Kişi', 'Qadın'])]['position_type'],
-                               df_clean[df_clean['gender'].isin(['Kişi', 'Qadın'])]['gender'])
-gender_position = gender_position[gender_position.sum(axis=1) >= 10].sort_values('Kişi', ascending=True)
-
-x = np.arange(len(gender_position))
-width = 0.35
-
-bars1 = plt.barh(x - width/2, gender_position['Kişi'], width, label='Male',
-                 color=colors[0], edgecolor='black', linewidth=1.2)
-bars2 = plt.barh(x + width/2, gender_position['Qadın'], width, label='Female',
-                 color=colors[1], edgecolor='black', linewidth=1.2)
-
-plt.yticks(x, gender_position.index, fontsize=11)
-plt.xlabel('Number of Candidates', fontsize=12, fontweight='bold')
-plt.ylabel('Position Type', fontsize=12, fontweight='bold')
-plt.title('Gender Distribution Across Position Types', fontsize=16, fontweight='bold', pad=20)
-plt.legend(fontsize=11)
-
-# Add value labels
-for bars in [bars1, bars2]:
-    for bar in bars:
-        width_val = bar.get_width()
-        if width_val > 0:
-            plt.text(width_val + 2, bar.get_y() + bar.get_height()/2.,
-                     f'{int(width_val)}',
-                     va='center', fontsize=9, fontweight='bold')
+@register_chart('09_gender_by_position', 'Gender Distribution by Position',
+                columns=['position_type', 'gender'],
+                params={'min_count': MIN_GROUP_SIZE})
+def gender_by_position(cube):
+    plt.figure(figsize=(14, 7))
+    gender_position = chart_cube.crosstab(cube[cube['gender'].isin(['Kişi', 'Qadın'])], 'position_type', 'gender')
+    gender_position = gender_position[gender_position.sum(axis=1) >= MIN_GROUP_SIZE].sort_values('Kişi', ascending=True)
+
+    x = np.arange(len(gender_position))
+    width = 0.35
+
+    bars1 = plt.barh(x - width/2, gender_position['Kişi'], width, label='Male',
+                     color=colors[0], edgecolor='black', linewidth=1.2)
+    bars2 = plt.barh(x + width/2, gender_position['Qadın'], width, label='Female',
+                     color=colors[1], edgecolor='black', linewidth=1.2)
+
+    plt.yticks(x, gender_position.index, fontsize=11)
+    plt.xlabel('Number of Candidates', fontsize=12, fontweight='bold')
+    plt.ylabel('Position Type', fontsize=12, fontweight='bold')
+    plt.title('Gender Distribution Across Position Types', fontsize=16, fontweight='bold', pad=20)
+    plt.legend(fontsize=11)
+
+    # Add value labels
+    for bars in [bars1, bars2]:
+        for bar in bars:
+            width_val = bar.get_width()
+            if width_val > 0:
+                plt.text(width_val + 2, bar.get_y() + bar.get_height()/2.,
+                         f'{int(width_val)}',
+                         va='center', fontsize=9, fontweight='bold')
+
+    plt.tight_layout()
+
+# ============================================================================
+# Rendering
+# ============================================================================
+_worker_data: Optional[pd.DataFrame] = None
+
 
-plt.tight_layout()
-plt.savefig('charts/09_gender_by_position.png', dpi=300, bbox_inches='tight')
-plt.close()
-
-print("\n" + "="*60)
-print("CHART GENERATION COMPLETE")
-print("="*60)
-print(f"\n9 business insight charts generated in 'charts/' directory")
-print("\nGenerated charts:")
-print("  1. Gender Distribution")
-print("  2. Geographic Distribution")
-print("  3. Salary Distribution")
-print("  4. Age Distribution")
-print("  5. Salary by Position Type")
-print("  6. Marital Status Distribution")
-print("  7. Position Type Distribution")
-print("  8. Salary vs Age Trends")
-print("  9. Gender Distribution by Position")
-print("\nAll charts saved as high-resolution PNG files (300 DPI)")
+def _init_worker(cube: pd.DataFrame):
+    # Each worker process receives the cube once, not once per chart
+    global _worker_data
+    _worker_data = cube
+    apply_style()
+
+
+def render_chart(name: str, cube: pd.DataFrame, output_dir: str = 'charts',
+                 dpi: int = 300, fmt: str = 'png') -> str:
+    """Draw one registered chart and save it as <output_dir>/<name>.<fmt>"""
+    CHARTS[name].draw(cube)
+    path = str(Path(output_dir) / f"{name}.{fmt}")
+    plt.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close()
+    return path
+
+
+def _render_in_worker(name: str, output_dir: str, dpi: int, fmt: str) -> str:
+    return render_chart(name, _worker_data, output_dir, dpi, fmt)
+
+
+def render_charts(names: List[str], cube: pd.DataFrame, output_dir: str = 'charts',
+                  dpi: int = 300, fmt: str = 'png', workers: Optional[int] = None) -> List[str]:
+    """Render the named charts, in parallel across a process pool when workers > 1"""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, len(names))
+    if workers <= 1:
+        apply_style()
+        return [render_chart(name, cube, output_dir, dpi, fmt) for name in names]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cube,)) as pool:
+        futures = [pool.submit(_render_in_worker, name, output_dir, dpi, fmt) for name in names]
+        return [future.result() for future in futures]
+
+
+def resolve_chart_names(selection: Optional[List[str]]) -> List[str]:
+    """Map chart names or numbers (e.g. "05", "5" or "05_salary_by_position") to registry names"""
+    if not selection:
+        return list(CHARTS)
+    names = []
+    for item in selection:
+        for part in item.split(','):
+            part = part.strip()
+            matches = [name for name in CHARTS
+                       if name == part or (part.isdigit() and int(name.split('_')[0]) == int(part))]
+            if not matches:
+                raise SystemExit(f"Unknown chart '{part}'. Available: {', '.join(CHARTS)}")
+            names.extend(match for match in matches if match not in names)
+    return names
+
+
+# ============================================================================
+# Incremental regeneration
+# ============================================================================
+def output_path(name: str, output_dir: str, fmt: str) -> Path:
+    return Path(output_dir) / f"{name}.{fmt}"
+
+
+def params_fingerprint(name: str, dpi: int, fmt: str) -> str:
+    """Hash of everything about a chart except its data: drawing code, style, params, colours, DPI"""
+    chart = CHARTS[name]
+    payload = {
+        'code': inspect.getsource(chart.draw),
+        'style': inspect.getsource(apply_style),
+        'params': chart.params,
+        'colors': colors,
+        'dpi': dpi,
+        'format': fmt,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def data_fingerprint(name: str, cube: pd.DataFrame) -> str:
+    """Hash of the cube's counts over the dimensions a chart reads, so unrelated data changes do not trigger a re-render"""
+    import pandas as pd
+
+    # First-appearance order is kept, since it decides ties in the charts' rankings
+    marginal = cube.groupby(CHARTS[name].columns, sort=False, dropna=False)['count'].sum().reset_index()
+    hashes = pd.util.hash_pandas_object(marginal, index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+
+def load_manifest(output_dir: str) -> Dict:
+    try:
+        with open(Path(output_dir) / MANIFEST_NAME, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir: str, manifest: Dict):
+    path = Path(output_dir) / MANIFEST_NAME
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    tmp_path.replace(path)
+
+
+def plan_charts(names: List[str], csv_path: str, output_dir: str, dpi: int, fmt: str,
+                force: bool = False, chunk_rows: int = CHUNK_ROWS):
+    """Work out which charts need rendering, loading the data only if the cheap checks fail
+
+    Returns (stale chart names, aggregate cube or None, updated manifest).
+    """
+    source_hash = file_hash(csv_path)
+    manifest = {} if force else load_manifest(output_dir)
+    entries = manifest.setdefault('charts', {})
+    params = {name: params_fingerprint(name, dpi, fmt) for name in names}
+
+    def unchanged(name: str) -> bool:
+        entry = entries.get(f"{name}.{fmt}")
+        return (entry is not None and entry['params'] == params[name]
+                and output_path(name, output_dir, fmt).exists())
+
+    # Same source file and same parameters: nothing to do without even loading the data
+    candidates = [name for name in names
+                  if not (unchanged(name) and entries[f"{name}.{fmt}"]['source'] == source_hash)]
+    if not candidates:
+        return [], None, manifest
+
+    cube = chart_cube.load_cube(csv_path, chunk_rows=chunk_rows)
+    stale = []
+    for name in candidates:
+        key = f"{name}.{fmt}"
+        data = data_fingerprint(name, cube)
+        if not (unchanged(name) and entries[key]['data'] == data):
+            stale.append(name)
+        entries[key] = {'params': params[name], 'data': data, 'source': source_hash}
+    return stale, cube, manifest
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Render business insight charts from accountants.csv")
+    parser.add_argument('--charts', nargs='+', metavar='CHART',
+                        help="charts to render, by name or number (default: all)")
+    parser.add_argument('--dpi', type=int, default=300, help="output resolution (default: 300)")
+    parser.add_argument('--format', choices=FORMATS, default='png', help="output format (default: png)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="parallel render processes; 1 renders in-process (default: CPU count)")
+    parser.add_argument('--output-dir', default='charts', help="output directory (default: charts)")
+    parser.add_argument('--csv', default='accountants.csv', help="source dataset (default: accountants.csv)")
+    parser.add_argument('--force', action='store_true',
+                        help="re-render even charts whose data and parameters are unchanged")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f"rows read at a time when building the chart data (default: {CHUNK_ROWS})")
+    parser.add_argument('--list', action='store_true', help="list available charts and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.list:
+        for chart in CHARTS.values():
+            print(f"{chart.name}  {chart.title}")
+        return
+
+    names = resolve_chart_names(args.charts)
+    stale, cube, manifest = plan_charts(names, args.csv, args.output_dir, args.dpi, args.format, args.force,
+                                       args.chunk_rows)
+    if not stale:
+        if cube is not None:
+            save_manifest(args.output_dir, manifest)
+        print(f"All {len(names)} charts are up to date; nothing to render")
+        return
+
+    print("Generating business insights charts...")
+    render_charts(stale, cube, args.output_dir, args.dpi, args.format, args.workers)
+    save_manifest(args.output_dir, manifest)
+
+    print("\n" + "="*60)
+    print("CHART GENERATION COMPLETE")
+    print("="*60)
+    print(f"\n{len(stale)} business insight charts generated in '{args.output_dir}/' directory")
+    if len(stale) < len(names):
+        print(f"({len(names) - len(stale)} unchanged charts skipped)")
+    print("\nGenerated charts:")
+    for name in stale:
+        print(f"  {int(name.split('_')[0])}. {CHARTS[name].title}")
+    print(f"\nAll charts saved as {args.format.upper()} files ({args.dpi} DPI)")
+
+
+if __name__ == '__main__':
+    main()
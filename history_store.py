@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Snapshot history of scraped profiles.
+
+Each crawl is recorded as a snapshot. A profile's first appearance is
+stored once as its base row; later crawls only add a delta row holding
+the fields that changed, or a removal marker when the profile is gone.
+Records are compared by content hash, so profiles that did not change
+cost nothing. The latest state of each profile is kept alongside the
+base row, so new snapshots are diffed without replaying history.
+
+as_of() rebuilds the dataset at any past moment by replaying deltas
+over the base rows. changes_since() lists the profiles added, updated
+and removed after a given snapshot.
+
+    python history_store.py import accountants.csv --taken-at 2026-01-01
+    python history_store.py as-of 2026-03-01 --output accountants-march.csv
+    python history_store.py changes --since 3
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+ADDED = 'added'
+UPDATED = 'updated'
+REMOVED = 'removed'
+
+
+class Snapshot(NamedTuple):
+    id: int
+    taken_at: float
+    label: Optional[str]
+    profiles: int
+    added: int
+    updated: int
+    removed: int
+
+
+class Change(NamedTuple):
+    """Net change to one profile between two snapshots"""
+    profile_id: str
+    kind: str  # 'added', 'updated' or 'removed'
+    fields: Dict[str, tuple]  # field -> (old value, new value); empty for removals
+
+
+def content_hash(record: Dict) -> str:
+    """Hash of a record's contents, independent of key order"""
+    return hashlib.sha256(json.dumps(record, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def field_delta(old: Dict, new: Dict) -> Dict:
+    """Fields whose value differs between two records; fields dropped from `new` map to None"""
+    delta = {field: value for field, value in new.items() if old.get(field) != value}
+    delta.update({field: None for field in old if field not in new})
+    return delta
+
+
+def apply_delta(record: Dict, delta: Dict) -> Dict:
+    record = dict(record)
+    for field, value in delta.items():
+        if value is None:
+            record.pop(field, None)
+        else:
+            record[field] = value
+    return record
+
+
+def to_timestamp(when: Union[float, int, str, datetime, None]) -> float:
+    """Accept epoch seconds, a datetime or an ISO date/time string"""
+    if when is None:
+        return time.time()
+    if isinstance(when, datetime):
+        return when.timestamp()
+    if isinstance(when, str):
+        return datetime.fromisoformat(when).timestamp()
+    return float(when)
+
+
+class HistoryStore:
+    """SQLite-backed base rows plus per-snapshot field deltas"""
+
+    def __init__(self, path: str = 'history.sqlite'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY,
+                taken_at REAL NOT NULL,
+                label TEXT,
+                profiles INTEGER NOT NULL DEFAULT 0,
+                added INTEGER NOT NULL DEFAULT 0,
+                updated INTEGER NOT NULL DEFAULT 0,
+                removed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS snapshots_taken_at ON snapshots (taken_at);
+            CREATE TABLE IF NOT EXISTS profiles (
+                id TEXT PRIMARY KEY,
+                base_snapshot INTEGER NOT NULL,
+                base_record TEXT NOT NULL,
+                current_record TEXT,
+                content_hash TEXT
+            );
+            CREATE TABLE IF NOT EXISTS deltas (
+                profile_id TEXT NOT NULL,
+                snapshot_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                fields TEXT,
+                PRIMARY KEY (profile_id, snapshot_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS deltas_snapshot ON deltas (snapshot_id);
+        ''')
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def record_snapshot(self, records: Iterable[Dict], taken_at=None, label: Optional[str] = None,
+                        complete: bool = True) -> Snapshot:
+        """Store a crawl as a new snapshot and return its summary
+
+        With complete=True, profiles missing from `records` are marked as
+        removed; pass False for partial crawls (e.g. --max-accounts runs).
+        """
+        taken_at = to_timestamp(taken_at)
+        latest = self.latest_snapshot()
+        if latest and taken_at < latest.taken_at:
+            raise ValueError("snapshots must be recorded in chronological order")
+
+        with self.conn:
+            snapshot_id = self.conn.execute('INSERT INTO snapshots (taken_at, label) VALUES (?, ?)',
+                                            (taken_at, label)).lastrowid
+            known = {row['id']: (row['content_hash'], row['current_record'])
+                     for row in self.conn.execute('SELECT id, content_hash, current_record FROM profiles')}
+            seen = set()
+            counts = {ADDED: 0, UPDATED: 0, REMOVED: 0}
+            for record in records:
+                profile_id = str(record['id'])
+                if profile_id in seen:
+                    continue
+                seen.add(profile_id)
+                record_json = json.dumps(record, ensure_ascii=False)
+                digest = content_hash(record)
+                if profile_id not in known:
+                    self.conn.execute('''
+                        INSERT INTO profiles (id, base_snapshot, base_record, current_record, content_hash)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (profile_id, snapshot_id, record_json, record_json, digest))
+                    counts[ADDED] += 1
+                    continue
+                previous_hash, previous_json = known[profile_id]
+                if previous_hash == digest:
+                    continue
+                if previous_json is None:
+                    # A profile coming back after a removal is "added" again with its full record
+                    kind, fields = ADDED, record
+                else:
+                    kind, fields = UPDATED, field_delta(json.loads(previous_json), record)
+                self._add_delta(profile_id, snapshot_id, kind, fields)
+                self.conn.execute('UPDATE profiles SET current_record = ?, content_hash = ? WHERE id = ?',
+                                  (record_json, digest, profile_id))
+                counts[kind] += 1
+
+            if complete:
+                for profile_id, (previous_hash, previous_json) in known.items():
+                    if profile_id not in seen and previous_json is not None:
+                        self._add_delta(profile_id, snapshot_id, REMOVED, None)
+                        self.conn.execute('UPDATE profiles SET current_record = NULL, content_hash = NULL '
+                                          'WHERE id = ?', (profile_id,))
+                        counts[REMOVED] += 1
+
+            total = self.conn.execute('SELECT COUNT(*) FROM profiles WHERE current_record IS NOT NULL'
+                                      ).fetchone()[0]
+            self.conn.execute('UPDATE snapshots SET profiles = ?, added = ?, updated = ?, removed = ? WHERE id = ?',
+                              (total, counts[ADDED], counts[UPDATED], counts[REMOVED], snapshot_id))
+        return self.snapshot(snapshot_id)
+
+    def _add_delta(self, profile_id: str, snapshot_id: int, kind: str, fields: Optional[Dict]):
+        self.conn.execute('INSERT INTO deltas (profile_id, snapshot_id, kind, fields) VALUES (?, ?, ?, ?)',
+                          (profile_id, snapshot_id, kind,
+                           None if fields is None else json.dumps(fields, ensure_ascii=False)))
+
+    def snapshot(self, snapshot_id: int) -> Optional[Snapshot]:
+        row = self.conn.execute('SELECT * FROM snapshots WHERE id = ?', (snapshot_id,)).fetchone()
+        return Snapshot(**dict(row)) if row else None
+
+    def snapshots(self) -> List[Snapshot]:
+        return [Snapshot(**dict(row)) for row in self.conn.execute('SELECT * FROM snapshots ORDER BY id')]
+
+    def latest_snapshot(self) -> Optional[Snapshot]:
+        row = self.conn.execute('SELECT * FROM snapshots ORDER BY id DESC LIMIT 1').fetchone()
+        return Snapshot(**dict(row)) if row else None
+
+    def snapshot_at(self, when) -> Optional[Snapshot]:
+        """The last snapshot taken at or before `when`"""
+        row = self.conn.execute('SELECT * FROM snapshots WHERE taken_at <= ? ORDER BY taken_at DESC, id DESC LIMIT 1',
+                                (to_timestamp(when),)).fetchone()
+        return Snapshot(**dict(row)) if row else None
+
+    def _states_at(self, snapshot_id: int, profile_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """Rebuild the records present at a snapshot, optionally only for some profiles"""
+        where, params = 'base_snapshot <= ?', [snapshot_id]
+        if profile_ids is not None:
+            profile_ids = list(profile_ids)
+            where += f" AND id IN ({','.join('?' * len(profile_ids))})"
+            params += profile_ids
+        # Profiles added since are invisible; the rest start from their base row
+        states = {row['id']: json.loads(row['base_record'])
+                  for row in self.conn.execute(f'SELECT id, base_record FROM profiles WHERE {where} ORDER BY rowid',
+                                               params)}
+        if not states:
+            return {}
+        where, params = 'snapshot_id <= ?', [snapshot_id]
+        if profile_ids is not None:
+            # Only the requested profiles' deltas, looked up through the (profile_id, snapshot_id) key
+            where += f" AND profile_id IN ({','.join('?' * len(states))})"
+            params += list(states)
+        rows = self.conn.execute(
+            f'SELECT profile_id, kind, fields FROM deltas WHERE {where} ORDER BY profile_id, snapshot_id', params)
+        removed = set()
+        for row in rows:
+            profile_id = row['profile_id']
+            if profile_id not in states:
+                continue
+            if row['kind'] == REMOVED:
+                removed.add(profile_id)
+                continue
+            removed.discard(profile_id)
+            fields = json.loads(row['fields'])
+            # A re-added profile's delta is its full record
+            states[profile_id] = fields if row['kind'] == ADDED else apply_delta(states[profile_id], fields)
+        for profile_id in removed:
+            del states[profile_id]
+        return states
+
+    def as_of(self, when=None) -> List[Dict]:
+        """Records as they were at `when` (default: now), in first-seen order"""
+        snapshot = self.snapshot_at(to_timestamp(when))
+        if snapshot is None:
+            return []
+        latest = self.latest_snapshot()
+        if snapshot.id == latest.id:
+            # The current state is stored directly; no replay needed
+            rows = self.conn.execute('SELECT current_record FROM profiles WHERE current_record IS NOT NULL '
+                                     'ORDER BY rowid')
+            return [json.loads(row['current_record']) for row in rows]
+        return list(self._states_at(snapshot.id).values())
+
+    def changes_since(self, snapshot_id: int) -> Iterator[Change]:
+        """Net changes between a snapshot and the latest one: added, updated and removed profiles"""
+        rows = self.conn.execute('SELECT DISTINCT profile_id FROM deltas WHERE snapshot_id > ? '
+                                 'UNION SELECT id FROM profiles WHERE base_snapshot > ?',
+                                 (snapshot_id, snapshot_id))
+        changed = sorted((row[0] for row in rows), key=lambda profile_id: (len(profile_id), profile_id))
+        if not changed:
+            return
+        for start in range(0, len(changed), 500):
+            batch = changed[start:start + 500]
+            before = self._states_at(snapshot_id, batch)
+            placeholders = ','.join('?' * len(batch))
+            after = {row['id']: json.loads(row['current_record'])
+                     for row in self.conn.execute(f'SELECT id, current_record FROM profiles '
+                                                  f'WHERE id IN ({placeholders}) AND current_record IS NOT NULL',
+                                                  batch)}
+            for profile_id in batch:
+                old, new = before.get(profile_id), after.get(profile_id)
+                if old is None and new is not None:
+                    yield Change(profile_id, ADDED, {field: (None, value) for field, value in new.items()})
+                elif old is not None and new is None:
+                    yield Change(profile_id, REMOVED, {})
+                elif old is not None and old != new:
+                    yield Change(profile_id, UPDATED,
+                                 {field: (old.get(field), new.get(field)) for field in field_delta(old, new)})
+
+    def profile_history(self, profile_id: str) -> List[tuple]:
+        """(taken_at, record or None if removed) for every snapshot where a profile changed"""
+        row = self.conn.execute('SELECT base_snapshot, base_record FROM profiles WHERE id = ?',
+                                (profile_id,)).fetchone()
+        if row is None:
+            return []
+        record = json.loads(row['base_record'])
+        history = [(self.snapshot(row['base_snapshot']).taken_at, record)]
+        rows = self.conn.execute('''
+            SELECT s.taken_at, d.kind, d.fields FROM deltas d JOIN snapshots s ON s.id = d.snapshot_id
+            WHERE d.profile_id = ? ORDER BY d.snapshot_id
+        ''', (profile_id,))
+        for delta in rows:
+            if delta['kind'] == REMOVED:
+                history.append((delta['taken_at'], None))
+                continue
+            fields = json.loads(delta['fields'])
+            record = fields if delta['kind'] == ADDED else apply_delta(record, fields)
+            history.append((delta['taken_at'], record))
+        return history
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(sep=' ', timespec='seconds')
+
+
+def main(argv: Optional[List[str]] = None):
+    from record_sinks import open_sink, read_records
+
+    parser = argparse.ArgumentParser(description="Snapshot history of scraped profiles")
+    parser.add_argument('--db', default='history.sqlite', help="history database (default: history.sqlite)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    importer = commands.add_parser('import', help="record a scraped CSV/Parquet file as a new snapshot")
+    importer.add_argument('path')
+    importer.add_argument('--taken-at', default=None, help="ISO date/time of the crawl (default: now)")
+    importer.add_argument('--label', default=None)
+    importer.add_argument('--partial', action='store_true',
+                          help="the file is a partial crawl; do not mark missing profiles as removed")
+
+    commands.add_parser('snapshots', help="list recorded snapshots")
+
+    as_of = commands.add_parser('as-of', help="write the dataset as it was at a date")
+    as_of.add_argument('when', help="ISO date/time")
+    as_of.add_argument('--output', required=True, help="CSV or .parquet file to write")
+
+    changes = commands.add_parser('changes', help="list profiles added, updated or removed since a snapshot")
+    changes.add_argument('--since', type=int, required=True, help="snapshot ID")
+
+    args = parser.parse_args(argv)
+    with HistoryStore(args.db) as store:
+        if args.command == 'import':
+            snapshot = store.record_snapshot(read_records(args.path), args.taken_at, args.label,
+                                             complete=not args.partial)
+            print(f"Snapshot {snapshot.id}: {snapshot.profiles} profiles, {snapshot.added} added, "
+                  f"{snapshot.updated} updated, {snapshot.removed} removed")
+        elif args.command == 'snapshots':
+            for snapshot in store.snapshots():
+                print(f"{snapshot.id:>4}  {_format_time(snapshot.taken_at)}  {snapshot.profiles:>6} profiles  "
+                      f"+{snapshot.added} ~{snapshot.updated} -{snapshot.removed}  {snapshot.label or ''}")
+        elif args.command == 'as-of':
+            records = store.as_of(args.when)
+            with open_sink(args.output) as sink:
+                for record in records:
+                    sink.write(record)
+            print(f"Wrote {len(records)} profiles to {args.output}")
+        else:
+            for change in store.changes_since(args.since):
+                fields = ', '.join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in change.fields.items())
+                print(f"{change.kind:<8} {change.profile_id}  {fields if change.kind == UPDATED else ''}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Direct discovery of profile IDs on muhasib.az.
+
+Instead of relying on the listing pages, cv.php?id= is probed directly
+with lightweight requests (see MuhasibScraper.probe_accountant). The
+current maximum ID is found by exponential then binary search, and the
+range below it is swept to classify every ID as live or missing before
+any full fetch.
+
+Probe results are kept in SQLite. Missing IDs below the maximum are
+remembered, so later sweeps only probe IDs that have never been
+classified, mostly the new range above the previous maximum.
+
+    python id_discovery.py --db id_discovery.sqlite
+    python muhasib_scraper.py --discover
+"""
+
+import argparse
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LIVE = 'live'
+MISSING = 'missing'
+# Highest ID the maximum search will probe; a site that looks live everywhere cannot run it forever
+DEFAULT_MAX_ID = 1_000_000
+
+
+class DiscoveryStore:
+    """SQLite record of which profile IDs are live or missing"""
+
+    def __init__(self, path: str = 'id_discovery.sqlite'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS id_probes (
+                id INTEGER PRIMARY KEY,
+                status TEXT NOT NULL,
+                probed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS discovery_meta (
+                key TEXT PRIMARY KEY,
+                value
+            );
+        ''')
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, results: Iterable[Tuple[int, str]]):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO id_probes (id, status, probed_at) VALUES (?, ?, ?)',
+                                  ((acc_id, status, now) for acc_id, status in results))
+
+    def known(self, first: int, last: int) -> Dict[int, str]:
+        """Stored statuses for IDs in first..last"""
+        rows = self.conn.execute('SELECT id, status FROM id_probes WHERE id BETWEEN ? AND ?', (first, last))
+        return {row['id']: row['status'] for row in rows}
+
+    def live_ids(self) -> List[int]:
+        return [row['id'] for row in self.conn.execute('SELECT id FROM id_probes WHERE status = ? ORDER BY id', (LIVE,))]
+
+    def max_live_id(self) -> Optional[int]:
+        return self.conn.execute('SELECT MAX(id) FROM id_probes WHERE status = ?', (LIVE,)).fetchone()[0]
+
+    def get_meta(self, key: str, default=None):
+        row = self.conn.execute('SELECT value FROM discovery_meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else default
+
+    def set_meta(self, key: str, value):
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO discovery_meta (key, value) VALUES (?, ?)', (key, value))
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.conn.execute('SELECT status, COUNT(*) AS n FROM id_probes GROUP BY status')
+        return {row['status']: row['n'] for row in rows}
+
+
+class IdDiscovery:
+    """Find the live profile IDs by probing cv.php directly"""
+
+    def __init__(self, scraper, store: DiscoveryStore, window: int = 50, workers: Optional[int] = None,
+                 max_id: int = DEFAULT_MAX_ID):
+        self.scraper = scraper
+        self.store = store
+        # Gaps of missing IDs shorter than this are assumed not to end the ID space
+        self.window = max(window, 1)
+        self.max_id = max(max_id, 1)
+        self.workers = workers or scraper.concurrency
+        self.probes = 0
+        self._probed: Dict[int, str] = {}
+
+    def _classify(self, acc_id: int) -> Optional[str]:
+        """Probe one ID over the network (safe to call from worker threads)"""
+        live = self.scraper.probe_accountant(str(acc_id))
+        if live is None:
+            return None
+        return LIVE if live else MISSING
+
+    def probe(self, acc_id: int) -> Optional[str]:
+        """Classify one ID, using earlier results before the network"""
+        status = self._probed.get(acc_id)
+        if status is None:
+            status = self.store.known(acc_id, acc_id).get(acc_id)
+        if status is None:
+            status = self._classify(acc_id)
+            self.probes += 1
+            if status is not None:
+                self._probed[acc_id] = status
+        return status
+
+    def first_live(self, start: int, limit: Optional[int] = None) -> Optional[int]:
+        """First live ID in start..start+window-1 (and below `limit` and max_id), probing one at a time"""
+        end = min(start + self.window, self.max_id + 1)
+        if limit is not None:
+            end = min(end, limit)
+        for acc_id in range(start, end):
+            if self.probe(acc_id) == LIVE:
+                return acc_id
+        return None
+
+    def find_max_id(self, hint: Optional[int] = None) -> int:
+        """Largest live ID, by exponential search for a dead region then binary search below it"""
+        lo = min(hint or self.store.max_live_id() or 1, self.max_id)
+        found = self.first_live(lo)
+        if found is None and lo > 1:
+            found = self.first_live(1)
+        if found is None:
+            logger.warning("No live profile IDs found")
+            return 0
+
+        lo, step = found, max(found, self.window)
+        while lo + step <= self.max_id:
+            found = self.first_live(lo + step)
+            if found is None:
+                break
+            lo, step = found, step * 2
+        else:
+            logger.warning(f"ID search reached the cap of {self.max_id} without finding a dead window; "
+                           f"IDs above it are not probed (raise --max-id if the site has more)")
+        hi = min(lo + step, self.max_id + 1)
+        logger.info(f"Maximum ID is between {lo} and {hi}")
+
+        # Invariant: lo is live and hi starts a window with no live IDs
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            found = self.first_live(mid, limit=hi)
+            if found is not None:
+                lo = found
+            else:
+                hi = mid
+        logger.info(f"Maximum profile ID: {lo} ({self.probes} probes)")
+        return lo
+
+    def sweep(self, last: int, first: int = 1) -> Dict[str, int]:
+        """Probe every unclassified ID in first..last concurrently"""
+        known = self.store.known(first, last)
+        todo = [acc_id for acc_id in range(first, last + 1) if acc_id not in known and acc_id not in self._probed]
+        logger.info(f"Sweeping {len(todo)} unclassified IDs in {first}-{last} "
+                    f"({len(known)} already known)")
+        batch: List[Tuple[int, str]] = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for acc_id, status in zip(todo, executor.map(self._classify, todo)):
+                if status is not None:
+                    batch.append((acc_id, status))
+                if len(batch) >= 500:
+                    self.store.record(batch)
+                    batch = []
+        self.store.record(batch)
+        self.probes += len(todo)
+        return self.store.counts()
+
+    def discover(self, hint: Optional[int] = None) -> List[str]:
+        """Find the maximum ID, classify everything below it and return the live IDs"""
+        self._probed = {}
+        max_id = self.find_max_id(hint)
+        # IDs probed above the maximum may appear later, so only results up to it are remembered
+        self.store.record((acc_id, status) for acc_id, status in self._probed.items() if acc_id <= max_id)
+        counts = self.sweep(max_id)
+        previous = self.store.get_meta('max_id')
+        self.store.set_meta('max_id', max_id)
+        logger.info(f"Discovery finished: max ID {max_id} (previously {previous}), "
+                    f"{counts.get(LIVE, 0)} live, {counts.get(MISSING, 0)} missing, {self.probes} probes this run")
+        return [str(acc_id) for acc_id in self.store.live_ids()]
+
+
+def main(argv: Optional[List[str]] = None):
+    from muhasib_scraper import BASE_URL, MuhasibScraper
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Discover live profile IDs by probing cv.php directly")
+    parser.add_argument('--db', default='id_discovery.sqlite', help="probe database (default: id_discovery.sqlite)")
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--rps', type=float, default=4.0, help="starting request rate (default: 4.0)")
+    parser.add_argument('--concurrency', type=int, default=8, help="concurrent probes (default: 8)")
+    parser.add_argument('--window', type=int, default=50,
+                        help="consecutive missing IDs that count as the end of the ID space (default: 50)")
+    parser.add_argument('--hint', type=int, default=None, help="ID to start the maximum search from")
+    parser.add_argument('--max-id', type=int, default=DEFAULT_MAX_ID,
+                        help=f"highest ID the maximum search probes (default: {DEFAULT_MAX_ID})")
+    args = parser.parse_args(argv)
+
+    scraper = MuhasibScraper(concurrency=args.concurrency, requests_per_second=args.rps, base_url=args.base_url)
+    with DiscoveryStore(args.db) as store:
+        live = IdDiscovery(scraper, store, args.window, max_id=args.max_id).discover(args.hint)
+    print(f"{len(live)} live profile IDs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the scraper, the analysis and the query engine.
+
+    python muhasib.py scrape --max-accounts 100
+    python muhasib.py analyze --brief
+    python muhasib.py charts --list
+    python muhasib.py query --city Baku --age 25-35
+    python muhasib.py serve --port 8080
+
+Each subcommand hands its remaining arguments to the main() of the module
+that implements it, and that module is imported only when its subcommand
+runs. `--help` and the light subcommands therefore never load requests,
+BeautifulSoup, pandas or matplotlib; cron jobs and container health
+checks call them often enough for interpreter startup to matter.
+benchmarks/run_benchmarks.py --only startup checks the time to first
+output against STARTUP_BUDGET_MS.
+"""
+
+import argparse
+import importlib
+import sys
+from typing import List, NamedTuple, Optional
+
+# Time to first output, in milliseconds, for --help and the light subcommands
+STARTUP_BUDGET_MS = 250
+
+
+class Command(NamedTuple):
+    module: str
+    help: str
+    prefix: tuple = ()  # arguments placed before the user's, e.g. the module's own subcommand
+
+
+COMMANDS = {
+    'scrape': Command('muhasib_scraper', "scrape accountant profiles from muhasib.az"),
+    'analyze': Command('analyze_data', "print summary statistics for the dataset"),
+    'charts': Command('generate_charts', "render the business insight charts"),
+    'query': Command('query_engine', "print candidates matching filters as JSON", ('query',)),
+    'serve': Command('query_engine', "serve candidate queries over HTTP", ('serve',)),
+    'search': Command('text_search', "full-text search over education, experience and skills"),
+}
+
+
+def main(argv: Optional[List[str]] = None):
+    commands = '\n'.join(f"  {name:<10}{command.help}" for name, command in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog='muhasib.py', description="Scrape, analyze and query muhasib.az accountant profiles",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"commands:\n{commands}\n\nRun 'muhasib.py COMMAND --help' for the options of a command.")
+    parser.add_argument('command', choices=COMMANDS, metavar='COMMAND', help="one of the commands below")
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    command = COMMANDS[args.command]
+    module = importlib.import_module(command.module)
+    # Usage and error messages name the subcommand; argparse appends a prefixed subcommand itself
+    sys.argv[0] = parser.prog if command.prefix else f"{parser.prog} {args.command}"
+    module.main([*command.prefix, *args.args])
+
+
+if __name__ == '__main__':
+    main()
@@ -12,36 +12,193 @@ This script scrapes accountant information from muhasib.az including:
 import requests
 from bs4 import BeautifulSoup
 import re
-import csv
 import time
+import asyncio
+import argparse
+import hashlib
+import json
 import logging
+import os
+from itertools import chain, islice
 from urllib.parse import urljoin
-from typing import List, Dict, Optional
-import random
+from typing import List, Dict, Iterable, Iterator, NamedTuple, Optional
+
+from crawl_state import CrawlStateStore, DONE, FAILED
+from history_store import HistoryStore
+from id_discovery import DEFAULT_MAX_ID, DiscoveryStore, IdDiscovery
+from pipeline import ScrapePipeline
+from profile_parser import PROFILE_LABELS, ProfileIndex, parse_html, parse_profile
+from rate_limiter import AdaptiveRateLimiter, RetryPolicy, parse_retry_after
+from record_sinks import CsvSink, RecordSink, open_sink, read_records
+from records import AccountantRecord
+from response_cache import CachedResponse, ResponseCache
+from scrape_metrics import ScrapeMetrics
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+BASE_URL = "https://www.muhasib.az"
+
+# Request headers that make a fetch conditional, in the order of CachedResponse.etag/last_modified
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+# Profile probes: statuses meaning "no such profile" / "HEAD not supported", and the streamed-GET fallback
+PROBE_MISSING = frozenset({404, 410})
+PROBE_UNSUPPORTED = frozenset({405, 501})
+PROBE_MARKER = PROFILE_LABELS['age'].encode('utf-8')
+PROBE_CHUNK = 4096
+PROBE_MAX_BYTES = 64 * 1024
+
+class DetailResult(NamedTuple):
+    """Outcome of fetching one profile page"""
+    status: str  # 'fetched' (not yet parsed), 'ok', 'not_modified' or 'failed'
+    record: Dict
+    content_hash: str = ''
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    error: str = ''
+    content: bytes = b''
+
 class MuhasibScraper:
-    def __init__(self):
-        self.base_url = "https://www.muhasib.az"
+    def __init__(self, concurrency: int = 8, requests_per_second: float = 4.0,
+                 cache: Optional[ResponseCache] = None, parse_workers: Optional[int] = None,
+                 queue_depth: int = 32, base_url: str = BASE_URL,
+                 max_requests_per_second: Optional[float] = None, max_retries: int = 3):
+        self.base_url = base_url.rstrip('/')
         self.listings_url = f"{self.base_url}/cv_index.php"
+        self.listing_page_param = "page"
+        self.concurrency = concurrency
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else parse_workers
+        self.queue_depth = queue_depth
+        self.pipeline: Optional[ScrapePipeline] = None
+        # Starts at requests_per_second and adapts to how the site responds
+        self.rate_limiter = AdaptiveRateLimiter(requests_per_second, max_rps=max_requests_per_second)
+        self.retry_policy = RetryPolicy(max_retries)
+        self.state: Optional[CrawlStateStore] = None
+        self.cache = cache
+        self.sink: Optional[RecordSink] = None
+        self._written_ids = set()
+        self.metrics = ScrapeMetrics()
+        # Set once HEAD proves useless for probes (unsupported, or 200 for missing profiles)
+        self._probe_get_only = False
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # Size the connection pool so concurrent workers reuse connections
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(concurrency, 1))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         
+    def fetch_page(self, url: str, headers: Optional[Dict[str, str]] = None,
+                   revalidate: bool = False) -> Optional[requests.Response]:
+        """Fetch a URL and return the raw response (200 or 304), or None on error
+
+        A fresh cache entry is served without a request unless the caller
+        sends its own validators or asks to `revalidate`. Otherwise a cached
+        entry is revalidated with its stored ETag/Last-Modified, and a 304
+        then serves the cached body.
+        """
+        cached, validators = None, {}
+        conditional = bool(headers) and any(name in headers for name in CONDITIONAL_HEADERS)
+        if self.cache is not None:
+            cached = self.cache.get(url, allow_stale=True)
+        if cached is not None:
+            validators = {name: value for name, value in zip(CONDITIONAL_HEADERS, (cached.etag, cached.last_modified))
+                          if value}
+            if not (conditional or revalidate) and self.cache.is_fresh(cached):
+                self.metrics.increment('cache_hits')
+                return self._response_from_cache(cached)
+            if not conditional:
+                headers = {**(headers or {}), **validators}
+                
+        response = self._fetch_with_retries(url, headers)
+        if response is None:
+            return None
+            
+        if response.status_code == 304 and validators:
+            # A caller's own validators only vouch for the cached body if they are the cached ones
+            if all(headers.get(name) == value for name, value in validators.items()):
+                self.cache.refresh(url)
+                self.metrics.increment('cache_revalidations')
+            if not conditional:
+                return self._response_from_cache(cached)
+        if self.cache is not None and response.status_code == 200:
+            self.cache.put(url, response.content, response.headers.get('ETag'),
+                           response.headers.get('Last-Modified'))
+        return response
+        
+    def _fetch_with_retries(self, url: str, headers: Optional[Dict[str, str]], method: str = 'GET',
+                            accept: Iterable[int] = (), stream: bool = False) -> Optional[requests.Response]:
+        """Send a request through the adaptive rate limiter, retrying throttled and failed requests with backoff
+
+        Error responses with a status in `accept` are returned instead of
+        treated as failures. With `stream`, the body is left unread and
+        redirects are not followed; the caller must close the response.
+        """
+        attempt = 0
+        while True:
+            # Only requests that actually reach the network are paced
+            self.rate_limiter.wait(url)
+            started = time.perf_counter()
+            status, retry_after, response = None, None, None
+            try:
+                response = self.session.request(method, url, timeout=10, headers=headers, stream=stream,
+                                                allow_redirects=method == 'GET' and not stream)
+                latency = time.perf_counter() - started
+                status = response.status_code
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                self.rate_limiter.record(url, status, latency, retry_after)
+                size = int(response.headers.get('Content-Length') or 0) if stream else len(response.content)
+                self.metrics.observe_fetch(latency, status, size)
+                if status in accept:
+                    return response
+                response.raise_for_status()
+                response.encoding = 'utf-8'
+                return response
+            except requests.exceptions.RequestException as e:
+                if stream and response is not None:
+                    response.close()
+                if status is None:
+                    latency = time.perf_counter() - started
+                    self.rate_limiter.record(url, None, latency)
+                    self.metrics.observe_fetch(latency, type(e).__name__)
+                error = e
+                
+            if not self.retry_policy.should_retry(attempt, status):
+                retried = f" after {attempt} retries" if attempt else ""
+                logger.error(f"Error fetching {url}{retried}, giving up: {error}")
+                return None
+                
+            delay = self.retry_policy.delay(attempt, retry_after)
+            attempt += 1
+            self.metrics.increment('retries')
+            logger.warning(f"Retry {attempt}/{self.retry_policy.max_retries} for {url} in {delay:.1f}s "
+                           f"after {status or type(error).__name__} "
+                           f"(rate now {self.rate_limiter.rate(url):.2f} req/s)")
+            time.sleep(delay)
+            
+    def _response_from_cache(self, cached: CachedResponse) -> requests.Response:
+        """Wrap a cached body in a Response so callers cannot tell it from a live fetch"""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = cached.url
+        response._content = cached.content
+        response.encoding = 'utf-8'
+        if cached.etag:
+            response.headers['ETag'] = cached.etag
+        if cached.last_modified:
+            response.headers['Last-Modified'] = cached.last_modified
+        return response
+            
     def get_page_content(self, url: str) -> Optional[BeautifulSoup]:
         """Fetch and parse HTML content from URL"""
-        try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            return BeautifulSoup(response.content, 'html.parser')
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching {url}: {e}")
+        response = self.fetch_page(url)
+        if response is None:
             return None
+        started = time.perf_counter()
+        soup = parse_html(response.content)
+        self.metrics.observe_parse('listing', time.perf_counter() - started)
+        return soup
             
     def extract_accountant_ids(self, soup: BeautifulSoup) -> List[str]:
         """Extract accountant IDs from the listings page"""
@@ -55,114 +212,165 @@ class MuhasibScraper:
             if id_match:
                 ids.append(id_match.group(1))
                 
-        return list(set(ids))  # Remove duplicates
+        return list(dict.fromkeys(ids))  # Remove duplicates, keep page order
         
-    def scrape_listings_page(self) -> List[str]:
-        """Scrape all accountant IDs from the listings page"""
-        logger.info("Scraping listings page...")
-        soup = self.get_page_content(self.listings_url)
+    def listing_page_url(self, page: int) -> str:
+        """Build the URL of a cv_index.php listing page (1-based)"""
+        if page <= 1:
+            return self.listings_url
+        return f"{self.listings_url}?{self.listing_page_param}={page}"
         
-        if not soup:
-            logger.error("Failed to fetch listings page")
-            return []
+    def iter_accountant_ids(self, max_pages: Optional[int] = None, first_page: int = 1) -> Iterator[str]:
+        """Crawl listing pages in order, yielding each new accountant ID as soon as it is found
+
+        Pages first_page..max_pages are crawled (all remaining pages if
+        max_pages is None), stopping early at a page with no new IDs.
+        """
+        seen = set()
+        page = first_page
+        while max_pages is None or page <= max_pages:
+            url = self.listing_page_url(page)
+            logger.info(f"Scraping listings page {page}...")
+            soup = self.get_page_content(url)
             
-        accountant_ids = self.extract_accountant_ids(soup)
+            if not soup:
+                logger.error(f"Failed to fetch listings page {page}")
+                return
+                
+            new_ids = [acc_id for acc_id in self.extract_accountant_ids(soup) if acc_id not in seen]
+            if not new_ids:
+                logger.info(f"Listings page {page} returned no new IDs; stopping")
+                return
+                
+            logger.info(f"Found {len(new_ids)} new accountant IDs on page {page}")
+            for acc_id in new_ids:
+                seen.add(acc_id)
+                yield acc_id
+            page += 1
+            
+    def scrape_listings_page(self, max_pages: Optional[int] = None) -> List[str]:
+        """Scrape all accountant IDs from the listing pages"""
+        accountant_ids = list(self.iter_accountant_ids(max_pages))
         logger.info(f"Found {len(accountant_ids)} unique accountant IDs")
         
         return accountant_ids
         
     def extract_text_by_label(self, soup: BeautifulSoup, label: str) -> str:
         """Extract text following a specific label"""
-        # Look for bold text containing the label
-        bold_elements = soup.find_all('b')
-        for bold in bold_elements:
-            if label in bold.get_text():
-                # Get the parent element and extract text after the bold element
-                parent = bold.parent
-                if parent:
-                    text = parent.get_text()
-                    # Split by the label and take the part after it
-                    if label in text:
-                        after_label = text.split(label, 1)[1]
-                        # Clean up the text - remove extra whitespace and newlines
-                        return re.sub(r'\s+', ' ', after_label.strip())
-        return ""
+        return ProfileIndex(soup).label(label)
         
     def extract_section_content(self, soup: BeautifulSoup, section_header: str) -> str:
         """Extract content from a specific section"""
-        # Find h2 headers
-        headers = soup.find_all('h2')
-        for header in headers:
-            if section_header.lower() in header.get_text().lower():
-                # Get the parent cell and extract all text
-                cell = header.find_parent('td')
-                if cell:
-                    text = cell.get_text()
-                    # Remove the header text from the beginning
-                    text = re.sub(rf'^.*?{re.escape(section_header)}.*?\n', '', text, flags=re.IGNORECASE)
-                    return re.sub(r'\s+', ' ', text.strip())
-        return ""
+        return ProfileIndex(soup).section(section_header)
         
-    def scrape_accountant_details(self, accountant_id: str) -> Dict:
-        """Scrape detailed information for a specific accountant"""
-        url = f"{self.base_url}/cv.php?id={accountant_id}"
+    def detail_url(self, accountant_id: str) -> str:
+        """Build the profile page URL for an accountant ID"""
+        return f"{self.base_url}/cv.php?id={accountant_id}"
+        
+    def probe_accountant(self, accountant_id: str) -> Optional[bool]:
+        """Cheaply check whether a profile ID exists: True if live, False if missing, None if unknown
+
+        A HEAD request settles missing profiles on a site that answers them
+        with 404/410 or a redirect. A 200 is not proof of a profile, since a
+        site may serve unknown IDs as an empty page, so for a 200 (or when
+        HEAD is not supported) the start of the page is fetched with a
+        ranged, streamed GET until the first profile label shows up. Once
+        HEAD turns out to be unsupported, or a HEAD 200 turns out to be such
+        an empty page, later probes skip HEAD and only send the GET.
+        """
+        url = self.detail_url(accountant_id)
+        if not self._probe_get_only:
+            response = self._fetch_with_retries(url, None, method='HEAD', accept=PROBE_MISSING | PROBE_UNSUPPORTED)
+            if response is None:
+                return None
+            if response.status_code in PROBE_MISSING or response.is_redirect:
+                return False
+            if response.status_code in PROBE_UNSUPPORTED:
+                self._probe_get_only = True
+
+        response = self._fetch_with_retries(url, {'Range': f"bytes=0-{PROBE_MAX_BYTES - 1}"},
+                                            accept=PROBE_MISSING, stream=True)
+        if response is None:
+            return None
+        with response:
+            if response.status_code in PROBE_MISSING or response.is_redirect:
+                return False
+            try:
+                seen = b''
+                for chunk in response.iter_content(PROBE_CHUNK):
+                    seen += chunk
+                    if PROBE_MARKER in seen:
+                        return True
+                    if len(seen) >= PROBE_MAX_BYTES:
+                        break
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Error probing {url}: {e}")
+                return None
+        if not self._probe_get_only:
+            logger.info("HEAD answered 200 for a missing profile; probing with GET only from now on")
+            self._probe_get_only = True
+        return False
+
+    def fetch_accountant_raw(self, accountant_id: str, previous: Optional[Dict] = None) -> DetailResult:
+        """Fetch a profile page without parsing it, revalidating against a previous crawl state row if given"""
+        url = self.detail_url(accountant_id)
         logger.info(f"Scraping details for accountant ID: {accountant_id}")
         
-        soup = self.get_page_content(url)
-        if not soup:
-            logger.error(f"Failed to fetch details for ID: {accountant_id}")
-            return {}
+        # Only a completed previous crawl has a record worth revalidating
+        if previous and not previous.get('record'):
+            previous = None
             
-        data = {'id': accountant_id, 'url': url}
-        
-        try:
-            # Extract basic contact info from the top right section
-            contact_cell = soup.find('td', {'align': 'right'})
-            if contact_cell:
-                contact_text = contact_cell.get_text()
+        headers = {}
+        if previous:
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
                 
-                # Extract city
-                city_match = re.search(r'Şəhər:\s*(.+)', contact_text)
-                data['city'] = city_match.group(1).strip() if city_match else ""
-                
-                # Extract phone
-                phone_match = re.search(r'Tel\.:\s*(.+)', contact_text)
-                data['phone'] = phone_match.group(1).strip() if phone_match else ""
-                
-                # Extract email
-                email_match = re.search(r'E-mail:\s*(.+)', contact_text)
-                data['email'] = email_match.group(1).strip() if email_match else ""
-            
-            # Extract full name from h2 header
-            name_header = soup.find('h2')
-            if name_header:
-                data['name'] = name_header.get_text().replace('—', '').strip()
-            
-            # Extract personal information
-            data['age'] = self.extract_text_by_label(soup, 'Yaşı:').split()[0] if self.extract_text_by_label(soup, 'Yaşı:') else ""
-            data['gender'] = self.extract_text_by_label(soup, 'Cinsi:').split()[0] if self.extract_text_by_label(soup, 'Cinsi:') else ""
-            data['marital_status'] = self.extract_text_by_label(soup, 'Ailə vəziyyəti:').split()[0] if self.extract_text_by_label(soup, 'Ailə vəziyyəti:') else ""
-            
-            # Extract job-related information
-            data['category'] = self.extract_text_by_label(soup, 'Kateqoriya:')
-            data['position'] = self.extract_text_by_label(soup, 'Vəzifə:')
-            data['min_salary'] = self.extract_text_by_label(soup, 'Minimum əmək haqqı')
-            
-            # Extract education information
-            data['education'] = self.extract_section_content(soup, 'Təhsil')
-            
-            # Extract work experience
-            data['experience'] = self.extract_section_content(soup, 'İş Təcrübəsi')
-            
-            # Extract skills
-            data['skills'] = self.extract_section_content(soup, 'Bilik və bacarıqlar')
+        response = self.fetch_page(url, headers=headers or None, revalidate=previous is not None)
+        if response is None:
+            logger.error(f"Failed to fetch details for ID: {accountant_id}")
+            return DetailResult('failed', {}, error=f"Failed to fetch {url}")
             
-            logger.info(f"Successfully scraped data for {data.get('name', 'Unknown')} (ID: {accountant_id})")
+        if previous and response.status_code == 304:
+            logger.info(f"Profile not modified since last crawl (ID: {accountant_id})")
+            return DetailResult('not_modified', json.loads(previous['record']), previous['content_hash'],
+                                previous['etag'], previous['last_modified'])
             
-        except Exception as e:
-            logger.error(f"Error parsing details for ID {accountant_id}: {e}")
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if previous and previous.get('content_hash') == content_hash:
+            # Server ignored the validators but the page is byte-identical: skip the parse
+            logger.info(f"Profile content unchanged since last crawl (ID: {accountant_id})")
+            return DetailResult('not_modified', json.loads(previous['record']), content_hash, etag, last_modified)
             
-        return data
+        return DetailResult('fetched', {}, content_hash, etag, last_modified, content=response.content)
+        
+    def fetch_accountant(self, accountant_id: str, previous: Optional[Dict] = None) -> DetailResult:
+        """Fetch and parse a profile, revalidating against a previous crawl state row if given"""
+        result = self.fetch_accountant_raw(accountant_id, previous)
+        if result.status != 'fetched':
+            return result
+        data = self.parse_accountant_details(accountant_id, result.content)
+        return result._replace(status='ok', record=data, content=b'')
+        
+    def scrape_accountant_details(self, accountant_id: str) -> Dict:
+        """Scrape detailed information for a specific accountant"""
+        return self.fetch_accountant(accountant_id).record
+        
+    def parse_accountant_details(self, accountant_id: str, content: bytes) -> Dict:
+        """Extract the profile fields from a raw cv.php page"""
+        started = time.perf_counter()
+        data = parse_profile(accountant_id, self.detail_url(accountant_id), content)
+        self.metrics.observe_parse('profile', time.perf_counter() - started)
+        return self.clean_record(data)
+        
+    def clean_record(self, data: Dict) -> Dict:
+        """Validate a raw parsed profile into typed, normalised output fields, counting field failures"""
+        record, errors = AccountantRecord.from_profile(data)
+        self.metrics.observe_validation(errors)
+        return record.to_dict()
         
     def save_to_csv(self, data: List[Dict], filename: str = 'muhasib_accountants.csv'):
         """Save scraped data to CSV file"""
@@ -170,53 +378,237 @@ class MuhasibScraper:
             logger.warning("No data to save")
             return
             
-        fieldnames = ['id', 'url', 'name', 'city', 'phone', 'email', 'age', 'gender', 
-                     'marital_status', 'category', 'position', 'min_salary', 
-                     'education', 'experience', 'skills']
+        with CsvSink(filename) as sink:
+            for row in data:
+                sink.write(row)
+                
+    def _previous_state(self, accountant_id: str) -> Optional[Dict]:
+        """Look up (and register as pending) an ID in the crawl state store, if one is open"""
+        if self.state is None:
+            return None
+        previous = self.state.get(accountant_id)
+        if previous is None:
+            self.state.mark_pending([accountant_id])
+        return previous
+        
+    def _checkpoint(self, accountant_id: str, result: DetailResult) -> Dict:
+        """Persist a fetch result to the crawl state store and output sink, if open, and return its record"""
+        if self.state is not None:
+            if result.status == 'failed':
+                self.state.mark_failed(accountant_id, result.error)
+            elif result.status == 'not_modified':
+                self.state.mark_unchanged(accountant_id)
+            else:
+                self.state.mark_done(accountant_id, result.record, result.content_hash,
+                                     result.etag, result.last_modified)
+        if result.status == 'failed':
+            self.metrics.increment('drops')
+        elif result.status == 'not_modified':
+            self.metrics.increment('not_modified')
+        if self.sink is not None and result.record:
+            self.sink.write(result.record)
+            self._written_ids.add(accountant_id)
+            self.metrics.increment('records')
+        return result.record
         
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
+    async def scrape_accountants_async(self, accountant_ids: Iterable[str], collect: bool = True) -> List[Dict]:
+        """Scrape accountant details concurrently, keeping the input order"""
+        self.pipeline = ScrapePipeline(self, fetch_workers=self.concurrency,
+                                       parse_workers=self.parse_workers, queue_depth=self.queue_depth)
+        return await self.pipeline.run(accountant_ids, collect)
+        
+    def scrape_accountants_sequential(self, accountant_ids: Iterable[str], collect: bool = True) -> List[Dict]:
+        """Scrape accountant details one at a time (fallback mode)"""
+        all_data = []
+        for i, acc_id in enumerate(accountant_ids, 1):
+            logger.info(f"Processing {i}: ID {acc_id}")
             
-            for row in data:
-                # Ensure all fieldnames exist in the row
-                filtered_row = {field: row.get(field, '') for field in fieldnames}
-                writer.writerow(filtered_row)
+            result = self.fetch_accountant(acc_id, self._previous_state(acc_id))
+            data = self._checkpoint(acc_id, result)
+            if data and collect:
+                all_data.append(data)
                 
-        logger.info(f"Data saved to {filename}")
+        return all_data
+        
+    def replay_cache(self, sink: RecordSink) -> int:
+        """Re-parse every cached cv.php page offline into a sink, without touching the network"""
+        if self.cache is None:
+            raise ValueError("replay_cache requires a response cache")
+            
+        count = 0
+        for url, content in self.cache.iter_responses('%cv.php?id=%'):
+            id_match = re.search(r'cv\.php\?id=(\d+)', url)
+            if not id_match:
+                continue
+            sink.write(self.parse_accountant_details(id_match.group(1), content))
+            count += 1
+            
+        logger.info(f"Replayed {count} cached profiles")
+        return count
         
-    def run_scraper(self, max_accounts: Optional[int] = None):
-        """Main scraper function"""
+    def run_scraper(self, max_accounts: Optional[int] = None, use_async: bool = True,
+                    max_pages: Optional[int] = None, state_path: Optional[str] = None,
+                    refresh: bool = False, output: str = 'muhasib_accountants.csv',
+                    sink: Optional[RecordSink] = None, metrics_path: Optional[str] = None,
+                    summary_path: Optional[str] = None, accountant_ids: Optional[Iterable[str]] = None):
+        """Main scraper function
+
+        Profiles are found by crawling the listing pages unless
+        `accountant_ids` (e.g. from ID discovery) are given. Records are
+        streamed to `sink` as they are parsed; by default a CSV or
+        Parquet sink is opened for `output` based on its extension. Run metrics
+        are written in Prometheus text format to `metrics_path` and as a JSON
+        summary to `summary_path`, if given.
+        """
         logger.info("Starting Muhasib.az scraper...")
         
-        # Get all accountant IDs
-        accountant_ids = self.scrape_listings_page()
+        if state_path:
+            self.state = CrawlStateStore(state_path)
+        self.sink = sink if sink is not None else open_sink(output)
+        self._written_ids = set()
+        self.metrics = ScrapeMetrics()
+        self.metrics.start()
+        try:
+            self._run(max_accounts, use_async, max_pages, refresh, accountant_ids)
+        finally:
+            self.metrics.finish()
+            self.sink.close()
+            self.sink = None
+            if self.state is not None:
+                self.state.close()
+                self.state = None
+            logger.info(f"Run metrics: {self.metrics.log_line()}")
+            logger.info(f"Field validation: {self.metrics.validation.log_line()}")
+            if metrics_path:
+                self.metrics.write_prometheus(metrics_path)
+            if summary_path:
+                self.metrics.write_summary(summary_path)
+                
+    def _run(self, max_accounts: Optional[int], use_async: bool, max_pages: Optional[int], refresh: bool,
+             accountant_ids: Optional[Iterable[str]] = None):
+        # Stream accountant IDs from the listing pages; details start on the first page's IDs
+        accountant_ids = iter(accountant_ids) if accountant_ids is not None else self.iter_accountant_ids(max_pages)
+        first_id = next(accountant_ids, None)
         
-        if not accountant_ids:
+        if first_id is None:
             logger.error("No accountant IDs found. Exiting.")
             return
+        accountant_ids = chain([first_id], accountant_ids)
+        
+        if self.state is not None:
+            done = self.state.ids_with_status(DONE)
+            failed = self.state.ids_with_status(FAILED)
+            logger.info(f"Crawl state: {len(done)} done, {len(failed)} failed to retry")
+            # Retry earlier failures first; completed IDs are skipped unless refreshing
+            skip = failed if refresh else done | failed
+            accountant_ids = chain(sorted(failed, key=int),
+                                   (acc_id for acc_id in accountant_ids if acc_id not in skip))
             
         # Limit the number of accounts to scrape if specified
         if max_accounts:
-            accountant_ids = accountant_ids[:max_accounts]
+            accountant_ids = islice(accountant_ids, max_accounts)
             logger.info(f"Limiting scrape to {max_accounts} accounts")
             
-        # Scrape each accountant's details
-        all_data = []
-        for i, acc_id in enumerate(accountant_ids, 1):
-            logger.info(f"Processing {i}/{len(accountant_ids)}: ID {acc_id}")
+        # Scrape each accountant's details, streaming records to the sink
+        if use_async:
+            logger.info(f"Using async fetch mode with concurrency {self.concurrency} "
+                        f"and {self.parse_workers} parse workers")
+            asyncio.run(self.scrape_accountants_async(accountant_ids, collect=False))
+        else:
+            self.scrape_accountants_sequential(accountant_ids, collect=False)
             
-            data = self.scrape_accountant_details(acc_id)
-            if data:
-                all_data.append(data)
-                
-            # Add delay to be respectful to the server
-            time.sleep(random.uniform(1, 3))
+        if self.state is not None:
+            # Include profiles completed by earlier (possibly interrupted) runs
+            for record in self.state.done_records():
+                if record['id'] not in self._written_ids:
+                    self.sink.write(record)
+            logger.info(f"Crawl state after run: {self.state.counts()}")
             
-        # Save data to CSV
-        self.save_to_csv(all_data)
-        logger.info(f"Scraping completed. Total records: {len(all_data)}")
+        logger.info(f"Scraping completed. Total records: {self.sink.count}")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scrape accountant profiles from muhasib.az")
+    parser.add_argument('--max-accounts', type=int, default=500,
+                        help="maximum number of profiles to scrape (default: 500)")
+    parser.add_argument('--max-pages', type=int, default=None,
+                        help="maximum number of cv_index.php listing pages to crawl (default: all)")
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help="number of concurrent fetch workers in async mode (default: 8)")
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help="parse processes in async mode; 0 parses in the fetch threads (default: CPU count)")
+    parser.add_argument('--queue-depth', type=int, default=32,
+                        help="maximum fetched pages waiting to be parsed (default: 32)")
+    parser.add_argument('--rps', type=float, default=4.0,
+                        help="starting requests-per-second budget per host; adapts to the site's "
+                             "responses (default: 4.0)")
+    parser.add_argument('--max-rps', type=float, default=None,
+                        help="ceiling for the adaptive request rate (default: 4x --rps)")
+    parser.add_argument('--max-retries', type=int, default=3,
+                        help="retries for throttled or failed requests before giving up (default: 3)")
+    parser.add_argument('--state', metavar='PATH', default=None,
+                        help="SQLite crawl state file; completed profiles are skipped on re-runs")
+    parser.add_argument('--refresh', action='store_true',
+                        help="with --state, revalidate completed profiles using conditional requests")
+    parser.add_argument('--cache-dir', default=None,
+                        help="directory for the on-disk HTTP response cache (default: disabled)")
+    parser.add_argument('--cache-ttl', type=float, default=24 * 3600,
+                        help="seconds before a cached response is re-fetched (default: 86400)")
+    parser.add_argument('--cache-max-mb', type=float, default=512,
+                        help="maximum compressed cache size in MB before LRU eviction (default: 512)")
+    parser.add_argument('--replay', action='store_true',
+                        help="re-parse the cached corpus offline instead of crawling")
+    parser.add_argument('--output', default='muhasib_accountants.csv',
+                        help="output file; a .parquet extension writes Parquet, anything else CSV "
+                             "(default: muhasib_accountants.csv)")
+    parser.add_argument('--discover', action='store_true',
+                        help="find profile IDs by probing cv.php directly instead of crawling the listing pages")
+    parser.add_argument('--discovery-db', metavar='PATH', default='id_discovery.sqlite',
+                        help="with --discover, where probed IDs are remembered (default: id_discovery.sqlite)")
+    parser.add_argument('--max-id', type=int, default=DEFAULT_MAX_ID,
+                        help=f"with --discover, highest profile ID probed (default: {DEFAULT_MAX_ID})")
+    parser.add_argument('--history', metavar='PATH', default=None,
+                        help="SQLite history store; the output is recorded as a new snapshot after the run")
+    parser.add_argument('--metrics-file', metavar='PATH', default=None,
+                        help="write run metrics in Prometheus text format to this file")
+    parser.add_argument('--metrics-summary', metavar='PATH', default=None,
+                        help="write an end-of-run JSON metrics summary to this file")
+    parser.add_argument('--base-url', default=BASE_URL,
+                        help=f"site to scrape, e.g. a local stub server (default: {BASE_URL})")
+    parser.add_argument('--sequential', action='store_true',
+                        help="fetch one page at a time instead of async mode")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    cache = None
+    if args.cache_dir or args.replay:
+        cache = ResponseCache(args.cache_dir or '.http_cache', ttl=args.cache_ttl,
+                              max_bytes=int(args.cache_max_mb * 1024 * 1024))
+    scraper = MuhasibScraper(concurrency=args.concurrency, requests_per_second=args.rps, cache=cache,
+                             parse_workers=args.parse_workers, queue_depth=args.queue_depth,
+                             base_url=args.base_url, max_requests_per_second=args.max_rps,
+                             max_retries=args.max_retries)
+    if args.replay:
+        with open_sink(args.output) as sink:
+            scraper.replay_cache(sink)
+    else:
+        accountant_ids = None
+        if args.discover:
+            with DiscoveryStore(args.discovery_db) as discovery_store:
+                accountant_ids = IdDiscovery(scraper, discovery_store, max_id=args.max_id).discover()
+        scraper.run_scraper(max_accounts=args.max_accounts, use_async=not args.sequential,
+                            max_pages=args.max_pages, state_path=args.state, refresh=args.refresh,
+                            output=args.output, metrics_path=args.metrics_file,
+                            summary_path=args.metrics_summary, accountant_ids=accountant_ids)
+        if args.history:
+            records = list(read_records(args.output))
+            # Only a crawl that was not cut short can tell that missing profiles were removed
+            complete = not args.max_pages and (not args.max_accounts or len(records) < args.max_accounts)
+            with HistoryStore(args.history) as history:
+                snapshot = history.record_snapshot(records, complete=complete)
+            logger.info(f"History snapshot {snapshot.id}: {snapshot.added} added, {snapshot.updated} updated, "
+                        f"{snapshot.removed} removed")
 
 if __name__ == "__main__":
-    scraper = MuhasibScraper()
-    scraper.run_scraper(max_accounts=500)
\ No newline at end of file
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Two-stage fetch/parse pipeline for the Muhasib.az scraper.
+
+The fetch stage runs asyncio workers that only download raw profile pages.
+Pages are handed through a bounded queue to the parse stage, which turns
+them into records on a ProcessPoolExecutor so BeautifulSoup parsing is not
+serialised on the GIL. The bounded queues keep memory flat: when parsing
+falls behind, fetchers block instead of piling up pages.
+
+Each stage records how long its workers were busy so the end-of-run report
+shows which stage is the bottleneck.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from profile_parser import parse_profile
+
+if TYPE_CHECKING:
+    from muhasib_scraper import MuhasibScraper
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    """Busy/wait time accounting for one pipeline stage"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+
+    def utilisation(self, elapsed: float) -> float:
+        """Fraction of the stage's worker capacity spent doing work"""
+        if elapsed <= 0 or self.workers <= 0:
+            return 0.0
+        return min(self.busy / (elapsed * self.workers), 1.0)
+
+    def summary(self, elapsed: float) -> Dict:
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'busy_seconds': round(self.busy, 3),
+            'waiting_seconds': round(self.waiting, 3),
+            'utilisation': round(self.utilisation(elapsed), 3),
+        }
+
+
+class ScrapePipeline:
+    """Fetch stage -> bounded queue -> process-pool parse stage"""
+
+    def __init__(self, scraper: 'MuhasibScraper', fetch_workers: int = 8,
+                 parse_workers: int = 0, queue_depth: int = 32):
+        self.scraper = scraper
+        self.fetch_workers = max(fetch_workers, 1)
+        # With no parse workers, pages are parsed in the fetch stage's threads
+        self.parse_workers = max(parse_workers, 0)
+        self.queue_depth = max(queue_depth, 1)
+        self.fetch_stats = StageStats('fetch', self.fetch_workers)
+        self.parse_stats = StageStats('parse', self.parse_workers or self.fetch_workers)
+        self.elapsed = 0.0
+
+    async def _feed_ids(self, accountant_ids: Iterable[str], queue: asyncio.Queue):
+        """Move IDs from a (possibly blocking) iterator onto the work queue as they arrive"""
+        iterator = iter(accountant_ids)
+        index = 0
+        try:
+            while True:
+                # Listing pages are fetched lazily by the iterator, so pull it from a thread
+                acc_id = await asyncio.to_thread(next, iterator, None)
+                if acc_id is None:
+                    break
+                await queue.put((index, acc_id))
+                index += 1
+        finally:
+            for _ in range(self.fetch_workers):
+                await queue.put(None)
+
+    def _keep(self, index: int, acc_id: str, result, results: Optional[Dict[int, Dict]]):
+        # Crawl state and the output sink are only touched from the event loop thread
+        data = self.scraper._checkpoint(acc_id, result)
+        if data and results is not None:
+            results[index] = data
+
+    async def _fetch_worker(self, id_queue: asyncio.Queue, parse_queue: Optional[asyncio.Queue],
+                            results: Optional[Dict[int, Dict]]):
+        """Download raw pages and hand them to the parse stage"""
+        while True:
+            item = await id_queue.get()
+            if item is None:
+                return
+            index, acc_id = item
+            try:
+                logger.info(f"Processing {index + 1}: ID {acc_id}")
+                previous = self.scraper._previous_state(acc_id)
+                started = time.perf_counter()
+                # fetch_page paces network requests through the shared rate limiter
+                result = await asyncio.to_thread(self.scraper.fetch_accountant_raw, acc_id, previous)
+                self.fetch_stats.busy += time.perf_counter() - started
+                self.fetch_stats.items += 1
+
+                if result.status != 'fetched':
+                    self._keep(index, acc_id, result, results)
+                elif parse_queue is None:
+                    started = time.perf_counter()
+                    record = await asyncio.to_thread(self.scraper.parse_accountant_details, acc_id, result.content)
+                    self.parse_stats.busy += time.perf_counter() - started
+                    self.parse_stats.items += 1
+                    self._keep(index, acc_id, result._replace(status='ok', record=record, content=b''), results)
+                else:
+                    started = time.perf_counter()
+                    await parse_queue.put((index, acc_id, result))
+                    # Time spent here means the parse stage is the bottleneck
+                    self.fetch_stats.waiting += time.perf_counter() - started
+            except Exception as e:
+                self.scraper.metrics.increment('drops')
+                logger.error(f"Fetch worker failed for ID {acc_id}: {e}")
+
+    async def _parse_worker(self, parse_queue: asyncio.Queue, executor: ProcessPoolExecutor,
+                            results: Optional[Dict[int, Dict]]):
+        """Turn raw pages into records on the process pool"""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = time.perf_counter()
+            item = await parse_queue.get()
+            # Time spent here means the fetch stage is the bottleneck
+            self.parse_stats.waiting += time.perf_counter() - started
+            if item is None:
+                return
+            index, acc_id, result = item
+            try:
+                started = time.perf_counter()
+                record = await loop.run_in_executor(executor, parse_profile, acc_id,
+                                                    self.scraper.detail_url(acc_id), result.content)
+                elapsed = time.perf_counter() - started
+                self.parse_stats.busy += elapsed
+                self.scraper.metrics.observe_parse('profile', elapsed)
+                self.parse_stats.items += 1
+                record = self.scraper.clean_record(record)
+                self._keep(index, acc_id, result._replace(status='ok', record=record, content=b''), results)
+            except Exception as e:
+                self.scraper.metrics.increment('drops')
+                logger.error(f"Parse worker failed for ID {acc_id}: {e}")
+
+    async def run(self, accountant_ids: Iterable[str], collect: bool = True) -> List[Dict]:
+        """Scrape the given IDs through both stages, returning records in input order if collecting
+
+        With collect=False records only go to the scraper's sink and crawl
+        state, so memory does not grow with the crawl.
+        """
+        started = time.perf_counter()
+        # A bounded queue keeps the listing crawl only slightly ahead of the fetchers
+        id_queue: asyncio.Queue = asyncio.Queue(maxsize=self.fetch_workers * 2)
+        parse_queue: Optional[asyncio.Queue] = None
+        executor: Optional[ProcessPoolExecutor] = None
+        results: Optional[Dict[int, Dict]] = {} if collect else None
+
+        if self.parse_workers:
+            parse_queue = asyncio.Queue(maxsize=self.queue_depth)
+            executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+        try:
+            fetchers = [asyncio.create_task(self._fetch_worker(id_queue, parse_queue, results))
+                        for _ in range(self.fetch_workers)]
+            parsers = [asyncio.create_task(self._parse_worker(parse_queue, executor, results))
+                       for _ in range(self.parse_workers)]
+
+            await self._feed_ids(accountant_ids, id_queue)
+            await asyncio.gather(*fetchers)
+            for _ in parsers:
+                await parse_queue.put(None)
+            await asyncio.gather(*parsers)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.elapsed = time.perf_counter() - started
+        self.log_report()
+        if results is None:
+            return []
+        return [results[i] for i in sorted(results)]
+
+    def report(self) -> Dict:
+        """Per-stage utilisation for the last run"""
+        return {
+            'elapsed_seconds': round(self.elapsed, 3),
+            'fetch': self.fetch_stats.summary(self.elapsed),
+            'parse': self.parse_stats.summary(self.elapsed),
+        }
+
+    def log_report(self):
+        fetch = self.fetch_stats.utilisation(self.elapsed)
+        parse = self.parse_stats.utilisation(self.elapsed)
+        logger.info(
+            f"Pipeline finished in {self.elapsed:.1f}s: "
+            f"fetch {fetch:.0%} busy ({self.fetch_stats.items} pages, {self.fetch_stats.workers} workers, "
+            f"{self.fetch_stats.waiting:.1f}s blocked on parse queue), "
+            f"parse {parse:.0%} busy ({self.parse_stats.items} pages, {self.parse_stats.workers} workers, "
+            f"{self.parse_stats.waiting:.1f}s idle waiting for pages)"
+        )
+        if self.parse_workers:
+            bottleneck = 'parse' if parse > fetch else 'fetch'
+            logger.info(f"Pipeline bottleneck: {bottleneck} stage")
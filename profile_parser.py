@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Single-pass parser for muhasib.az cv.php profile pages.
+
+The page is parsed once with the lxml backend and walked once to collect
+every bold label, section header and the contact cell. All profile fields
+are then filled in from that index instead of rescanning the document for
+each field.
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+logger = logging.getLogger(__name__)
+
+PARSER_FEATURES = 'lxml'
+
+# Field name -> bold label that precedes its value
+PROFILE_LABELS = {
+    'age': 'Yaşı:',
+    'gender': 'Cinsi:',
+    'marital_status': 'Ailə vəziyyəti:',
+    'category': 'Kateqoriya:',
+    'position': 'Vəzifə:',
+    'min_salary': 'Minimum əmək haqqı',
+}
+
+# Fields where only the first word after the label is kept
+FIRST_WORD_FIELDS = ('age', 'gender', 'marital_status')
+
+# Field name -> h2 section header whose cell holds the value
+PROFILE_SECTIONS = {
+    'education': 'Təhsil',
+    'experience': 'İş Təcrübəsi',
+    'skills': 'Bilik və bacarıqlar',
+}
+
+# [ \t]* rather than \s*, so an empty value does not run on into the next line
+CONTACT_PATTERNS = {
+    'city': re.compile(r'Şəhər:[ \t]*(.*)'),
+    'phone': re.compile(r'Tel\.:[ \t]*(.*)'),
+    'email': re.compile(r'E-mail:[ \t]*(.*)'),
+}
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def parse_html(content) -> BeautifulSoup:
+    """Parse page bytes or text with the lxml backend"""
+    return BeautifulSoup(content, PARSER_FEATURES)
+
+
+def _normalize(text: str) -> str:
+    return WHITESPACE.sub(' ', text.strip())
+
+
+class ProfileIndex:
+    """Label -> value and section -> text lookups built from one walk over a page"""
+
+    def __init__(self, soup: BeautifulSoup):
+        self.name_header: Optional[Tag] = None
+        self.contact_cell: Optional[Tag] = None
+        self._bolds: List[Tuple[str, Optional[Tag]]] = []
+        self._headers: List[Tuple[str, Tag]] = []
+        self._text_cache: Dict[int, str] = {}
+
+        for tag in soup.find_all(['b', 'h2', 'td']):
+            if tag.name == 'b':
+                self._bolds.append((tag.get_text(), tag.parent))
+            elif tag.name == 'h2':
+                if self.name_header is None:
+                    self.name_header = tag
+                self._headers.append((tag.get_text().lower(), tag))
+            elif self.contact_cell is None and tag.get('align') == 'right':
+                self.contact_cell = tag
+
+    def _text(self, tag: Tag) -> str:
+        # Several labels usually share one parent, so its text is extracted once
+        key = id(tag)
+        text = self._text_cache.get(key)
+        if text is None:
+            text = self._text_cache[key] = tag.get_text()
+        return text
+
+    def label(self, label: str) -> str:
+        """Return the whitespace-normalised text between the first bold label containing `label` and the next one"""
+        for position, (bold_text, parent) in enumerate(self._bolds):
+            if label in bold_text and parent is not None:
+                text = self._text(parent)
+                if label in text:
+                    value = text.split(label, 1)[1]
+                    # Labels sharing a parent follow each other in its text; stop at the next one
+                    for next_text, next_parent in self._bolds[position + 1:]:
+                        if next_parent is not parent:
+                            break
+                        end = value.find(next_text)
+                        if end != -1:
+                            value = value[:end]
+                            break
+                    return _normalize(value)
+        return ""
+
+    def section(self, section_header: str) -> str:
+        """Return the text following the first h2 containing `section_header`, up to the next h2
+
+        The text may share the header's cell or fill the rows after it, but
+        never leaves the header's table.
+        """
+        needle = section_header.lower()
+        for header_text, header in self._headers:
+            if needle in header_text:
+                table = header.find_parent('table')
+                parts = []
+                for element in header.next_elements:
+                    if isinstance(element, Tag):
+                        if element.name == 'h2':
+                            break
+                        continue
+                    # Skip the header's own text, comments and scripts
+                    if type(element) is not NavigableString or any(parent is header for parent in element.parents):
+                        continue
+                    if table is not None and not any(parent is table for parent in element.parents):
+                        break
+                    parts.append(element)
+                return _normalize(' '.join(parts))
+        return ""
+
+
+def parse_profile(accountant_id: str, url: str, content) -> Dict:
+    """Parse a cv.php page into a profile record"""
+    data = {'id': accountant_id, 'url': url}
+
+    try:
+        index = ProfileIndex(parse_html(content))
+
+        # Extract basic contact info from the top right section
+        if index.contact_cell is not None:
+            contact_text = index.contact_cell.get_text()
+            for field, pattern in CONTACT_PATTERNS.items():
+                match = pattern.search(contact_text)
+                data[field] = match.group(1).strip() if match else ""
+
+        # Extract full name from the first h2 header
+        if index.name_header is not None:
+            data['name'] = index.name_header.get_text().replace('—', '').strip()
+
+        for field, label in PROFILE_LABELS.items():
+            value = index.label(label)
+            if field in FIRST_WORD_FIELDS:
+                value = value.split()[0] if value else ""
+            data[field] = value
+
+        for field, header in PROFILE_SECTIONS.items():
+            data[field] = index.section(header)
+
+        logger.info(f"Successfully scraped data for {data.get('name', 'Unknown')} (ID: {accountant_id})")
+
+    except Exception as e:
+        logger.error(f"Error parsing details for ID {accountant_id}: {e}")
+
+    return data
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Indexed candidate queries over the cleaned accountants dataset.
+
+Recruiters filter by city, position type, gender, marital status, age
+range and salary range. Instead of scanning the DataFrame per question,
+the dataset is indexed once:
+
+- every value of a categorical column gets a bitmap (a Python int with
+  bit i set for row i), so predicates combine with & and |
+- age and salary keep their distinct values in a sorted array, with
+  prefix bitmaps, so a range is two bisects and one XOR of bitmaps
+
+A multi-predicate query is a handful of big-int operations, i.e.
+microseconds, and only the matching rows are materialised. The index is
+pickled under .cache/, keyed by a hash of the source file, and reloaded
+without rebuilding.
+
+    python query_engine.py query --city Baku --position-type Accountant --age 25-35 --salary 500-1000
+    python query_engine.py serve --port 8080    # GET /query?city=Baku&age=25-35, GET /facets
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import pickle
+import time
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+from dataset import CACHE_DIR, file_hash
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bump when the index layout changes, to invalidate pickled indexes
+INDEX_VERSION = 1
+
+# Query field -> dataset column holding its values
+CATEGORICAL_FIELDS = {
+    'city': 'city_clean',
+    'position_type': 'position_type',
+    'gender': 'gender',
+    'marital_status': 'marital_status',
+}
+RANGE_FIELDS = ('age', 'salary')
+RESULT_COLUMNS = ['id', 'name', 'city', 'position', 'position_type', 'gender', 'marital_status',
+                  'age', 'salary', 'phone', 'email', 'url']
+
+# English aliases accepted for the Azerbaijani gender values
+GENDER_ALIASES = {'male': 'Kişi', 'female': 'Qadın'}
+
+Range = Tuple[Optional[float], Optional[float]]
+Values = Union[str, Sequence[str], None]
+
+
+class QueryResult(NamedTuple):
+    total: int
+    rows: List[Dict]
+    seconds: float
+
+
+def _bitmap(mask) -> int:
+    """Pack a boolean array into an int with bit i set for each true element i"""
+    import numpy as np
+
+    return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
+
+
+def _bits(bitmap: int, limit: Optional[int] = None) -> List[int]:
+    """Row numbers set in a bitmap, in ascending order, stopping after `limit`"""
+    # Reversed binary digits put row i at index i; str.find skips the zeros in C
+    digits = bin(bitmap)[:1:-1]
+    rows = []
+    row = digits.find('1')
+    while row != -1 and (limit is None or len(rows) < limit):
+        rows.append(row)
+        row = digits.find('1', row + 1)
+    return rows
+
+
+class RangeIndex:
+    """Sorted distinct values with prefix bitmaps: prefix[i] holds the rows whose value is below values[i]"""
+
+    def __init__(self, values: List[float], prefix: List[int]):
+        self.values = values
+        self.prefix = prefix
+
+    @classmethod
+    def build(cls, column: pd.Series) -> 'RangeIndex':
+        import numpy as np
+
+        data = column.to_numpy(dtype='float64', na_value=np.nan)
+        values = np.unique(data[~np.isnan(data)])
+        prefix = [0]
+        for value in values:
+            prefix.append(prefix[-1] | _bitmap(data == value))
+        return cls(values.tolist(), prefix)
+
+    def select(self, low: Optional[float] = None, high: Optional[float] = None) -> int:
+        """Bitmap of rows with low <= value <= high; missing values never match"""
+        start = bisect_left(self.values, low) if low is not None else 0
+        end = bisect_right(self.values, high) if high is not None else len(self.values)
+        if start >= end:
+            return 0
+        # prefix[start] is a subset of prefix[end], so XOR leaves exactly the rows in between
+        return self.prefix[end] ^ self.prefix[start]
+
+
+class CandidateIndex:
+    """Bitmap and range indexes over the candidate rows"""
+
+    def __init__(self, n_rows: int, bitmaps: Dict[str, Dict[str, int]], ranges: Dict[str, RangeIndex],
+                 rows: List[tuple], source_hash: str = ''):
+        self.n_rows = n_rows
+        self.bitmaps = bitmaps
+        self.ranges = ranges
+        self.rows = rows
+        self.source_hash = source_hash
+        self.all_rows = (1 << n_rows) - 1
+        # Case-insensitive lookup per field: a folded value may cover several spellings ('Kişi', 'kişi')
+        self._lookup: Dict[str, Dict[str, int]] = {}
+        for field, values in bitmaps.items():
+            lookup = self._lookup[field] = {}
+            for value, bitmap in values.items():
+                lookup[value.lower()] = lookup.get(value.lower(), 0) | bitmap
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, source_hash: str = '') -> 'CandidateIndex':
+        """Index a dataset that already has the position_type and city_clean columns"""
+        df = df.reset_index(drop=True)
+        bitmaps = {}
+        for field, column in CATEGORICAL_FIELDS.items():
+            values = df[column].astype(object)
+            bitmaps[field] = {str(value): _bitmap((values == value).to_numpy())
+                              for value in values.dropna().unique()}
+        ranges = {field: RangeIndex.build(df[field]) for field in RANGE_FIELDS}
+        import pandas as pd
+
+        # Plain Python values, so rows pickle compactly and serialise to JSON
+        records = df.reindex(columns=RESULT_COLUMNS).astype(object)
+        rows = [tuple(None if pd.isna(value) else getattr(value, 'item', lambda: value)() for value in row)
+                for row in records.itertuples(index=False, name=None)]
+        return cls(len(df), bitmaps, ranges, rows, source_hash)
+
+    def save(self, path: Path):
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': INDEX_VERSION, 'source_hash': self.source_hash, 'n_rows': self.n_rows,
+                         'bitmaps': self.bitmaps, 'rows': self.rows,
+                         'ranges': {field: (index.values, index.prefix) for field, index in self.ranges.items()}},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'CandidateIndex':
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('version') != INDEX_VERSION:
+            raise ValueError(f"{path} was written by an incompatible version")
+        ranges = {field: RangeIndex(values, prefix) for field, (values, prefix) in state['ranges'].items()}
+        return cls(state['n_rows'], state['bitmaps'], ranges, state['rows'], state['source_hash'])
+
+    def _match(self, field: str, value: str) -> int:
+        """Bitmap of rows whose `field` equals `value`, ignoring case"""
+        if field == 'gender':
+            value = GENDER_ALIASES.get(value.lower(), value)
+        return self._lookup[field].get(value.lower(), 0)
+
+    def select(self, ranges: Optional[Dict[str, Range]] = None, **filters: Values) -> int:
+        """Bitmap of rows matching every filter; several values for one field are OR-ed"""
+        result = self.all_rows
+        for field, wanted in filters.items():
+            if wanted is None:
+                continue
+            if field not in self.bitmaps:
+                raise ValueError(f"unknown filter: {field}")
+            values = [wanted] if isinstance(wanted, str) else wanted
+            matched = 0
+            for value in values:
+                matched |= self._match(field, value)
+            result &= matched
+        for field, (low, high) in (ranges or {}).items():
+            if field not in self.ranges:
+                raise ValueError(f"unknown range: {field}")
+            result &= self.ranges[field].select(low, high)
+        return result
+
+    def count(self, ranges: Optional[Dict[str, Range]] = None, **filters: Values) -> int:
+        return self.select(ranges, **filters).bit_count()
+
+    def query(self, ranges: Optional[Dict[str, Range]] = None, limit: Optional[int] = 50, offset: int = 0,
+              **filters: Values) -> QueryResult:
+        """Matching candidates in dataset order, with the total match count
+
+        e.g. index.query(city='Baku', position_type=['Accountant', 'Chief Accountant'],
+                         ranges={'age': (25, 35), 'salary': (500, None)})
+        """
+        started = time.perf_counter()
+        bitmap = self.select(ranges, **filters)
+        page = _bits(bitmap, None if limit is None else offset + limit)[offset:]
+        rows = [dict(zip(RESULT_COLUMNS, self.rows[row])) for row in page]
+        return QueryResult(bitmap.bit_count(), rows, time.perf_counter() - started)
+
+    def facets(self, ranges: Optional[Dict[str, Range]] = None, **filters: Values) -> Dict[str, Dict[str, int]]:
+        """Per-value counts of every categorical field within the rows matching the filters"""
+        bitmap = self.select(ranges, **filters)
+        return {field: dict(sorted(((value, (bitmap & values).bit_count()) for value, values in bitmaps.items()),
+                                   key=lambda item: -item[1]))
+                for field, bitmaps in self.bitmaps.items()}
+
+
+def prepare_candidates(path) -> pd.DataFrame:
+    """Load the typed dataset and add the cleaned city and position type columns"""
+    from cleaning import extract_position_type, standardize_city
+    from dataset import load_accountants
+
+    df = load_accountants(path)
+    df['position_type'] = extract_position_type(df['position'])
+    df['city_clean'] = standardize_city(df['city'])
+    return df
+
+
+def open_index(path='accountants.csv', cache_dir=CACHE_DIR) -> CandidateIndex:
+    """Load the pickled index for the source file, building and saving it if missing or stale"""
+    path = Path(path)
+    cache_dir = Path(cache_dir)
+    source_hash = file_hash(path)
+    index_file = cache_dir / f"{path.stem}-{source_hash[:16]}-index-v{INDEX_VERSION}.pkl"
+    if index_file.exists():
+        try:
+            return CandidateIndex.load(index_file)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable query index {index_file}: {e}")
+
+    index = CandidateIndex.build(prepare_candidates(path), source_hash)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for stale in cache_dir.glob(f"{path.stem}-*-index-v*.pkl"):
+        stale.unlink()
+    index.save(index_file)
+    return index
+
+
+def parse_range(value: Optional[str]) -> Optional[Range]:
+    """'25-35' -> (25, 35); '500-' and '-1000' leave one side open"""
+    if not value:
+        return None
+    low, _, high = value.partition('-')
+    try:
+        return (float(low) if low else None, float(high) if high else None)
+    except ValueError:
+        raise ValueError(f"invalid range {value!r}; expected e.g. 25-35, 25- or -35") from None
+
+
+def _split(values: Optional[Iterable[str]]) -> Optional[List[str]]:
+    # Accept repeated parameters as well as comma-separated lists
+    if not values:
+        return None
+    return [part.strip() for value in values for part in value.split(',') if part.strip()]
+
+
+def run_query(index: CandidateIndex, params: Dict[str, Optional[Iterable[str]]],
+              limit: Optional[int] = 50, offset: int = 0) -> Dict:
+    """Answer a query given as lists of strings per field (HTTP and CLI share this)"""
+    filters = {field: _split(params.get(field)) for field in CATEGORICAL_FIELDS}
+    ranges = {}
+    for field in RANGE_FIELDS:
+        values = params.get(field)
+        bounds = parse_range(values[-1]) if values else None
+        if bounds:
+            ranges[field] = bounds
+    result = index.query(ranges, limit=limit, offset=offset, **filters)
+    return {'total': result.total, 'took_us': round(result.seconds * 1e6, 1), 'rows': result.rows}
+
+
+def serve(index: CandidateIndex, port: int = 8080, host: str = '127.0.0.1'):
+    """Serve /query and /facets as JSON until interrupted"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _json(self, status: int, payload: Dict):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            try:
+                if url.path == '/query':
+                    limit = int(params.get('limit', ['50'])[0])
+                    offset = int(params.get('offset', ['0'])[0])
+                    self._json(200, run_query(index, params, limit, offset))
+                elif url.path == '/facets':
+                    filters = {field: _split(params.get(field)) for field in CATEGORICAL_FIELDS}
+                    self._json(200, index.facets(**filters))
+                else:
+                    self._json(404, {'error': f"unknown path {url.path}; use /query or /facets"})
+            except ValueError as e:
+                self._json(400, {'error': str(e)})
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    logger.info(f"Serving {index.n_rows} candidates at http://{host}:{port}/query")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Query candidates through the indexed dataset")
+    parser.add_argument('--csv', default='accountants.csv', help="source dataset (default: accountants.csv)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query = commands.add_parser('query', help="print matching candidates as JSON")
+    for field in CATEGORICAL_FIELDS:
+        query.add_argument(f"--{field.replace('_', '-')}", dest=field, action='append',
+                           help=f"{field} value(s), comma-separated or repeated")
+    query.add_argument('--age', action='append', help="age range, e.g. 25-35 or 40-")
+    query.add_argument('--salary', action='append', help="minimum salary range in AZN, e.g. 500-1000")
+    query.add_argument('--limit', type=int, default=20)
+    query.add_argument('--offset', type=int, default=0)
+
+    server = commands.add_parser('serve', help="serve /query and /facets over HTTP")
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=8080)
+    for command in (query, server):
+        # Also accepted after the command name, as `muhasib.py query --csv ...` passes it
+        command.add_argument('--csv', default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+    index = open_index(args.csv)
+    if args.command == 'serve':
+        serve(index, args.port, args.host)
+        return
+    params = {field: getattr(args, field) for field in (*CATEGORICAL_FIELDS, *RANGE_FIELDS)}
+    print(json.dumps(run_query(index, params, args.limit, args.offset), ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
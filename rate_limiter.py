@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Request rate limiting and retry backoff for the Muhasib.az scraper.
+
+The limiter hands out time slots instead of sleeping itself, so the
+same instance can pace blocking callers (time.sleep) and asyncio callers
+(asyncio.sleep) against one shared per-host budget.
+
+AdaptiveRateLimiter is a token bucket whose refill rate follows AIMD: it
+grows additively while responses come back quickly and is cut
+multiplicatively on 429/5xx responses or when latency climbs well above
+its baseline. A Retry-After header pauses the host outright. RetryPolicy
+computes jittered exponential backoff delays for failed requests.
+"""
+
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean "slow down / try again later" rather than "this page is broken"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class _HostBucket:
+    """Token bucket and congestion state for one host"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+
+
+class AdaptiveRateLimiter:
+    """Per-host token bucket whose rate adapts to errors and latency (AIMD)"""
+
+    def __init__(self, requests_per_second: float = 4.0, min_rps: Optional[float] = None,
+                 max_rps: Optional[float] = None, burst: float = 1.0, increase: float = 0.5,
+                 decrease: float = 0.5, latency_factor: float = 3.0, min_latency: float = 0.25):
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        self.initial_rps = requests_per_second
+        self.min_rps = min(min_rps or requests_per_second / 16, requests_per_second)
+        self.max_rps = max(max_rps or requests_per_second * 4, requests_per_second)
+        self.burst = max(burst, 1.0)
+        # Requests per second added for each second's worth of healthy responses
+        self.increase = increase
+        self.decrease = decrease
+        # Latency this many times the baseline (and above min_latency) counts as congestion
+        self.latency_factor = latency_factor
+        self.min_latency = min_latency
+        self._buckets: Dict[str, _HostBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> _HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _HostBucket(self.initial_rps, self.burst)
+        return bucket
+
+    def rate(self, url: str) -> float:
+        """Current requests-per-second budget for the URL's host"""
+        with self._lock:
+            return self._bucket(urlparse(url).netloc).rate
+
+    def reserve(self, url: str) -> float:
+        """Take a token for the URL's host and return how long to wait before using it"""
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            # Tokens may go negative: each waiter is queued behind the ones before it
+            bucket.tokens -= 1
+            delay = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+            return max(delay, bucket.blocked_until - now)
+
+    def wait(self, url: str):
+        """Block until the caller may send a request to the URL's host"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, url: str, status: Optional[int], latency: float, retry_after: Optional[float] = None):
+        """Feed back the outcome of a request; `status` is None for connection errors and timeouts"""
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            if retry_after:
+                bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+                logger.warning(f"{host} asked us to wait {retry_after:.1f}s (Retry-After)")
+
+            if status is None or status in RETRY_STATUSES:
+                self._slow_down(host, bucket, now, f"HTTP {status}" if status else "connection error")
+                return
+
+            bucket.latency = latency if bucket.latency is None else 0.8 * bucket.latency + 0.2 * latency
+            bucket.baseline = bucket.latency if bucket.baseline is None else min(bucket.baseline, bucket.latency)
+            threshold = max(bucket.baseline * self.latency_factor, self.min_latency)
+            if bucket.latency > threshold:
+                self._slow_down(host, bucket, now, f"latency {bucket.latency:.2f}s above {threshold:.2f}s")
+            elif bucket.rate < self.max_rps:
+                bucket.rate = min(self.max_rps, bucket.rate + self.increase / bucket.rate)
+
+    def _slow_down(self, host: str, bucket: _HostBucket, now: float, reason: str):
+        # Concurrent in-flight requests report the same congestion; cut once per round trip
+        if now - bucket.last_decrease < max(1.0 / bucket.rate, bucket.latency or 0.0):
+            return
+        previous = bucket.rate
+        bucket.rate = max(self.min_rps, bucket.rate * self.decrease)
+        bucket.last_decrease = now
+        if bucket.latency is not None:
+            # Let the latency average recover instead of cutting again on stale samples
+            bucket.latency = bucket.baseline
+        logger.warning(f"Slowing down {host}: {reason}; rate {previous:.2f} -> {bucket.rate:.2f} req/s")
+
+
+class RetryPolicy:
+    """Bounded retries with full-jitter exponential backoff"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.max_retries = max(max_retries, 0)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, attempt: int, status: Optional[int]) -> bool:
+        """Whether a request that failed on `attempt` (0-based) with `status` is worth retrying"""
+        return attempt < self.max_retries and (status is None or status in RETRY_STATUSES)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before the retry following `attempt`, never less than Retry-After"""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(backoff, retry_after or 0.0)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Streaming output sinks for scraped profile records.
+
+A sink receives each record as soon as it is parsed and flushes to disk
+periodically, so memory does not grow with the crawl and an interrupted
+run still leaves a usable partial file. CSV and Parquet writers are
+provided; open_sink picks one from the output file extension and
+read_records reads either format back.
+"""
+
+import csv
+import logging
+import time
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES = ['id', 'url', 'name', 'city', 'phone', 'email', 'age', 'gender',
+              'marital_status', 'category', 'position', 'min_salary',
+              'education', 'experience', 'skills']
+
+
+class RecordSink:
+    """Destination that receives records one at a time"""
+
+    def __init__(self, path: str, fieldnames: Optional[List[str]] = None,
+                 flush_every: int = 100, flush_interval: float = 10.0):
+        self.path = path
+        self.fieldnames = fieldnames or FIELDNAMES
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _row(self, record: Dict) -> Dict:
+        # Ensure all fieldnames exist in the row
+        return {field: record.get(field, '') for field in self.fieldnames}
+
+    def write(self, record: Dict):
+        """Write one record, flushing if enough records or time have accumulated"""
+        self._write(self._row(record))
+        self.count += 1
+        self._pending += 1
+        if (self._pending >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Push buffered records to disk"""
+        if self._pending:
+            self._flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Flush remaining records and release the file"""
+        self.flush()
+        self._close()
+        logger.info(f"Data saved to {self.path} ({self.count} records)")
+
+    def _write(self, row: Dict):
+        raise NotImplementedError
+
+    def _flush(self):
+        pass
+
+    def _close(self):
+        pass
+
+
+class CsvSink(RecordSink):
+    """Incremental CSV writer"""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(path, **kwargs)
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+        self._writer.writeheader()
+        self._file.flush()
+
+    def _write(self, row: Dict):
+        self._writer.writerow(row)
+
+    def _flush(self):
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetSink(RecordSink):
+    """Arrow/Parquet writer that buffers records into row groups"""
+
+    def __init__(self, path: str, row_group_size: int = 1000, **kwargs):
+        kwargs.setdefault('flush_every', row_group_size)
+        kwargs.setdefault('flush_interval', 60.0)
+        super().__init__(path, **kwargs)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        self._schema = pa.schema([(field, pa.string()) for field in self.fieldnames])
+        self._writer = pq.ParquetWriter(path, self._schema, compression='zstd')
+        self._columns: Dict[str, List[str]] = {field: [] for field in self.fieldnames}
+
+    def _write(self, row: Dict):
+        for field in self.fieldnames:
+            value = row[field]
+            self._columns[field].append(None if value is None else str(value))
+
+    def _flush(self):
+        # Every flush becomes one row group
+        table = self._pa.Table.from_pydict(self._columns, schema=self._schema)
+        self._writer.write_table(table)
+        self._columns = {field: [] for field in self.fieldnames}
+
+    def _close(self):
+        self._writer.close()
+
+
+def open_sink(path: str, **kwargs) -> RecordSink:
+    """Open a sink for the output path, choosing the format from its extension"""
+    if path.endswith('.parquet'):
+        return ParquetSink(path, **kwargs)
+    return CsvSink(path, **kwargs)
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """Yield the records of a CSV or Parquet output file as dicts of strings"""
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet input requires pyarrow (pip install pyarrow)") from e
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+        return
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Typed profile records and per-field extraction validation.
+
+parse_profile() returns the raw label and section text of a page. Each
+raw profile is turned once into an AccountantRecord: age and salary are
+parsed to ints, gender to a Gender member, and every field is checked.
+Fields that are missing or fail to parse are counted per field in a
+ValidationReport instead of being silently passed on, so a layout change
+on the site shows up as a jump in one field's failure count.
+
+AccountantRecord uses __slots__, so a record holds its values without a
+per-instance dict. to_dict() renders the sink schema, with the parsed
+salary in min_salary, so output files keep their columns.
+
+    python records.py accountants.csv    # per-field failure counts for an existing output
+"""
+
+import argparse
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from profile_parser import PROFILE_LABELS
+from text_fold import fold
+
+MISSING = 'missing'
+INVALID = 'invalid'
+
+# Plausible ages for a job seeker; anything outside is an extraction error
+AGE_RANGE = (14, 100)
+NUMBER = re.compile(r'\d+')
+LABEL_FIELDS = ('marital_status', 'category', 'position')
+# Section header text that ends up as the value when a section is empty
+SECTION_HEADERS = {'tehsil', 'tehsil:', 'is tecrubesi', 'bilik ve bacariqlar'}
+
+
+class Gender(Enum):
+    MALE = 'Kişi'
+    FEMALE = 'Qadın'
+
+    @classmethod
+    def parse(cls, value: str) -> Optional['Gender']:
+        """Match the site's gender text regardless of case and diacritics"""
+        return _GENDERS.get(fold(value.strip()))
+
+
+_GENDERS = {fold(member.value): member for member in Gender}
+
+
+def _strip_labels(value: str) -> str:
+    """Cut a label value at the first following label, for outputs written before the parser stopped there"""
+    for label in PROFILE_LABELS.values():
+        end = value.find(label)
+        if end > 0:
+            value = value[:end].strip()
+    return value
+
+
+class FieldError(NamedTuple):
+    field: str
+    reason: str  # MISSING or INVALID
+
+
+@dataclass(slots=True)
+class AccountantRecord:
+    id: int
+    url: str = ''
+    name: str = ''
+    city: str = ''
+    phone: str = ''
+    email: str = ''
+    age: Optional[int] = None
+    gender: Optional[Gender] = None
+    marital_status: str = ''
+    category: str = ''
+    position: str = ''
+    salary: Optional[int] = None
+    education: str = ''
+    experience: str = ''
+    skills: str = ''
+
+    @classmethod
+    def from_profile(cls, data: Dict) -> Tuple['AccountantRecord', List[FieldError]]:
+        """Parse and validate a raw profile (or an output row) into a record and its field errors"""
+        errors: List[FieldError] = []
+
+        def text(field: str, required: bool = True) -> str:
+            value = str(data.get(field) or '').strip()
+            if not value and required:
+                errors.append(FieldError(field, MISSING))
+            return value
+
+        def number(field: str, raw: str) -> Optional[int]:
+            if not raw:
+                return None
+            match = NUMBER.search(raw)
+            if match is None:
+                errors.append(FieldError(field, INVALID))
+                return None
+            return int(match.group())
+
+        raw_id = text('id')
+        if raw_id and not raw_id.isdigit():
+            errors.append(FieldError('id', INVALID))
+        record = cls(id=int(raw_id) if raw_id.isdigit() else 0, url=text('url', required=False))
+
+        record.name = text('name')
+        record.city = text('city')
+        if record.city.startswith('Tel.:'):
+            # The contact block ran on past an empty city
+            errors.append(FieldError('city', INVALID))
+            record.city = ''
+        record.phone = text('phone')
+        record.email = text('email')
+        if record.email and '@' not in record.email:
+            errors.append(FieldError('email', INVALID))
+
+        record.age = number('age', text('age'))
+        if record.age is not None and not AGE_RANGE[0] <= record.age <= AGE_RANGE[1]:
+            errors.append(FieldError('age', INVALID))
+            record.age = None
+        raw_gender = text('gender')
+        record.gender = Gender.parse(raw_gender) if raw_gender else None
+        if raw_gender and record.gender is None:
+            errors.append(FieldError('gender', INVALID))
+
+        for field in LABEL_FIELDS:
+            setattr(record, field, _strip_labels(text(field)))
+        record.salary = number('salary', text('min_salary', required=False) or text('salary'))
+
+        for field in ('education', 'experience', 'skills'):
+            value = text(field)
+            if value and fold(value) in SECTION_HEADERS:
+                errors.append(FieldError(field, MISSING))
+                value = ''
+            setattr(record, field, value)
+        return record, errors
+
+    def to_dict(self) -> Dict[str, str]:
+        """The record in the sink schema, as strings"""
+        return {
+            'id': str(self.id), 'url': self.url, 'name': self.name, 'city': self.city,
+            'phone': self.phone, 'email': self.email,
+            'age': '' if self.age is None else str(self.age),
+            'gender': self.gender.value if self.gender else '',
+            'marital_status': self.marital_status, 'category': self.category, 'position': self.position,
+            'min_salary': '' if self.salary is None else str(self.salary),
+            'education': self.education, 'experience': self.experience, 'skills': self.skills,
+        }
+
+
+class ValidationReport:
+    """Per-field counts of missing and invalid values over many records (not thread-safe on its own)"""
+
+    def __init__(self):
+        self.records = 0
+        self.failures: Counter = Counter()
+
+    def add(self, errors: Iterable[FieldError]):
+        self.records += 1
+        self.failures.update(errors)
+
+    def merge(self, other: 'ValidationReport'):
+        self.records += other.records
+        self.failures.update(other.failures)
+
+    def summary(self) -> Dict:
+        by_field: Dict[str, Dict[str, int]] = {}
+        for (field, reason), count in sorted(self.failures.items()):
+            by_field.setdefault(field, {})[reason] = count
+        return {'records': self.records, 'fields': by_field}
+
+    def log_line(self) -> str:
+        if not self.failures:
+            return f"{self.records} records, no field failures"
+        worst = ', '.join(f"{field} {reason} {count}" for (field, reason), count in self.failures.most_common(5))
+        return f"{self.records} records, field failures: {worst}"
+
+
+def load_records(path: str, report: Optional[ValidationReport] = None) -> Iterator[AccountantRecord]:
+    """Typed records from a CSV or Parquet output file"""
+    from record_sinks import read_records
+
+    for row in read_records(path):
+        record, errors = AccountantRecord.from_profile(row)
+        if report is not None:
+            report.add(errors)
+        yield record
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Count per-field validation failures in a scraper output file")
+    parser.add_argument('path', nargs='?', default='accountants.csv', help="CSV or Parquet file (default: accountants.csv)")
+    args = parser.parse_args(argv)
+
+    report = ValidationReport()
+    for _ in load_records(args.path, report):
+        pass
+    print(json.dumps(report.summary(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
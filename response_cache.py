@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+On-disk HTTP response cache for the Muhasib.az scraper.
+
+Response bodies are stored zlib-compressed under their SHA-256 digest, so
+identical pages are kept once. A small SQLite index maps each URL to its
+blob together with the fetch time, last access time and HTTP validators.
+Entries older than the TTL are treated as misses by get(); the scraper
+revalidates them with their stored validators and refresh()es them on a
+304. The least recently used entries are evicted once the blobs exceed
+the size limit.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    """A cached response body with the headers needed for revalidation"""
+    url: str
+    content: bytes
+    fetched_at: float
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class ResponseCache:
+    """Content-addressed, compressed response store with TTL and LRU size eviction"""
+
+    def __init__(self, directory: str = '.http_cache', ttl: Optional[float] = 24 * 3600,
+                 max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self._lock = threading.Lock()
+        # Fetch workers run in threads, so the connection is shared under the lock
+        self.conn = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+            CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+        ''')
+        self.conn.commit()
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, 'objects', digest[:2], digest[2:])
+
+    def _read_blob(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                return zlib.decompress(f.read())
+        except (OSError, zlib.error) as e:
+            logger.warning(f"Unreadable cache blob {digest}: {e}")
+            return None
+
+    def get(self, url: str, allow_stale: bool = False) -> Optional[CachedResponse]:
+        """Return the cached response for a URL, or None if missing or older than the TTL"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT digest, fetched_at, etag, last_modified FROM entries WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            digest, fetched_at, etag, last_modified = row
+            if not allow_stale and self.ttl is not None and time.time() - fetched_at > self.ttl:
+                return None
+            content = self._read_blob(digest)
+            if content is None:
+                return None
+            with self.conn:
+                self.conn.execute('UPDATE entries SET accessed_at = ? WHERE url = ?', (time.time(), url))
+        return CachedResponse(url, content, fetched_at, etag, last_modified)
+
+    def is_fresh(self, cached: CachedResponse) -> bool:
+        """Whether a cached response is still within the TTL"""
+        return self.ttl is None or time.time() - cached.fetched_at <= self.ttl
+
+    def refresh(self, url: str):
+        """Restart an entry's TTL after the server confirmed it unchanged (a 304)"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE url = ?', (now, now, url))
+
+    def put(self, url: str, content: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store a response body for a URL, evicting old entries if the cache is over its size limit"""
+        digest = hashlib.sha256(content).hexdigest()
+        now = time.time()
+        with self._lock:
+            known = self.conn.execute('SELECT 1 FROM blobs WHERE digest = ?', (digest,)).fetchone()
+            with self.conn:
+                if not known:
+                    path = self._blob_path(digest)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    compressed = zlib.compress(content, 6)
+                    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(compressed)
+                    os.replace(tmp_path, path)
+                    self.conn.execute('INSERT INTO blobs (digest, size) VALUES (?, ?)', (digest, len(compressed)))
+                    self.total_bytes += len(compressed)
+                previous = self.conn.execute('SELECT digest FROM entries WHERE url = ?', (url,)).fetchone()
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO entries (url, digest, fetched_at, accessed_at, etag, last_modified)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (url, digest, now, now, etag, last_modified))
+                if previous and previous[0] != digest:
+                    self._drop_blob_if_unused(previous[0])
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _drop_blob_if_unused(self, digest: str):
+        if self.conn.execute('SELECT 1 FROM entries WHERE digest = ? LIMIT 1', (digest,)).fetchone():
+            return
+        row = self.conn.execute('SELECT size FROM blobs WHERE digest = ?', (digest,)).fetchone()
+        self.conn.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+        if row:
+            self.total_bytes -= row[0]
+        try:
+            os.remove(self._blob_path(digest))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until the blobs fit in max_bytes"""
+        evicted = 0
+        with self.conn:
+            rows = self.conn.execute('SELECT url, digest FROM entries ORDER BY accessed_at').fetchall()
+            for url, digest in rows:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                self.conn.execute('DELETE FROM entries WHERE url = ?', (url,))
+                self._drop_blob_if_unused(digest)
+                evicted += 1
+        logger.info(f"Evicted {evicted} cached responses; cache size now {self.total_bytes} bytes")
+
+    def iter_responses(self, url_pattern: str = '%') -> Iterator[Tuple[str, bytes]]:
+        """Yield (url, content) for every cached URL matching a SQL LIKE pattern, ignoring the TTL"""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT url, digest FROM entries WHERE url LIKE ? ORDER BY url', (url_pattern,)
+            ).fetchall()
+        for url, digest in rows:
+            content = self._read_blob(digest)
+            if content is not None:
+                yield url, content
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of cached URLs, distinct blobs and total compressed bytes"""
+        with self._lock:
+            entries = self.conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            blobs = self.conn.execute('SELECT COUNT(*) FROM blobs').fetchone()[0]
+        return {'entries': entries, 'blobs': blobs, 'bytes': self.total_bytes}
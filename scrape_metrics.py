@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Run metrics for the Muhasib.az scraper.
+
+The scraper records every network fetch (latency, status, bytes), every
+parse (time per listing or profile page) and every profile outcome
+(written, unchanged, retried, dropped) into one ScrapeMetrics object.
+At the end of a run it can be written as a Prometheus text-format file,
+for node_exporter's textfile collector or a push gateway, and as a JSON
+summary whose fetch and parse totals show whether the site or the parser
+limited throughput.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from records import FieldError, ValidationReport
+
+PREFIX = 'muhasib_scraper'
+
+# Upper bounds in seconds; the last bucket (+Inf) is implicit
+FETCH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style (not thread-safe on its own)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket, as histogram_quantile() does"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'total_seconds': round(self.sum, 4),
+            'mean_seconds': round(self.sum / self.count, 4) if self.count else 0.0,
+            'p50_seconds': round(self.quantile(0.5), 4),
+            'p95_seconds': round(self.quantile(0.95), 4),
+            'p99_seconds': round(self.quantile(0.99), 4),
+            'max_seconds': round(self.max, 4),
+        }
+
+    def prometheus_lines(self, name: str, labels: str = '') -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            cumulative += bucket_count
+            le = f'le="{bound}"'
+            lines.append(f"{name}_bucket{{{labels + ',' if labels else ''}{le}}} {cumulative}")
+        suffix = f"{{{labels}}}" if labels else ''
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class ScrapeMetrics:
+    """Thread-safe counters and histograms for one scrape run"""
+
+    # Profile outcome counters, with their Prometheus help text
+    COUNTERS = {
+        'records': "Profiles parsed and written to the output",
+        'not_modified': "Profiles revalidated as unchanged since the last crawl",
+        'retries': "Requests retried after a failure",
+        'drops': "Profiles given up on after all retries",
+        'cache_hits': "Pages served from the response cache",
+        'cache_revalidations': "Stale cached pages confirmed unchanged by a 304",
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fetch = Histogram(FETCH_BUCKETS)
+        self.parse = {'listing': Histogram(PARSE_BUCKETS), 'profile': Histogram(PARSE_BUCKETS)}
+        self.status_counts: Dict[str, int] = {}
+        self.response_bytes = 0
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.validation = ValidationReport()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def observe_fetch(self, seconds: float, status, response_bytes: int = 0):
+        """Record one network request; `status` is the HTTP status code or an error name"""
+        with self._lock:
+            self.fetch.observe(seconds)
+            key = str(status)
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+            self.response_bytes += response_bytes
+
+    def observe_parse(self, kind: str, seconds: float):
+        """Record the time spent parsing one 'listing' or 'profile' page"""
+        with self._lock:
+            self.parse[kind].observe(seconds)
+
+    def observe_validation(self, errors: Iterable[FieldError]):
+        """Record the field failures of one parsed profile"""
+        with self._lock:
+            self.validation.add(errors)
+
+    def increment(self, counter: str, amount: int = 1):
+        with self._lock:
+            self.counters[counter] += amount
+
+    def records_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.counters['records'] / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> Dict:
+        """End-of-run summary as a JSON-serialisable dict"""
+        with self._lock:
+            return {
+                'elapsed_seconds': round(self.elapsed, 3),
+                'records_per_second': round(self.records_per_second(), 3),
+                **self.counters,
+                'http_status': dict(sorted(self.status_counts.items())),
+                'response_bytes': self.response_bytes,
+                'fetch': self.fetch.summary(),
+                'parse': {kind: histogram.summary() for kind, histogram in self.parse.items()},
+                'validation': self.validation.summary(),
+            }
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                f"# HELP {PREFIX}_fetch_seconds Time to fetch a page from the network",
+                f"# TYPE {PREFIX}_fetch_seconds histogram",
+                *self.fetch.prometheus_lines(f"{PREFIX}_fetch_seconds"),
+                f"# HELP {PREFIX}_parse_seconds Time to parse one page",
+                f"# TYPE {PREFIX}_parse_seconds histogram",
+            ]
+            for kind, histogram in self.parse.items():
+                lines.extend(histogram.prometheus_lines(f"{PREFIX}_parse_seconds", f'page="{kind}"'))
+            lines += [
+                f"# HELP {PREFIX}_http_responses_total Network requests by HTTP status or error",
+                f"# TYPE {PREFIX}_http_responses_total counter",
+                *(f'{PREFIX}_http_responses_total{{status="{status}"}} {count}'
+                  for status, count in sorted(self.status_counts.items())),
+                f"# HELP {PREFIX}_response_bytes_total Response body bytes received from the network",
+                f"# TYPE {PREFIX}_response_bytes_total counter",
+                f"{PREFIX}_response_bytes_total {self.response_bytes}",
+            ]
+            for counter, help_text in self.COUNTERS.items():
+                lines += [
+                    f"# HELP {PREFIX}_{counter}_total {help_text}",
+                    f"# TYPE {PREFIX}_{counter}_total counter",
+                    f"{PREFIX}_{counter}_total {self.counters[counter]}",
+                ]
+            lines += [
+                f"# HELP {PREFIX}_field_failures_total Parsed profiles with a missing or invalid field",
+                f"# TYPE {PREFIX}_field_failures_total counter",
+                *(f'{PREFIX}_field_failures_total{{field="{field}",reason="{reason}"}} {count}'
+                  for (field, reason), count in sorted(self.validation.failures.items())),
+                f"# HELP {PREFIX}_records_per_second Records written per second of run time",
+                f"# TYPE {PREFIX}_records_per_second gauge",
+                f"{PREFIX}_records_per_second {self.records_per_second():.3f}",
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        # Write then rename so a collector never reads a half-written file
+        _write_atomic(path, self.to_prometheus())
+
+    def write_summary(self, path: str):
+        _write_atomic(path, json.dumps(self.summary(), indent=2) + '\n')
+
+    def log_line(self) -> str:
+        """One-line digest for the end-of-run log"""
+        summary = self.summary()
+        fetch, profile = summary['fetch'], summary['parse']['profile']
+        return (f"{summary['records']} records in {summary['elapsed_seconds']:.1f}s "
+                f"({summary['records_per_second']:.1f}/s); "
+                f"fetch p50 {fetch['p50_seconds'] * 1000:.0f}ms p95 {fetch['p95_seconds'] * 1000:.0f}ms "
+                f"over {fetch['count']} requests ({fetch['total_seconds']:.1f}s total); "
+                f"parse mean {profile['mean_seconds'] * 1000:.1f}ms ({profile['total_seconds']:.1f}s total); "
+                f"{summary['retries']} retries, {summary['drops']} dropped, status {summary['http_status']}")
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
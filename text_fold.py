@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+Azerbaijani case and diacritic folding shared by the record model and search.
+
+İ/I lower-case to i, and ə, ı, ö, ü, ç, ş, ğ become e, i, o, u, c, s, g,
+so "mühasib", "muhasib" and "MÜHASİB" fold to the same text.
+"""
+
+# Upper-case dotted/dotless I first, since str.lower() turns İ into i plus a combining dot
+_FOLD_UPPER = str.maketrans({'İ': 'i', 'I': 'i'})
+_FOLD_LOWER = str.maketrans({'ə': 'e', 'ı': 'i', 'ö': 'o', 'ü': 'u', 'ç': 'c', 'ş': 's', 'ğ': 'g'})
+
+
+def fold(text: str) -> str:
+    """Lower-case and strip Azerbaijani diacritics: 'Mühasibat uçotu' -> 'muhasibat ucotu'"""
+    return text.translate(_FOLD_UPPER).lower().translate(_FOLD_LOWER)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Ranked full-text search over the education, experience and skills sections.
+
+Text is folded the Azerbaijani way before indexing and querying: İ/I
+lower-case to i, and ə, ı, ö, ü, ç, ş, ğ become e, i, o, u, c, s, g, so
+"mühasib", "muhasib" and "MÜHASİB" are the same term. Every term of a
+query also matches longer terms that start with it ("mühasib" finds
+"mühasibat"), using bisect over the sorted vocabulary. Hits are ranked
+with BM25.
+
+The index is an in-memory inverted index that is updated per profile:
+adding a profile that is already indexed replaces it, and unchanged
+profiles are skipped by a hash of their text. It is pickled under .cache/
+and synced against the source file on open, so only profiles that are new
+or changed since the last run are re-tokenised.
+
+    python text_search.py "1C mühasib IFRS"
+    python text_search.py "audit" --source accountants.parquet --limit 20
+"""
+
+import argparse
+import hashlib
+import heapq
+import logging
+import math
+import pickle
+import re
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from text_fold import fold
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path('.cache')
+# Bump when tokenisation or the pickled layout changes, to force a rebuild
+INDEX_VERSION = 2
+
+SEARCH_FIELDS = ('education', 'experience', 'skills')
+
+TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(fold(text))
+
+
+def profile_text(record: Dict, fields: Sequence[str] = SEARCH_FIELDS) -> str:
+    return ' '.join(str(record.get(field) or '') for field in fields)
+
+
+class Hit(NamedTuple):
+    id: str
+    score: float
+    name: str
+
+
+class SearchIndex:
+    """Incrementally updated inverted index with BM25 ranking"""
+
+    def __init__(self, fields: Sequence[str] = SEARCH_FIELDS, k1: float = 1.2, b: float = 0.75):
+        self.fields = tuple(fields)
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}  # term -> {profile id: term frequency}
+        self.vocabulary: List[str] = []  # sorted, for prefix lookups
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.digests: Dict[str, str] = {}
+        self.names: Dict[str, str] = {}
+        self.total_length = 0
+        self.source_hash = ''
+        self._norms: Optional[Dict[str, float]] = None  # BM25 length normalisation, reset on every change
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, record: Dict) -> bool:
+        """Index or re-index one profile; returns False if its text is unchanged (its name is still updated)"""
+        profile_id = str(record['id'])
+        text = profile_text(record, self.fields)
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+        if self.digests.get(profile_id) == digest:
+            # The name is not part of the digest, so a renamed profile with the same text still needs it
+            self.names[profile_id] = str(record.get('name') or '')
+            return False
+        self.remove(profile_id)
+
+        terms = Counter(tokenize(text))
+        for term, count in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                insort(self.vocabulary, term)
+            postings[profile_id] = count
+        length = sum(terms.values())
+        self.doc_terms[profile_id] = dict(terms)
+        self.lengths[profile_id] = length
+        self.total_length += length
+        self.digests[profile_id] = digest
+        self.names[profile_id] = str(record.get('name') or '')
+        self._norms = None
+        return True
+
+    def remove(self, profile_id: str) -> bool:
+        terms = self.doc_terms.pop(profile_id, None)
+        if terms is None:
+            return False
+        for term in terms:
+            postings = self.postings[term]
+            del postings[profile_id]
+            if not postings:
+                del self.postings[term]
+                del self.vocabulary[bisect_left(self.vocabulary, term)]
+        self.total_length -= self.lengths.pop(profile_id)
+        del self.digests[profile_id]
+        del self.names[profile_id]
+        self._norms = None
+        return True
+
+    def update(self, records: Iterable[Dict], remove_missing: bool = False) -> Dict[str, int]:
+        """Add new and changed profiles; optionally drop indexed profiles absent from `records`"""
+        seen = set()
+        changed = 0
+        for record in records:
+            if not record.get('id'):
+                continue
+            seen.add(str(record['id']))
+            changed += self.add(record)
+        removed = 0
+        if remove_missing:
+            for profile_id in [profile_id for profile_id in self.lengths if profile_id not in seen]:
+                removed += self.remove(profile_id)
+        return {'indexed': changed, 'removed': removed, 'unchanged': len(seen) - changed}
+
+    def expand(self, term: str, prefix: bool = True, max_expansions: int = 50) -> List[str]:
+        """Indexed terms matching a query term: itself and, with `prefix`, the terms it starts"""
+        if not prefix:
+            return [term] if term in self.postings else []
+        start = bisect_left(self.vocabulary, term)
+        end = bisect_left(self.vocabulary, term + '\uffff', start)
+        matches = self.vocabulary[start:end]
+        if len(matches) > max_expansions:
+            # Keep the most common expansions; the exact term sorts first when present
+            matches = matches[:1] + heapq.nlargest(max_expansions - 1, matches[1:],
+                                                   key=lambda match: len(self.postings[match]))
+        return matches
+
+    def idf(self, term: str) -> float:
+        frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self) - frequency + 0.5) / (frequency + 0.5))
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True) -> List[Hit]:
+        """Profiles ranked by BM25 over the query terms, best first"""
+        if not self.lengths:
+            return []
+        norms = self._norms
+        if norms is None:
+            average_length = self.total_length / len(self) or 1
+            norms = self._norms = {profile_id: self.k1 * (1 - self.b + self.b * length / average_length)
+                                   for profile_id, length in self.lengths.items()}
+        scores: Dict[str, float] = {}
+        for query_term in dict.fromkeys(tokenize(query)):
+            # A query term scores each profile once, by its best-matching expansion
+            term_scores: Dict[str, float] = {}
+            for term in self.expand(query_term, prefix):
+                weight = self.idf(term) * (self.k1 + 1)
+                for profile_id, frequency in self.postings[term].items():
+                    score = weight * frequency / (frequency + norms[profile_id])
+                    if score > term_scores.get(profile_id, 0.0):
+                        term_scores[profile_id] = score
+            for profile_id, score in term_scores.items():
+                scores[profile_id] = scores.get(profile_id, 0.0) + score
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [Hit(profile_id, round(score, 4), self.names[profile_id]) for profile_id, score in best]
+
+    # Saved as plain containers, not the instance, so the file loads whatever module name built it
+    STATE_FIELDS = ('fields', 'k1', 'b', 'postings', 'vocabulary', 'doc_terms', 'lengths', 'digests', 'names',
+                    'total_length', 'source_hash')
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(f"{path}.tmp")
+        with open(tmp_path, 'wb') as f:
+            state = {field: getattr(self, field) for field in self.STATE_FIELDS}
+            pickle.dump({'version': INDEX_VERSION, **state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'SearchIndex':
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('version') != INDEX_VERSION:
+            raise ValueError(f"{path} was written by an incompatible version")
+        index = cls(state['fields'], state['k1'], state['b'])
+        for field in cls.STATE_FIELDS:
+            setattr(index, field, state[field])
+        return index
+
+
+def open_search_index(source='accountants.csv', cache_dir=CACHE_DIR, rebuild: bool = False) -> SearchIndex:
+    """Load the saved index for `source` and bring it up to date with the file's current records"""
+    from dataset import file_hash
+    from record_sinks import read_records
+
+    source = Path(source)
+    # Keyed by the absolute path, so accountants.csv and accountants.parquet keep separate indexes
+    key = hashlib.sha256(str(source.resolve()).encode('utf-8')).hexdigest()[:16]
+    index_file = Path(cache_dir) / f"{source.stem}-{key}-search-v{INDEX_VERSION}.pkl"
+    index = None
+    if index_file.exists() and not rebuild:
+        try:
+            index = SearchIndex.load(index_file)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable search index {index_file}: {e}")
+    index = index or SearchIndex()
+
+    source_hash = file_hash(source)
+    if index.source_hash != source_hash:
+        started = time.perf_counter()
+        stats = index.update(read_records(str(source)), remove_missing=True)
+        index.source_hash = source_hash
+        index.save(index_file)
+        logger.info(f"Search index synced with {source} in {time.perf_counter() - started:.2f}s: "
+                    f"{stats['indexed']} indexed, {stats['removed']} removed, {stats['unchanged']} unchanged")
+    return index
+
+
+def main(argv: Optional[List[str]] = None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Ranked search over profile education, experience and skills")
+    parser.add_argument('query', help='search terms, e.g. "1C mühasib IFRS"')
+    parser.add_argument('--source', default='accountants.csv', help="CSV or Parquet records (default: accountants.csv)")
+    parser.add_argument('--limit', type=int, default=10, help="number of hits (default: 10)")
+    parser.add_argument('--exact', action='store_true', help="match whole terms only, without prefix expansion")
+    parser.add_argument('--rebuild', action='store_true', help="ignore the saved index and re-index every profile")
+    args = parser.parse_args(argv)
+
+    index = open_search_index(args.source, rebuild=args.rebuild)
+    started = time.perf_counter()
+    hits = index.search(args.query, args.limit, prefix=not args.exact)
+    elapsed = time.perf_counter() - started
+    for rank, hit in enumerate(hits, 1):
+        print(f"{rank:>3}. {hit.score:8.3f}  {hit.id:>6}  {hit.name}")
+    print(f"{len(hits)} hits from {len(index)} profiles in {elapsed * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Durable work queue for sharded, multi-worker crawling.
+
+The crawl is split into shards (ranges of listing pages or of profile
+IDs) published to a SQLite queue file. Any number of worker processes,
+on one host or several hosts sharing the file, claim shards under a
+time-limited lease and keep it alive with heartbeats while they work. A
+worker that dies stops heartbeating, its lease expires and the shard is
+claimed again by someone else.
+
+Records are stored in the queue keyed by profile ID, so a shard that is
+processed twice overwrites rather than duplicates. A restarted shard
+skips profiles it has already stored. merge() writes the single combined
+output.
+
+    python work_queue.py publish --pages 1-40 --per-shard 4
+    python work_queue.py worker --worker-id host-a      # run several of these
+    python work_queue.py status
+    python work_queue.py merge --output accountants.csv
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from record_sinks import RecordSink, open_sink
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+PAGES = 'pages'
+IDS = 'ids'
+
+
+class Shard(NamedTuple):
+    id: int
+    kind: str  # 'pages' (listing page range) or 'ids' (profile ID range)
+    start: int
+    end: int  # inclusive
+    attempts: int
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    # Autocommit mode, so claims can take an explicit write lock with BEGIN IMMEDIATE
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class WorkQueue:
+    """SQLite-backed shards with leases, plus the records produced for them"""
+
+    def __init__(self, path: str = 'crawl_queue.sqlite', lease_seconds: float = 120.0, max_attempts: int = 5):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = _connect(path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS shards (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                "end" INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                finished_at REAL,
+                error TEXT,
+                UNIQUE (kind, start, "end")
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                profile_id TEXT PRIMARY KEY,
+                shard_id INTEGER NOT NULL,
+                worker TEXT NOT NULL,
+                record TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_shard ON results (shard_id);
+        ''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def publish(self, kind: str, first: int, last: int, per_shard: int) -> int:
+        """Split first..last into shards of `per_shard`; already-published shards are left alone"""
+        if kind not in (PAGES, IDS):
+            raise ValueError(f"unknown shard kind: {kind}")
+        ranges = [(start, min(start + per_shard - 1, last)) for start in range(first, last + 1, per_shard)]
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            before = self.conn.total_changes
+            self.conn.executemany('INSERT OR IGNORE INTO shards (kind, start, "end") VALUES (?, ?, ?)',
+                                  ((kind, start, end) for start, end in ranges))
+            published = self.conn.total_changes - before
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return published
+
+    def claim(self, worker: str) -> Optional[Shard]:
+        """Lease the next pending shard, or one whose previous lease has expired"""
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.conn.execute('''
+                SELECT id, kind, start, "end", attempts FROM shards
+                WHERE status = ? OR (status = ? AND lease_expires < ?)
+                ORDER BY attempts, id LIMIT 1
+            ''', (PENDING, LEASED, now)).fetchone()
+            if row is None:
+                self.conn.execute('COMMIT')
+                return None
+            self.conn.execute('UPDATE shards SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 '
+                              'WHERE id = ?', (LEASED, worker, now + self.lease_seconds, row['id']))
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return Shard(row['id'], row['kind'], row['start'], row['end'], row['attempts'] + 1)
+
+    def heartbeat(self, shard_id: int, worker: str, conn: Optional[sqlite3.Connection] = None) -> bool:
+        """Extend a lease; False if the worker no longer holds it"""
+        cursor = (conn or self.conn).execute(
+            'UPDATE shards SET lease_expires = ? WHERE id = ? AND worker = ? AND status = ?',
+            (time.time() + self.lease_seconds, shard_id, worker, LEASED))
+        return cursor.rowcount == 1
+
+    def complete(self, shard_id: int, worker: str) -> bool:
+        """Mark a shard done; False if the lease was lost to another worker meanwhile"""
+        cursor = self.conn.execute(
+            'UPDATE shards SET status = ?, finished_at = ?, error = NULL WHERE id = ? AND worker = ? AND status = ?',
+            (DONE, time.time(), shard_id, worker, LEASED))
+        return cursor.rowcount == 1
+
+    def fail(self, shard_id: int, worker: str, error: str):
+        """Release a shard after an error; it is retried until max_attempts is reached"""
+        self.conn.execute('''
+            UPDATE shards SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                              worker = NULL, lease_expires = NULL, error = ?
+            WHERE id = ? AND worker = ? AND status = ?
+        ''', (self.max_attempts, FAILED, PENDING, error, shard_id, worker, LEASED))
+
+    def requeue_failed(self) -> int:
+        """Give failed shards a fresh set of attempts"""
+        cursor = self.conn.execute('UPDATE shards SET status = ?, attempts = 0 WHERE status = ?', (PENDING, FAILED))
+        return cursor.rowcount
+
+    def store_results(self, shard_id: int, worker: str, records: Iterable[Dict]):
+        """Store records idempotently: a profile stored twice keeps one row"""
+        now = time.time()
+        rows = [(str(record['id']), shard_id, worker, json.dumps(record, ensure_ascii=False), now)
+                for record in records]
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.executemany('INSERT OR REPLACE INTO results (profile_id, shard_id, worker, record, stored_at) '
+                                  'VALUES (?, ?, ?, ?, ?)', rows)
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def stored_ids(self, shard_id: int) -> set:
+        rows = self.conn.execute('SELECT profile_id FROM results WHERE shard_id = ?', (shard_id,))
+        return {row['profile_id'] for row in rows}
+
+    def counts(self) -> Dict[str, int]:
+        """Shards per status plus the number of stored records"""
+        counts = {row['status']: row['n'] for row in
+                  self.conn.execute('SELECT status, COUNT(*) AS n FROM shards GROUP BY status')}
+        counts['records'] = self.conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        return counts
+
+    def leases(self) -> List[Tuple[int, str, float]]:
+        """(shard id, worker, seconds left) for every active lease"""
+        now = time.time()
+        rows = self.conn.execute('SELECT id, worker, lease_expires FROM shards WHERE status = ? ORDER BY id', (LEASED,))
+        return [(row['id'], row['worker'], row['lease_expires'] - now) for row in rows]
+
+    def merge(self, sink: RecordSink) -> int:
+        """Write every stored record to a sink in shard order, returning the count"""
+        count = 0
+        rows = self.conn.execute('SELECT record FROM results ORDER BY shard_id, stored_at, rowid')
+        for row in rows:
+            sink.write(json.loads(row['record']))
+            count += 1
+        return count
+
+
+class QueueResultSink(RecordSink):
+    """Sink that stores a worker's records in the queue, so the scraper pipeline can write there directly"""
+
+    def __init__(self, queue: WorkQueue, shard_id: int, worker: str, **kwargs):
+        super().__init__(queue.path, **kwargs)
+        self.queue = queue
+        self.shard_id = shard_id
+        self.worker = worker
+        self._buffer: List[Dict] = []
+
+    def _write(self, row: Dict):
+        self._buffer.append(row)
+
+    def _flush(self):
+        self.queue.store_results(self.shard_id, self.worker, self._buffer)
+        self._buffer = []
+
+    def _close(self):
+        pass
+
+
+class _Heartbeat(threading.Thread):
+    """Keep a shard's lease alive from a background thread while the worker crawls"""
+
+    def __init__(self, queue: WorkQueue, shard_id: int, worker: str):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.shard_id = shard_id
+        self.worker = worker
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        # SQLite connections are per thread
+        conn = _connect(self.queue.path)
+        try:
+            while not self._stop_event.wait(self.queue.lease_seconds / 4):
+                if not self.queue.heartbeat(self.shard_id, self.worker, conn):
+                    self.lost = True
+                    logger.warning(f"Lost the lease on shard {self.shard_id}")
+                    return
+        finally:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def shard_ids(scraper, shard: Shard) -> Iterator[str]:
+    """Profile IDs covered by a shard"""
+    if shard.kind == IDS:
+        yield from (str(acc_id) for acc_id in range(shard.start, shard.end + 1))
+        return
+    for page in range(shard.start, shard.end + 1):
+        soup = scraper.get_page_content(scraper.listing_page_url(page))
+        if soup is None:
+            # Unlike a single-process crawl, a shard must not pass as complete with pages missing
+            raise RuntimeError(f"failed to fetch listings page {page}")
+        ids = scraper.extract_accountant_ids(soup)
+        if not ids:
+            logger.info(f"Listings page {page} is empty; shard {shard.id} reached the end of the listings")
+            return
+        yield from ids
+
+
+def process_shard(scraper, queue: WorkQueue, shard: Shard, worker: str, use_async: bool = True) -> bool:
+    """Crawl one leased shard into the queue; returns False if the lease was lost"""
+    done = queue.stored_ids(shard.id)
+    if done:
+        logger.info(f"Shard {shard.id}: {len(done)} profiles already stored by an earlier attempt")
+    ids = (acc_id for acc_id in shard_ids(scraper, shard) if acc_id not in done)
+
+    heartbeat = _Heartbeat(queue, shard.id, worker)
+    heartbeat.start()
+    scraper.sink = QueueResultSink(queue, shard.id, worker, flush_every=25)
+    drops = scraper.metrics.counters['drops']
+    try:
+        if use_async:
+            asyncio.run(scraper.scrape_accountants_async(ids, collect=False))
+        else:
+            scraper.scrape_accountants_sequential(ids, collect=False)
+        scraper.sink.close()
+    finally:
+        scraper.sink = None
+        heartbeat.stop()
+    dropped = scraper.metrics.counters['drops'] - drops
+    if dropped and shard.kind == PAGES:
+        # Listed profiles exist, so a failure is worth another attempt; stored ones are skipped then
+        raise RuntimeError(f"{dropped} profiles could not be fetched")
+    return not heartbeat.lost and queue.complete(shard.id, worker)
+
+
+def run_worker(queue_path: str, worker: Optional[str] = None, scraper=None, use_async: bool = True,
+               lease_seconds: float = 120.0, idle_exit: bool = True, poll_interval: float = 5.0) -> int:
+    """Claim and crawl shards until the queue is drained, returning the number completed"""
+    from muhasib_scraper import MuhasibScraper
+
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    scraper = scraper or MuhasibScraper()
+    completed = 0
+    with WorkQueue(queue_path, lease_seconds=lease_seconds) as queue:
+        while True:
+            shard = queue.claim(worker)
+            if shard is None:
+                if idle_exit and not queue.leases():
+                    break
+                # Other workers still hold leases; their shards come back if they die
+                time.sleep(poll_interval)
+                continue
+            logger.info(f"Worker {worker} claimed shard {shard.id} ({shard.kind} {shard.start}-{shard.end}, "
+                        f"attempt {shard.attempts})")
+            try:
+                if process_shard(scraper, queue, shard, worker, use_async):
+                    completed += 1
+                    logger.info(f"Shard {shard.id} done")
+                else:
+                    logger.warning(f"Shard {shard.id} was taken over by another worker; its records are kept")
+            except Exception as e:
+                logger.error(f"Shard {shard.id} failed: {e}")
+                queue.fail(shard.id, worker, str(e))
+    logger.info(f"Worker {worker} finished: {completed} shards completed")
+    return completed
+
+
+def _range(value: str) -> Tuple[int, int]:
+    first, _, last = value.partition('-')
+    return int(first), int(last or first)
+
+
+def main(argv: Optional[List[str]] = None):
+    from muhasib_scraper import BASE_URL, MuhasibScraper
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Sharded multi-worker crawling through a SQLite work queue")
+    parser.add_argument('--queue', default='crawl_queue.sqlite', help="queue file (default: crawl_queue.sqlite)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    publish = commands.add_parser('publish', help="split the crawl into shards")
+    target = publish.add_mutually_exclusive_group(required=True)
+    target.add_argument('--pages', type=_range, help="listing page range, e.g. 1-40")
+    target.add_argument('--ids', type=_range, help="profile ID range, e.g. 1-20000")
+    publish.add_argument('--per-shard', type=int, required=True, help="pages or IDs per shard")
+
+    worker = commands.add_parser('worker', help="claim and crawl shards until the queue is drained")
+    worker.add_argument('--worker-id', default=None, help="name for this worker (default: host-pid)")
+    worker.add_argument('--lease', type=float, default=120.0, help="lease length in seconds (default: 120)")
+    worker.add_argument('--concurrency', type=int, default=8)
+    worker.add_argument('--parse-workers', type=int, default=None)
+    worker.add_argument('--rps', type=float, default=4.0, help="starting request rate for this worker")
+    worker.add_argument('--base-url', default=BASE_URL)
+    worker.add_argument('--sequential', action='store_true')
+    worker.add_argument('--wait', action='store_true',
+                        help="keep polling for new shards instead of exiting when the queue is drained")
+
+    commands.add_parser('status', help="show shard and record counts")
+    commands.add_parser('requeue-failed', help="retry shards that ran out of attempts")
+
+    merge = commands.add_parser('merge', help="write all stored records to one output file")
+    merge.add_argument('--output', default='muhasib_accountants.csv')
+
+    args = parser.parse_args(argv)
+    if args.command == 'worker':
+        scraper = MuhasibScraper(concurrency=args.concurrency, requests_per_second=args.rps,
+                                 parse_workers=args.parse_workers, base_url=args.base_url)
+        run_worker(args.queue, args.worker_id, scraper, not args.sequential, args.lease, idle_exit=not args.wait)
+        return
+
+    with WorkQueue(args.queue) as queue:
+        if args.command == 'publish':
+            kind, (first, last) = (PAGES, args.pages) if args.pages else (IDS, args.ids)
+            print(f"Published {queue.publish(kind, first, last, args.per_shard)} new shards")
+        elif args.command == 'status':
+            print(queue.counts())
+            for shard_id, holder, remaining in queue.leases():
+                print(f"  shard {shard_id} leased by {holder} ({remaining:.0f}s left)")
+        elif args.command == 'requeue-failed':
+            print(f"Requeued {queue.requeue_failed()} shards")
+        else:
+            with open_sink(args.output) as sink:
+                count = queue.merge(sink)
+            print(f"Merged {count} records into {args.output}")
+
+
+if __name__ == '__main__':
+    main()